@@ -0,0 +1,201 @@
+"""
+Benchmark the solver stages on the bundled puzzle sets.
+
+    python -m benchmark.run [--sets easy hard] [--backends propagation dlx] [--repeat 3]
+                            [--output results.json] [--compare baseline.json]
+
+Every stage is timed per puzzle (per batch for the numpy backend) and reported as
+puzzles per second, p50/p99 latency and peak traced memory. Results are written as
+json, and compared against a previous run with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from src import solution, solver, vectorized
+from src.candidates import Candidates
+from src.topology import Topology
+
+PUZZLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzles')
+SETS = ('easy', 'hard', 'diagonal', 'minimal17', 'adversarial')
+STAGES = ('grid_values', 'reduce_puzzle', 'naked_twins', 'search', 'solve')
+
+STRINGS = 'strings'
+NUMPY = 'numpy'
+BACKENDS = (STRINGS, solver.PROPAGATION, solver.DLX, NUMPY)
+
+
+def load_set(name):
+    with open(os.path.join(PUZZLES, name + '.txt')) as stream:
+        return [line.strip() for line in stream if line.strip()]
+
+
+def _parsed(grid, topology):
+    return Candidates.from_grid(grid, topology)
+
+
+def _unparsed(grid, topology):
+    return grid, topology
+
+
+def stage_runners(backend):
+    """
+    Stages of a backend as {stage: (prepare, run)}: prepare(grid, topology) builds the
+    untimed input of run(input), or (grids, topology) is given to run for batches.
+    """
+    if backend == STRINGS:
+        # the dictionary functions of src.solution, which always include the diagonals
+        return {
+            'grid_values': (lambda grid, topology: grid, solution.grid_values),
+            'reduce_puzzle': (lambda grid, topology: solution.grid_values(grid), solution.reduce_puzzle),
+            'naked_twins': (lambda grid, topology: solution.eliminate(solution.grid_values(grid)),
+                            solution.naked_twins),
+        }
+    if backend == NUMPY:
+        return {
+            'grid_values': (None, lambda grids, topology: vectorized.grids_to_array(grids, topology)),
+            'reduce_puzzle': (None, lambda grids, topology: vectorized.reduce_batch(
+                vectorized.grids_to_array(grids, topology), topology)),
+            'solve': (None, vectorized.solve_batch),
+        }
+    runners = {
+        'search': (_parsed, lambda candidates: solver.search(candidates, backend)),
+        'solve': (_unparsed, lambda item: solver.search(Candidates.from_grid(*item), backend)),
+    }
+    if backend == solver.PROPAGATION:
+        runners.update({
+            'grid_values': (_unparsed, lambda item: Candidates.from_grid(*item)),
+            'reduce_puzzle': (_parsed, Candidates.reduce_puzzle),
+            'naked_twins': (_parsed, lambda candidates: candidates.eliminate().naked_twins()),
+        })
+    return runners
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(prepare, run, grids, topology, repeat):
+    """
+    Returns:
+        (seconds per puzzle samples, total seconds, puzzles solved per sample, peak memory in bytes)
+    """
+    if prepare is None:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(grids, topology)
+            samples.append((time.perf_counter() - start) / len(grids))
+        tracemalloc.start()
+        run(grids, topology)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return samples, sum(samples) * len(grids), len(grids), peak
+
+    samples = []
+    for _ in range(repeat):
+        for grid in grids:
+            item = prepare(grid, topology)
+            start = time.perf_counter()
+            run(item)
+            samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    for grid in grids:
+        run(prepare(grid, topology))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return samples, sum(samples), 1, peak
+
+
+def benchmark(sets, backends, stages, repeat):
+    results = []
+    for name in sets:
+        grids = load_set(name)
+        topology = Topology.get(diagonal=name == 'diagonal')
+        for backend in backends:
+            if backend == STRINGS and not topology.diagonal:
+                continue
+            if backend == NUMPY and vectorized.numpy is None:
+                continue
+            runners = stage_runners(backend)
+            for stage in stages:
+                if stage not in runners:
+                    continue
+                prepare, run = runners[stage]
+                samples, total, per_sample, peak = measure(prepare, run, grids, topology, repeat)
+                results.append({
+                    'set': name,
+                    'backend': backend,
+                    'stage': stage,
+                    'puzzles': len(grids),
+                    'puzzles_per_second': round(len(samples) * per_sample / total, 1),
+                    'p50_ms': round(percentile(samples, 0.5) * 1000, 4),
+                    'p99_ms': round(percentile(samples, 0.99) * 1000, 4),
+                    'peak_memory_kb': round(peak / 1024.0, 1),
+                })
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Rows whose throughput dropped by more than threshold against the baseline run """
+    previous = dict(((row['set'], row['backend'], row['stage']), row) for row in baseline['results'])
+    regressions = []
+    for row in results:
+        key = (row['set'], row['backend'], row['stage'])
+        if key in previous:
+            ratio = row['puzzles_per_second'] / previous[key]['puzzles_per_second']
+            if ratio < 1 - threshold:
+                regressions.append((key, ratio))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solver stages.")
+    parser.add_argument('--sets', nargs='+', choices=SETS, default=list(SETS))
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="json file to write the results to")
+    parser.add_argument('--compare', help="json results of a previous run")
+    parser.add_argument('--threshold', type=float, default=0.1, help="tolerated throughput drop")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = benchmark(args.sets, args.backends, args.stages, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    print('%-12s %-12s %-14s %12s %10s %10s %10s' % ('set', 'backend', 'stage', 'puzzles/s', 'p50 ms',
+                                                   'p99 ms', 'peak kB'))
+    for row in results:
+        print('%-12s %-12s %-14s %12.1f %10.4f %10.4f %10.1f' % (
+            row['set'], row['backend'], row['stage'], row['puzzles_per_second'],
+            row['p50_ms'], row['p99_ms'], row['peak_memory_kb']))
+
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(report, stream, indent=2)
+
+    if args.compare:
+        with open(args.compare) as stream:
+            regressions = compare(results, json.load(stream), args.threshold)
+        for key, ratio in regressions:
+            print('regression: %s/%s/%s at %.0f%% of the baseline throughput' % (key + (ratio * 100,)))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+
+from src import solver
+from src.budget import Budget, BudgetExceeded
+from src.candidates import Candidates
+from src.packed import Corpus, pack_grid, unpack_grid
+from src.strategies import Schedule
+from src.topology import Topology
+
+EXCEEDED = 'exceeded'
+
+
+def encode(grid, topology=None):
+    """ Compact form of a grid sent to the workers: its packed bytes, see src.packed """
+    return pack_grid(grid, topology)
+
+
+def decode(encoded, topology=None):
+    return unpack_grid(encoded, topology)
+
+
+def solve_encoded(diagonal, backend, item, size=3, max_nodes=None, timeout=None, deadline=None, strategies=None,
+                  variant=None, token=None, degree=False, lcv=False):
+    """
+    Solve one encoded puzzle.
+
+    Args:
+        diagonal: True to also constrain the two main diagonals.
+        backend: solver backend, see solver.BACKENDS.
+        item: (index, encoded grid) pair, or (index, encoded grid, topology) for
+            a puzzle of its own shape or variant.
+        size: box size of the board, 3 for 9x9 Sudoku.
+        max_nodes, timeout, deadline, token: budget of the search, see Budget, unlimited by default.
+        strategies: names of the strategies of propagation or a Schedule, see src.strategies, all by default.
+        variant: Variant of the puzzles, see src.topology, classic by default.
+        degree, lcv: branching heuristics of the propagation backend, see Candidates.search.
+    Returns:
+        (index, solution) where solution is the solved grid in string form, None
+        if it has no solution, or EXCEEDED if the budget ran out first.
+    """
+    index, encoded = item[:2]
+    topology = item[2] if len(item) > 2 else Topology.get(diagonal, size, variant)
+    candidates = Candidates.from_grid(decode(encoded, topology), topology)
+    if strategies is not None:
+        candidates.schedule = Schedule.of(strategies)
+    budget = None
+    if max_nodes is not None or timeout is not None or deadline is not None or token is not None:
+        budget = Budget(max_nodes, timeout, deadline, token)
+    try:
+        candidates = solver.search(candidates, backend, budget, degree, lcv)
+    except BudgetExceeded:
+        return index, EXCEEDED
+    return index, candidates.to_grid() if candidates else None
+
+
+def solve_many(grids, workers=None, chunksize=64, ordered=True, diagonal=False, backend=solver.PROPAGATION,
+               size=3, max_nodes=None, timeout=None, strategies=None, variant=None, degree=False, lcv=False):
+    """
+    Solve many Sudoku grids over a pool of processes, without displaying them.
+
+    Puzzles are read lazily from ``grids`` and submitted in bounded windows,
+    so arbitrarily long iterables can be streamed.
+
+    Args:
+        grids: iterable of grids in string form, see Topology.parse, or of
+            (grid, topology) pairs, so that puzzles of different shapes and
+            variants are solved in the same batch.
+        workers: number of processes, cpu count by default; 1 solves in process.
+        chunksize: number of puzzles sent to a worker at a time.
+        ordered: yield solutions in input order, otherwise (index, solution)
+            pairs as soon as they are ready.
+        diagonal: True to solve diagonal Sudoku.
+        backend: solver backend, see solver.BACKENDS.
+        size: box size of the board, 3 for 9x9 Sudoku.
+        max_nodes: maximum number of search nodes per grid, unlimited by default.
+        timeout: seconds the search of a grid may take, unlimited by default.
+        strategies: names of the strategies of propagation or a Schedule, see src.strategies, all by default.
+        variant: Variant of the grids given without a topology, see src.topology.
+        degree, lcv: branching heuristics of the propagation backend, see Candidates.search.
+    Returns:
+        generator of solved grids in string form, None for unsolvable grids and
+        EXCEEDED for grids whose budget ran out.
+    """
+    workers = workers or cpu_count()
+    topology = Topology.get(diagonal, size, variant)
+    solve_item = partial(solve_encoded, diagonal, backend, size=size, max_nodes=max_nodes, timeout=timeout,
+                         strategies=strategies, variant=variant, degree=degree, lcv=lcv)
+    items = (_item(index, grid, topology) for index, grid in enumerate(grids))
+
+    if workers == 1:
+        for index, solution in map(solve_item, items):
+            yield solution if ordered else (index, solution)
+        return
+
+    window = workers * chunksize * 4
+    pool = Pool(workers)
+    try:
+        while True:
+            batch = list(islice(items, window))
+            if not batch:
+                break
+            if ordered:
+                for index, solution in pool.imap(solve_item, batch, chunksize):
+                    yield solution
+            else:
+                for result in pool.imap_unordered(solve_item, batch, chunksize):
+                    yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _item(index, grid, topology):
+    """ Encoded item of a grid, carrying the topology of a (grid, topology) pair """
+    if isinstance(grid, tuple):
+        grid, topology = grid
+        return index, encode(grid, topology), topology
+    return index, encode(grid, topology)
+
+
+def solve_shard(path, backend, shard, max_nodes=None, timeout=None):
+    """
+    Solve a range of the grids of a corpus file, read from its memory map.
+
+    Args:
+        path: corpus file, see src.packed.
+        backend: solver backend, see solver.BACKENDS.
+        shard: (start, stop) index range of the grids.
+        max_nodes, timeout: budget of the search of each grid, unlimited by default.
+    Returns:
+        list of solutions, see solve_encoded.
+    """
+    start, stop = shard
+    solutions = []
+    with Corpus(path) as corpus:
+        topology, memory = corpus.topology, corpus.memory
+        for index in range(start, stop):
+            offset = corpus.offset(index)
+            item = (index, memory[offset:offset + corpus.record_size])
+            solutions.append(solve_encoded(topology.diagonal, backend, item, topology.size, max_nodes, timeout)[1])
+    return solutions
+
+
+def solve_corpus(path, workers=None, shard_size=1024, backend=solver.PROPAGATION, max_nodes=None, timeout=None):
+    """
+    Solve the grids of a corpus file over a pool of processes, each reading
+    its own shards of the file by offset.
+
+    Args:
+        path: corpus file, see src.packed, whose header gives the board shape.
+        workers: number of processes, cpu count by default; 1 solves in process.
+        shard_size: number of grids solved by a worker at a time.
+        backend, max_nodes, timeout: see solve_many.
+    Returns:
+        generator of the solutions in corpus order, see solve_many.
+    """
+    workers = workers or cpu_count()
+    with Corpus(path) as corpus:
+        shards = corpus.shards(shard_size)
+    solve_range = partial(solve_shard, path, backend, max_nodes=max_nodes, timeout=timeout)
+
+    if workers == 1:
+        for shard in shards:
+            for solution in solve_range(shard):
+                yield solution
+        return
+
+    pool = Pool(workers)
+    try:
+        for solutions in pool.imap(solve_range, shards):
+            for solution in solutions:
+                yield solution
+    finally:
+        pool.terminate()
+        pool.join()
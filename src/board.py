@@ -1,22 +1,29 @@
-from src.helper import Helper
+from src import solver
+from src.candidates import Candidates
+from src.topology import Topology
 
 
 class Board(object):
-    def __init__(self, grid=None):
-        self.rows = 'ABCDEFGHI'
-        self.columns = '123456789'
-        self.placeholder = '.'
-        self.boxes = Helper.cross(self.rows, self.columns)
-        self.row_units = [Helper.cross(row, self.columns) for row in self.rows]
-        self.column_units = [Helper.cross(self.rows, column) for column in self.columns]
-        self.square_units = [Helper.cross(row_square, column_square)
-                             for row_square in ('ABC', 'DEF', 'GHI')
-                             for column_square in ('123', '456', '789')]
-        self.unitlist = self.row_units + self.column_units + self.square_units
-        self.units = dict((s, [u for u in self.unitlist if s in u]) for s in self.boxes)
-        self.peers = dict((s, set(sum(self.units[s], [])) - set([s])) for s in self.boxes)
+    __slots__ = ('topology', 'grid', 'initial_grid')
+
+    placeholder = '.'
+
+    def __init__(self, grid=None, topology=None):
+        self.topology = topology or Topology.get()
         self.__build_grid(grid)
 
+    @property
+    def rows(self):
+        return self.topology.rows
+
+    @property
+    def columns(self):
+        return self.topology.columns
+
+    @property
+    def boxes(self):
+        return self.topology.boxes
+
     def grid_values(self):
         """
         Returns:
@@ -27,7 +34,7 @@ class Board(object):
         for key in self.grid:
             value = self.grid[key]
             if value == self.placeholder:
-                self.grid[key] = self.columns
+                self.grid[key] = self.topology.symbols
             else:
                 self.grid[key] = value
         return self.grid
@@ -44,12 +51,11 @@ class Board(object):
         Returns:
             Resulting Sudoku in dictionary form after eliminating values.
         """
+        boxes = self.boxes
         for box in values:
-            for peer in self.peers[box]:
-                peer_digit = values[peer]
-                if self.__is_not_same_box(box, peer) \
-                        and self.__is_not_all_digits(peer_digit) \
-                        and self.__has_an_assigned_value(peer_digit):
+            for peer in self.__peers(box):
+                peer_digit = values[boxes[peer]]
+                if self.__is_not_all_digits(peer_digit) and self.__has_an_assigned_value(peer_digit):
                     values[box] = values[box].replace(peer_digit, "")
         return values
 
@@ -63,7 +69,7 @@ class Board(object):
         Input: Sudoku in dictionary form.
         Output: Resulting Sudoku in dictionary form after filling in only choices.
         """
-        for unit in self.unitlist:
+        for unit in self.topology.unitlist:
             digit_frequencies = self.__get_digit_frequencies(unit, values)
             unique_digit_box = {digit: frequency
                                     for digit, frequency in digit_frequencies.items()
@@ -98,32 +104,29 @@ class Board(object):
                 return False
         return values
 
-    def search(self, values):
-        "Using depth-first search and propagation, create a search tree and solve the sudoku."
-        # First, reduce the puzzle using the previous function
-        reduced_puzzle = self.reduce_puzzle(values)
-        if reduced_puzzle is False:
-            return False
-
-        if self.__all_box_assigned(values):
-            return values
-
-        # Choose one of the unfilled squares with the fewest possibilities
-        number_of_possibilities = lambda digit: len(digit)
-
-        frequencies = dict((box, number_of_possibilities(digit))
-               for (box, digit) in values.items()
-                       if len(digit) > 1)
-        best_unfilled_box = min(frequencies.keys(), key=(lambda box: frequencies[box]))
-
-        # Now use recursion to solve each one of the resulting sudokus,
-        # and if one returns a value (not False), return that answer!
-        for digit in values[best_unfilled_box]:
-            recursive_values = values.copy()
-            recursive_values[best_unfilled_box] = digit
-            answer = self.search(recursive_values)
-            if answer:
-                return answer
+    def search(self, values, backend=solver.PROPAGATION, stats=None, budget=None, degree=False, lcv=False):
+        """Using depth-first search and propagation, create a search tree and solve the sudoku.
+
+        The search runs on candidate bitmasks and backtracks in place through an undo trail.
+
+        :param values: Sudoku grid as dict type
+        :param backend: 'propagation', or 'dlx' for the dancing links exact cover solver
+        :param stats: SolveStats filled with the counters of the search, off by default
+        :param budget: Budget limiting the search, raising BudgetExceeded once spent, unlimited by default
+        :param degree: break ties between the boxes with the fewest candidates by most open peers
+        :param lcv: try the least constraining digits first
+        :return: solved Sudoku in dictionary form, False if no solution exists
+        """
+        candidates = Candidates.from_values(values, self.topology)
+        if stats is not None:
+            candidates.stats = stats
+            stats.reset()
+        try:
+            candidates = solver.search(candidates, backend, budget, degree, lcv)
+        finally:
+            if stats is not None:
+                stats.finish()
+        return candidates.to_values() if candidates else False
 
     def naked_twins(self, values):
         """Eliminate values using the naked twins strategy.
@@ -131,29 +134,11 @@ class Board(object):
             values(dict): a dictionary of the form {'box_name': '123456789', ...}
 
         Returns:
-            the values dictionary with the naked twins eliminated from peers.
+            the values dictionary with the naked twins eliminated from the rest of their units.
         """
-        self.show(values)
-
-        if self.__all_box_assigned(values):
-            return values
-
-        values = self.eliminate(values)
-
-        # Find all instances of naked twins
-        twins_list = self.__all_naked_twins(values)
-        print ("\n\ntwins --> ", twins_list, "\n\n")
-
-        # Eliminate the naked twins as possibilities for their peers
-        for twins in twins_list:
-            digits = values[twins[0]]
-            values = self.__eliminate_values_from_peers(twins, digits, values)
-
-        return self.naked_twins(values)
-
-
-
-
+        candidates = Candidates.from_values(values, self.topology).naked_twins()
+        values.update(candidates.to_values())
+        return values
 
     def show(self, values):
         """
@@ -161,25 +146,26 @@ class Board(object):
         Input: The sudoku in dictionary form
         Output: None
         """
+        size, dimension = self.topology.size, len(self.columns)
         width = 1 + max(len(values[s]) for s in self.boxes)
-        line = '+'.join(['-' * (width * 3)] * 3)
-        for r in self.rows:
-            print(''.join(values[r + c].center(width) + ('|' if c in '36' else '')
-                          for c in self.columns))
-            if r in 'CF': print(line)
+        line = '+'.join(['-' * (width * size)] * size)
+        for row, r in enumerate(self.rows, 1):
+            print(''.join(values[r + c].center(width) + ('|' if column % size == 0 and column < dimension else '')
+                          for column, c in enumerate(self.columns, 1)))
+            if row % size == 0 and row < dimension: print(line)
         return
 
     def get_boxes(self):
-        return self.boxes
+        return list(self.boxes)
 
     def get_row_units(self):
-        return self.row_units
+        return [self.topology.labels(unit) for unit in self.topology.row_units]
 
     def get_column_units(self):
-        return self.column_units
+        return [self.topology.labels(unit) for unit in self.topology.column_units]
 
     def get_square_units(self):
-        return self.square_units
+        return [self.topology.labels(unit) for unit in self.topology.square_units]
 
     def get_undefined_boxes(self, square):
         return [box for box in square if not self.__has_an_assigned_value(self.grid[box])]
@@ -188,17 +174,16 @@ class Board(object):
         """Convert grid string into {<box>: <value>} dict with '123456789' value for empties.
 
                Args:
-                   grid: Sudoku grid in string form, 81 characters long
+                   grid: Sudoku grid in string form, one symbol per box, or numbers
+                         separated by spaces or commas, see Topology.parse
                Returns:
                    Sudoku grid in dictionary form:
                    - keys: Box labels, e.g. 'A1'
                    - values: Value in corresponding box, e.g. '8', or '123456789' if it is empty.
                """
         self.grid = {}
-        assert grid is not None, "grid should be defined"
-        assert len(grid) is 81, "grid should have 81 digits"
         item_index = 0
-        for item in grid:
+        for item in self.topology.parse(grid):
             self.__validate(item)
             box = self.boxes[item_index]
             self.grid[box] = item
@@ -206,69 +191,28 @@ class Board(object):
         self.initial_grid = self.grid.copy()
 
     def __validate(self, item):
-        if item not in (str(value) for value in range(1, 10)) and item != self.placeholder:
+        if item not in self.topology.symbol_masks:
             raise ValueError("grid contains a not valid value: " + item)
 
     def __is_contained(self, box_value, peer_value):
         return peer_value in box_value
 
     def __is_not_all_digits(self, value):
-        return value != self.columns
+        return value != self.topology.symbols
 
     def __has_an_assigned_value(self, value):
         return len(value) == 1
 
-    def __is_not_same_box(self, first_box, second_box):
-        return first_box != second_box
+    def __peers(self, box):
+        return self.topology.peers[self.topology.box_index[box]]
 
-    def __get_digit_frequencies(self, boxes, values):
+    def __get_digit_frequencies(self, unit, values):
         digit_frequencies = {}
-        for box in boxes:
+        for box in self.topology.labels(unit):
             for digit in list(values[box]):
                 digit_frequencies.setdefault(digit, []).append(box)
         return digit_frequencies
 
-    def __all_box_assigned(self, values):
-        for box in values:
-            if len(values[box]) > 1:
-                return False
-        return True
-
-    def __all_naked_twins(self, values):
-        twins = {}
-        two_digits_boxes = [(box, values[box]) for box in values if len(values[box]) == 2]
-        for box, value in two_digits_boxes:
-            for unit in self.units[box]:
-                box_unit_list = [box_unit for box_unit in unit
-                                 if box_unit != box and values[box_unit] == value]
-
-                for twin in box_unit_list:
-                    twins.setdefault(value, list())
-                    twins[value].append(twin)
-                    #print("added ", twin, values[twin], box, value)
-
-        twins = list(boxes for boxes in twins.values()
-                     if len(boxes) == 2)
-        return twins
-
-    def __eliminate_values_from_peers(self, twins, digits_to_be_removed, values):
-        digits_to_be_removed = list(digits_to_be_removed)
-        boxA = twins[0]
-        boxB = twins[1]
-        for peer in self.peers[boxA]:
-            if peer != boxB and len(values[peer]) > 1:
-                for digit in values[peer]:
-                    if digit in digits_to_be_removed:
-                        print ("removing ", digit, " from ", peer)
-                        values[peer].replace(digit, '')
-
-        for peer in self.peers[boxB]:
-            if peer != boxA and len(values[peer]) > 1:
-                for digit in values[peer]:
-                    if digit in digits_to_be_removed:
-                        print("removing ", digit, " from ", peer)
-                        values[peer].replace(digit, '')
-        return values
 
 
 
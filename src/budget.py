@@ -0,0 +1,61 @@
+from time import monotonic
+
+NODES = 'nodes'
+DEADLINE = 'deadline'
+CANCELLED = 'cancelled'
+
+
+class BudgetExceeded(Exception):
+    """ Raised out of a search stopped by its Budget.
+
+    ``reason`` is 'nodes', 'deadline' or 'cancelled', and ``nodes`` the number of
+    nodes searched. The candidates are left partially searched, and the stats
+    attached to them hold the counters up to the cutoff.
+    """
+
+    def __init__(self, reason, nodes):
+        super(BudgetExceeded, self).__init__("search budget exceeded: " + reason, nodes)
+        self.reason = reason
+        self.nodes = nodes
+
+
+class Budget(object):
+    """ Limits of a search, checked when it starts and then every ``interval`` nodes.
+
+    Args:
+        max_nodes: maximum number of search nodes.
+        timeout: seconds the search may take from now.
+        deadline: time.monotonic() time the search is stopped at, e.g. shared
+            by the processes solving a request.
+        token: cancels the search once its ``is_set()`` is true, e.g. a
+            threading.Event or a multiprocessing.Event.
+        interval: number of nodes between two checks of the clock and the token.
+    """
+    __slots__ = ('max_nodes', 'deadline', 'token', 'interval', 'nodes', 'next_check')
+
+    def __init__(self, max_nodes=None, timeout=None, deadline=None, token=None, interval=64):
+        if timeout is not None:
+            deadline = min(monotonic() + timeout, deadline if deadline is not None else float('inf'))
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.token = token
+        self.interval = interval
+        self.nodes = 0
+        self.next_check = 0
+
+    def node(self):
+        """ Count a search node, raising BudgetExceeded once the budget is spent """
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check()
+
+    def check(self):
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded(NODES, self.nodes - 1)
+        if self.deadline is not None and monotonic() >= self.deadline:
+            raise BudgetExceeded(DEADLINE, self.nodes)
+        if self.token is not None and self.token.is_set():
+            raise BudgetExceeded(CANCELLED, self.nodes)
+        self.next_check = self.nodes + self.interval
+        if self.max_nodes is not None:
+            self.next_check = min(self.next_check, self.max_nodes + 1)
@@ -0,0 +1,100 @@
+"""
+Cache of solutions shared between equivalent puzzles.
+
+Puzzles are keyed by their canonical form, see src.canonical, so that a puzzle
+only differing from a cached one by a relabeling of its digits, a permutation
+of its rows and columns or a transposition is answered by mapping the cached
+solution back, without searching.
+"""
+import os
+from collections import OrderedDict
+
+from src.canonical import canonical_form
+from src.topology import Topology
+
+NO_SOLUTION = ''
+
+
+class SolutionCache(object):
+    """ Solutions of canonical puzzles, evicting the least recently used past capacity.
+
+    Args:
+        capacity: maximum number of cached puzzles.
+        topology: Topology of the cached puzzles.
+        path: file the cache is loaded from when it exists, and saved to by save.
+    """
+    __slots__ = ('capacity', 'topology', 'path', 'entries', 'hits', 'misses', 'evictions')
+
+    def __init__(self, capacity=4096, topology=None, path=None):
+        if capacity < 1:
+            raise ValueError("cache capacity should be positive")
+        self.capacity = capacity
+        self.topology = topology or Topology.get()
+        if self.topology.variant is not None:
+            raise ValueError("variant grids have no canonical form to cache them by")
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def solve(self, grid, solver):
+        """
+        Args:
+            grid: puzzle in string form, see Topology.parse.
+            solver: called with the grid on a miss, returning its solution in
+                string form, or None if it has none.
+        Returns:
+            solution of the grid in string form, None if it has none.
+        """
+        key, transform = canonical_form(grid, self.topology)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            solution = self.entries[key]
+            return transform.invert(solution) if solution != NO_SOLUTION else None
+        self.misses += 1
+        solution = solver(grid)
+        self.put(key, transform.apply(solution) if solution else NO_SOLUTION)
+        return solution
+
+    def put(self, key, solution):
+        """ Cache the solution in string form of a canonical puzzle, NO_SOLUTION if it has none """
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def counters(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def load(self, path=None):
+        """ Add the 'puzzle,solution' lines of a saved cache, least recently used first """
+        with open(path or self.path) as lines:
+            for line in lines:
+                line = line.strip()
+                if line:
+                    key, solution = line.split(',')
+                    self.put(key, solution)
+        return self
+
+    def save(self, path=None):
+        """ Write the cache as 'puzzle,solution' lines, least recently used first """
+        path = path or self.path
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as output:
+            for key, solution in self.entries.items():
+                output.write(key + ',' + solution + '\n')
+        os.replace(temporary, path)
+        return self
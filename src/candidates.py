@@ -0,0 +1,755 @@
+from heapq import heappop, heappush
+from itertools import combinations
+from timeit import default_timer
+
+from src.strategies import Schedule, register, UNIT
+from src.topology import Topology
+from src.trace import ELIMINATE, ONLY_CHOICE, NAKED_SUBSET, HIDDEN_SUBSET, SEARCH, BACKTRACK, INTERSECTION, FISH
+from src.trace import CAGE, STRATEGY_NAMES
+
+DIGITS = '123456789'
+PLACEHOLDER = '.'
+
+ALL_DIGITS = (1 << len(DIGITS)) - 1
+DIGIT_BITS = tuple(1 << index for index in range(len(DIGITS)))
+MASK_DIGITS = tuple(''.join(digit for index, digit in enumerate(DIGITS) if mask & DIGIT_BITS[index])
+                    for mask in range(ALL_DIGITS + 1))
+DIGIT_MASKS = dict((digits, mask) for mask, digits in enumerate(MASK_DIGITS))
+DIGIT_MASKS[PLACEHOLDER] = ALL_DIGITS
+
+# X-Wing, Swordfish and Jellyfish
+FISH_SIZES = (2, 3, 4)
+# pairs, triples and quads
+MAX_SUBSET = 4
+
+
+def mask_of(digits, symbol_masks=DIGIT_MASKS):
+    """ Candidate mask of a string of digits, in any order """
+    if digits in symbol_masks:
+        return symbol_masks[digits]
+    mask = 0
+    for digit in digits:
+        mask |= symbol_masks[digit]
+    return mask
+
+
+class Candidates(object):
+    """ Sudoku candidates stored as bit masks in a flat list of boxes, 9 bits by 81 boxes
+    for the classic board.
+
+    Bit ``d`` of a box is set when the symbol ``d + 1`` is still possible there,
+    so a solved cell holds exactly one bit. Propagation records every change
+    on an undo trail of (cell, previous mask) pairs, so search can backtrack
+    in place with ``undo``. Changes are also sent to ``trace``, a TraceRecorder,
+    and counted in ``stats``, a SolveStats, when they are set, and search nodes
+    are charged to ``budget``, a Budget stopping the search once spent.
+
+    ``subset_size`` is the largest naked or hidden subset looked for by propagation,
+    e.g. 2 for pairs only, and 1 or less turns subsets off. ``schedule`` is the
+    Schedule of the strategies propagation runs past eliminate and only choice,
+    every built-in one by default, see src.strategies.
+    """
+
+    __slots__ = ('cells', 'topology', 'trail', 'queue', 'trace', 'stats', 'budget', 'subset_size', 'schedule')
+
+    def __init__(self, cells, topology=None, subset_size=MAX_SUBSET, schedule=None):
+        self.cells = cells
+        self.topology = topology or Topology.get()
+        self.trail = []
+        self.queue = []
+        self.trace = None
+        self.stats = None
+        self.budget = None
+        self.subset_size = subset_size
+        self.schedule = schedule or DEFAULT_SCHEDULE
+
+    @classmethod
+    def from_grid(cls, grid, topology=None):
+        """
+        Args:
+            grid: Sudoku grid in string form, one symbol per box and '.' for empties,
+                or numbers separated by spaces or commas, see Topology.parse.
+        Returns:
+            Candidates with every empty box set to all digits.
+        """
+        topology = topology or Topology.get()
+        symbol_masks = topology.symbol_masks
+        try:
+            return cls([symbol_masks[item] for item in topology.parse(grid)], topology)
+        except KeyError as error:
+            raise ValueError("grid contains a not valid value: " + error.args[0])
+
+    @classmethod
+    def from_values(cls, values, topology=None):
+        """ Adapter from the dictionary form, e.g. {'A1': '123456789', ...} """
+        topology = topology or Topology.get()
+        symbol_masks = DIGIT_MASKS if topology.symbols == DIGITS else topology.symbol_masks
+        return cls([mask_of(values[box], symbol_masks) for box in topology.boxes], topology)
+
+    def to_values(self):
+        """ Adapter to the dictionary form, e.g. {'A1': '123456789', ...} """
+        return dict(zip(self.topology.boxes, (self.__symbols(mask) for mask in self.cells)))
+
+    def to_grid(self, separator=None):
+        """ Grid in string form, '.' for boxes with more than one candidate,
+        or numbers joined by separator, see Topology.format """
+        popcount = self.topology.popcount
+        return self.topology.format([self.__symbols(mask) if popcount[mask] == 1 else PLACEHOLDER
+                                     for mask in self.cells], separator)
+
+    @classmethod
+    def from_bytes(cls, data, topology=None):
+        """ Adapter from the packed form of to_bytes """
+        topology = topology or Topology.get()
+        digits, boxes = len(topology.symbols), len(topology.boxes)
+        if len(data) != (boxes * digits + 7) // 8:
+            raise ValueError("packed candidates should have " + str((boxes * digits + 7) // 8) + " bytes")
+        packed, all_digits = int.from_bytes(data, 'little'), topology.all_digits
+        return cls([packed >> (digits * cell) & all_digits for cell in range(boxes)], topology)
+
+    def to_bytes(self):
+        """ Packed form, the mask of every box in as many bits as symbols, 92 bytes for 81 x 9 bits """
+        digits = len(self.topology.symbols)
+        packed = 0
+        for mask in reversed(self.cells):
+            packed = packed << digits | mask
+        return packed.to_bytes((len(self.cells) * digits + 7) // 8, 'little')
+
+    def __symbols(self, mask):
+        if self.topology.symbols == DIGITS:
+            return MASK_DIGITS[mask]
+        return self.topology.symbols_of(mask)
+
+    def copy(self):
+        return Candidates(list(self.cells), self.topology, self.subset_size, self.schedule)
+
+    def assign(self, cell, mask):
+        """ Set the candidates of a box, recording the previous ones on the trail """
+        if self.trace is not None:
+            self.trace.record(cell, self.cells[cell] & ~mask, SEARCH)
+        self.trail.append(cell)
+        self.trail.append(self.cells[cell])
+        self.cells[cell] = mask
+
+    def mark(self):
+        """ Position of the trail to roll back to with ``undo`` """
+        return len(self.trail)
+
+    def undo(self, mark):
+        """ Restore every box changed since ``mark`` """
+        cells, trail, trace = self.cells, self.trail, self.trace
+        while len(trail) > mark:
+            mask = trail.pop()
+            cell = trail.pop()
+            if trace is not None:
+                trace.record(cell, mask & ~cells[cell], BACKTRACK)
+            cells[cell] = mask
+
+    def solved_count(self):
+        popcount = self.topology.popcount
+        return sum(1 for mask in self.cells if popcount[mask] == 1)
+
+    def is_solved(self):
+        popcount = self.topology.popcount
+        return all(popcount[mask] == 1 for mask in self.cells)
+
+    def eliminate(self):
+        """ Remove the digit of every solved box from the candidates of its peers """
+        cells, popcount = self.cells, self.topology.popcount
+        for cell, peers in enumerate(self.topology.peers):
+            assigned = 0
+            for peer in peers:
+                mask = cells[peer]
+                if popcount[mask] == 1:
+                    assigned |= mask
+            cells[cell] &= ~assigned
+        return self
+
+    def only_choice(self):
+        """ Assign every digit that fits in only one box of a unit to that box """
+        cells, popcount = self.cells, self.topology.popcount
+        for unit in self.topology.unitlist:
+            once = twice = 0
+            for cell in unit:
+                mask = cells[cell]
+                twice |= once & mask
+                once |= mask
+            unique = once & ~twice
+            if unique:
+                for cell in unit:
+                    mask = cells[cell]
+                    if mask & unique and popcount[mask] > 1:
+                        cells[cell] = mask & unique
+        return self
+
+    def naked_twins(self):
+        """ Remove the digits of two boxes sharing the same two candidates from the rest of their unit """
+        cells = self.cells
+        for unit in self.topology.unitlist:
+            self.__naked_subsets([cell for cell in unit if cells[cell] & (cells[cell] - 1)], 2, [])
+        return self
+
+    def subsets(self, size=MAX_SUBSET):
+        """ Naked and hidden pairs, triples and quads, up to ``size`` boxes, in every unit.
+
+        Removals are recorded on the undo trail.
+
+        Returns:
+            self, or False if a box has no candidate left.
+        """
+        cells = self.cells
+        for unit in self.topology.unitlist:
+            open_cells = [cell for cell in unit if cells[cell] & (cells[cell] - 1)]
+            largest = min(size, MAX_SUBSET, len(open_cells) // 2)
+            if largest > 1 and (self.__naked_subsets(open_cells, largest, []) is False or
+                                self.__hidden_subsets(open_cells, largest, []) is False):
+                return False
+        return self
+
+    def intersections(self):
+        """ Pointing pairs and box/line reduction: when the digits of a square fit only where it
+        crosses a line, remove them from the rest of the line, and the other way round.
+
+        Removals are recorded on the undo trail.
+
+        Returns:
+            self, or False if a box has no candidate left.
+        """
+        return self if self.__intersections([]) is not False else False
+
+    def fish(self):
+        """ X-Wing, Swordfish and Jellyfish: when a digit fits in n rows only within the same
+        n columns, remove it from the other boxes of those columns, and the other way round.
+
+        Removals are recorded on the undo trail.
+
+        Returns:
+            self, or False if a box has no candidate left.
+        """
+        return self if self.__fish([]) is not False else False
+
+    def __naked_subsets(self, open_cells, size, queue):
+        """ Remove the digits of n open boxes holding only n digits between them from the other open boxes """
+        cells = self.cells
+        popcount = self.topology.popcount
+        for subset_size in range(2, size + 1):
+            eligible = [cell for cell in open_cells if popcount[cells[cell]] <= subset_size]
+            if len(eligible) < subset_size:
+                continue
+            for subset in combinations(eligible, subset_size):
+                digits = 0
+                for cell in subset:
+                    digits |= cells[cell]
+                if popcount[digits] < subset_size:
+                    return False
+                if popcount[digits] == subset_size:
+                    for cell in open_cells:
+                        if cells[cell] & digits and cell not in subset:
+                            if not self.exclude(cell, digits, NAKED_SUBSET):
+                                return False
+                            queue.append(cell)
+        return True
+
+    def __hidden_subsets(self, open_cells, size, queue):
+        """ Keep only the n digits fitting in n open boxes between them in those boxes """
+        cells = self.cells
+        topology = self.topology
+        popcount = topology.popcount
+
+        # bit-sliced counters of the digits fitting in at least 1, 2, 3, 4 and 5 open boxes
+        once = twice = three = four = five = 0
+        for cell in open_cells:
+            mask = cells[cell]
+            five |= four & mask
+            four |= three & mask
+            three |= twice & mask
+            twice |= once & mask
+            once |= mask
+        counts = (once, twice, three, four, five)
+        if popcount[twice & ~counts[size]] < 2:
+            return True
+
+        # positions[digit] has bit i set when the digit fits in the i-th open box
+        positions = [0] * len(topology.symbols)
+        for index, cell in enumerate(open_cells):
+            for digit in topology.digit_indexes[cells[cell]]:
+                positions[digit] |= 1 << index
+        for subset_size in range(2, size + 1):
+            candidates = twice & ~counts[subset_size]
+            if popcount[candidates] < subset_size:
+                continue
+            eligible = topology.digit_indexes[candidates]
+            for subset in combinations(eligible, subset_size):
+                boxes = digits = 0
+                for digit in subset:
+                    boxes |= positions[digit]
+                    digits |= 1 << digit
+                if popcount[boxes] < subset_size:
+                    return False
+                if popcount[boxes] == subset_size:
+                    for index, cell in enumerate(open_cells):
+                        if boxes >> index & 1 and cells[cell] & ~digits:
+                            if not self.exclude(cell, cells[cell] & ~digits, HIDDEN_SUBSET):
+                                return False
+                            queue.append(cell)
+        return True
+
+    def __intersections(self, queue):
+        cells = self.cells
+        segments = self.topology.segments
+        digits = []
+        for segment in segments:
+            mask = 0
+            for cell in segment:
+                mask |= cells[cell]
+            digits.append(mask)
+
+        for segment, square_rest, line_rest in self.topology.intersections:
+            square_digits = line_digits = 0
+            for other in square_rest:
+                square_digits |= digits[other]
+            for other in line_rest:
+                line_digits |= digits[other]
+            # digits of the square confined to the line, then digits of the line confined to the square
+            for confined, rest in ((digits[segment] & line_digits & ~square_digits, line_rest),
+                                   (digits[segment] & square_digits & ~line_digits, square_rest)):
+                if confined:
+                    for other in rest:
+                        if digits[other] & confined:
+                            for cell in segments[other]:
+                                if cells[cell] & confined:
+                                    if not self.exclude(cell, confined, INTERSECTION):
+                                        return False
+                                    queue.append(cell)
+                            digits[other] &= ~confined
+        return True
+
+    def __fish(self, queue):
+        cells = self.cells
+        topology = self.topology
+        popcount = topology.popcount
+        dimension = len(topology.symbols)
+        # rows[digit][row] has bit column set when the digit is a candidate of an unsolved box there
+        rows = [[0] * dimension for _ in range(dimension)]
+        columns = [[0] * dimension for _ in range(dimension)]
+        digit_indexes = topology.digit_indexes
+        for cell, mask in enumerate(cells):
+            if mask & (mask - 1):
+                row, column = divmod(cell, dimension)
+                row_bit, column_bit = 1 << column, 1 << row
+                for digit in digit_indexes[mask]:
+                    rows[digit][row] |= row_bit
+                    columns[digit][column] |= column_bit
+
+        for digit in range(dimension):
+            bit = 1 << digit
+            for positions, cover_units in ((rows[digit], topology.column_units),
+                                           (columns[digit], topology.row_units)):
+                bases = [base for base, position in enumerate(positions) if position]
+                counts = [popcount[position] for position in positions]
+                # a fish of size n has a complementary one of size len(bases) - n the other way
+                for size in FISH_SIZES:
+                    if size > len(bases) // 2:
+                        break
+                    eligible = [base for base in bases if counts[base] <= size]
+                    for fish in combinations(eligible, size):
+                        covers = 0
+                        for base in fish:
+                            covers |= positions[base]
+                        if popcount[covers] < size:
+                            return False
+                        if popcount[covers] > size:
+                            continue
+                        for cover, unit in enumerate(cover_units):
+                            if covers >> cover & 1:
+                                for base, cell in enumerate(unit):
+                                    if cells[cell] & bit and base not in fish:
+                                        if not self.exclude(cell, bit, FISH):
+                                            return False
+                                        queue.append(cell)
+                                        positions[base] &= ~(1 << cover)
+        return True
+
+    def __cage(self, cage, queue):
+        """ Keep in the boxes of a killer cage only the digits of the combinations still fitting them """
+        cells = self.cells
+        topology = self.topology
+        popcount = topology.popcount
+        boxes = topology.cages[cage]
+        solved = union = 0
+        for cell in boxes:
+            mask = cells[cell]
+            union |= mask
+            if popcount[mask] == 1:
+                solved |= mask
+
+        # a combination fits if it holds the solved digits, and a candidate of every box within the others
+        fitting = 0
+        for combination in topology.cage_combinations[cage]:
+            if combination & ~fitting and combination & solved == solved and combination & union == combination:
+                if all(cells[cell] & combination for cell in boxes):
+                    fitting |= combination
+        if not fitting:
+            return False
+        for cell in boxes:
+            if cells[cell] & ~fitting:
+                if not self.exclude(cell, cells[cell] & ~fitting, CAGE):
+                    return False
+                queue.append(cell)
+        return True
+
+    def exclude(self, cell, digits, strategy):
+        """ Remove digits from a box through the undo trail, counted under a trace strategy,
+        False if none would be left """
+        mask = self.cells[cell]
+        if not mask & ~digits:
+            return False
+        if self.trace is not None:
+            self.trace.record(cell, mask & digits, strategy)
+        if self.stats is not None:
+            self.stats.removed[strategy] += self.topology.popcount[mask & digits]
+        self.trail.append(cell)
+        self.trail.append(mask)
+        self.cells[cell] = mask & ~digits
+        return True
+
+    def propagate(self, changed=None):
+        """
+        Incremental constraint propagation driven by a queue of changed boxes.
+
+        Solved boxes are eliminated from their peers, and only the units touched
+        by a change are checked again for only choices, and the killer cages for
+        the digit combinations still fitting them, then for the unit strategies
+        of the schedule, naked and hidden subsets, once those stall. When all the
+        boxes are propagated, the board strategies of the schedule, intersection
+        removal and the fish patterns, also run over the whole board once everything
+        else stalls, and propagation resumes from the first one that changes a box;
+        incremental calls from the search keep to the unit strategies.
+
+        Args:
+            changed: indexes of the boxes changed since the last propagation,
+                all the boxes by default.
+        Returns:
+            self, or False as soon as a box has no candidate left.
+        """
+        cells = self.cells
+        topology = self.topology
+        peers, cell_units, unitlist, cage_of = topology.peers, topology.cell_units, topology.unitlist, topology.cage_of
+        popcount, all_digits = topology.popcount, topology.all_digits
+        trail, trace, stats, subset_size = self.trail, self.trace, self.stats, self.subset_size
+        unit_labels = self.schedule.unit_labels if subset_size > 1 else ()
+        queue = list(range(len(cells)) if changed is None else changed)
+        dirty = set()
+        dirty_cages = set()
+        pending = set()
+        whole_board = changed is None
+        if stats is not None:
+            stats.propagations += 1
+            removed = stats.removed
+            start = default_timer()
+
+        while queue or dirty or dirty_cages:
+            # Eliminate Strategy
+            while queue:
+                cell = queue.pop()
+                mask = cells[cell]
+                if popcount[mask] == 1:
+                    for peer in peers[cell]:
+                        if cells[peer] & mask:
+                            remaining = cells[peer] & ~mask
+                            if not remaining:
+                                return False
+                            if trace is not None:
+                                trace.record(peer, mask, ELIMINATE)
+                            if stats is not None:
+                                removed[ELIMINATE] += 1
+                            trail.append(peer)
+                            trail.append(cells[peer])
+                            cells[peer] = remaining
+                            queue.append(peer)
+                elif not mask:
+                    return False
+                dirty.update(cell_units[cell])
+                if cage_of and cage_of[cell] is not None:
+                    dirty_cages.add(cage_of[cell])
+            if stats is not None:
+                start = self.__lap(ELIMINATE, start)
+
+            if dirty:
+                unit_index = dirty.pop()
+                unit = unitlist[unit_index]
+
+                # Only Choice Strategy
+                once = twice = 0
+                for cell in unit:
+                    mask = cells[cell]
+                    twice |= once & mask
+                    once |= mask
+                if once != all_digits:
+                    return False
+                unique = once & ~twice
+                if unique:
+                    for cell in unit:
+                        mask = cells[cell]
+                        if mask & unique and popcount[mask] > 1:
+                            mask &= unique
+                            if popcount[mask] > 1:
+                                return False
+                            if trace is not None:
+                                trace.record(cell, cells[cell] & ~mask, ONLY_CHOICE)
+                            if stats is not None:
+                                removed[ONLY_CHOICE] += popcount[cells[cell] & ~mask]
+                            trail.append(cell)
+                            trail.append(cells[cell])
+                            cells[cell] = mask
+                            queue.append(cell)
+                if stats is not None:
+                    start = self.__lap(ONLY_CHOICE, start)
+
+                if unit_labels:
+                    pending.add(unit_index)
+
+            elif dirty_cages:
+                # Killer Cage Strategy
+                if self.__cage(dirty_cages.pop(), queue) is False:
+                    return False
+                if stats is not None:
+                    start = self.__lap(CAGE, start)
+
+            # units changed since the unit strategies last ran, one at a time until something changes
+            while pending and not queue and not dirty and not dirty_cages:
+                unit = unitlist[pending.pop()]
+                open_cells = [cell for cell in unit if cells[cell] & (cells[cell] - 1)]
+                # n boxes of a naked subset leave a hidden subset of the other open boxes, and the other way round
+                largest = min(subset_size, MAX_SUBSET, len(open_cells) // 2)
+                if largest < 2:
+                    continue
+
+                for label in unit_labels:
+                    mark = len(trail)
+                    # Naked Subsets Strategy, or Hidden Subsets Strategy
+                    if label == NAKED_SUBSET:
+                        subsets = self.__naked_subsets(open_cells, largest, queue)
+                    else:
+                        subsets = self.__hidden_subsets(open_cells, largest, queue)
+                    if subsets is False:
+                        return False
+                    if stats is not None:
+                        start = self.__pass(label, start, mark)
+
+            if whole_board and not queue and not dirty and not dirty_cages and not pending and not self.is_solved():
+                # board strategies in turn, until one changes a box
+                for strategy in self.schedule.board:
+                    mark = len(trail)
+                    if strategy.function(self) is False:
+                        return False
+                    if stats is not None:
+                        start = self.__pass(strategy.label, start, mark)
+                    if len(trail) > mark:
+                        queue.extend(trail[mark::2])
+                        break
+        return self
+
+    def __lap(self, strategy, start):
+        """ Add the time since start to a strategy, returning the new start """
+        now = default_timer()
+        self.stats.strategy_time[strategy] += now - start
+        return now
+
+    def __pass(self, strategy, start, mark):
+        """ Count a run of a scheduled strategy started at trail mark, see __lap """
+        stats = self.stats
+        stats.passes[strategy] += 1
+        if len(self.trail) == mark:
+            stats.idle[strategy] += 1
+        return self.__lap(strategy, start)
+
+    def reduce_puzzle(self):
+        """
+        Propagate every strategy of the schedule from every box until nothing changes.
+
+        Returns:
+            self, or False if a box has no candidate left.
+        """
+        return self.propagate()
+
+    def search(self, degree=False, lcv=False):
+        """ Using depth-first search and propagation, solve the sudoku in place.
+
+        Branches assign a digit in place and roll back through the undo trail,
+        so no grid is copied while backtracking.
+
+        Args:
+            degree: break ties between the boxes with the fewest candidates by
+                branching on the one with the most open peers, instead of the first.
+            lcv: try first the least constraining digits, left as candidates by
+                the fewest open peers, instead of the lowest.
+        Returns:
+            self solved, or False if no solution exists.
+        Raises:
+            BudgetExceeded: if the budget is spent first.
+        """
+        if self.reduce_puzzle() is False:
+            return False
+        del self.trail[:]
+        return next(self.__solutions(degree, lcv), False)
+
+    def count_solutions(self, limit=2, degree=False, lcv=False):
+        """ Count the solutions of the sudoku, stopping as soon as ``limit`` are found.
+
+        Sibling branches share the candidates and roll back through the undo trail,
+        which leaves the candidates propagated but unsolved.
+
+        Args:
+            degree, lcv: branching heuristics, see search.
+        Returns:
+            number of solutions, at most ``limit``.
+        Raises:
+            BudgetExceeded: if the budget is spent first.
+        """
+        if self.reduce_puzzle() is False:
+            return 0
+        del self.trail[:]
+        count = 0
+        for _ in self.__solutions(degree, lcv):
+            count += 1
+            if count >= limit:
+                break
+        self.undo(0)
+        return count
+
+    def solutions(self, stack, degree=False, lcv=False):
+        """ Search of propagated candidates, see __solutions, recording its frames on ``stack``
+        so that a search stopped by its budget can be split with ``unexplored`` """
+        del self.trail[:]
+        return self.__solutions(degree, lcv, stack)
+
+    def unexplored(self, stack):
+        """
+        Split a search stopped between two nodes, e.g. by its budget, into the branches it has left.
+
+        Args:
+            stack: frames of the stopped search, see solutions.
+        Returns:
+            list of propagated Candidates, the node the search stopped at first, then the
+            branches left in the order the search would have taken them. The candidates
+            themselves are rolled back to the root of the search.
+        """
+        branches = [self.copy()]
+        for cell, digits, mark in reversed(stack):
+            self.undo(mark)
+            for digit in reversed(digits):
+                branch = self.copy()
+                branch.assign(cell, digit)
+                if branch.propagate([cell]) is not False:
+                    del branch.trail[:]
+                    branches.append(branch)
+        self.undo(0)
+        return branches
+
+    def __solutions(self, degree, lcv, stack=None):
+        """
+        Depth-first search over an explicit stack of (box, digits left, trail mark) frames.
+
+        The boxes left to branch on are kept in a bucket queue by number of candidates,
+        refiled from the trail for the boxes changed by each branch and by each undo.
+
+        Returns:
+            generator yielding self at each solution, resuming the search with the next branch.
+        """
+        cells, trail, stats, budget = self.cells, self.trail, self.stats, self.budget
+        popcount = self.topology.popcount
+        queue = _BucketQueue(cells, popcount, len(self.topology.symbols))
+        stack = [] if stack is None else stack
+        while True:
+            if stats is not None:
+                stats.node(len(stack))
+            if budget is not None:
+                budget.node()
+            fewest = queue.fewest()
+            if fewest is None:
+                yield self
+            else:
+                cell = self.__branch_cell(fewest) if degree else fewest[0]
+                stack.append((cell, self.__branch_digits(cell, lcv), len(trail)))
+
+            while stack:
+                cell, digits, mark = stack[-1]
+                if len(trail) > mark:
+                    changed = trail[mark::2]
+                    self.undo(mark)
+                    queue.refile(changed, cells)
+                    if stats is not None:
+                        stats.backtracks += 1
+                if not digits:
+                    stack.pop()
+                    continue
+                mark = len(trail)
+                self.assign(cell, digits.pop())
+                if self.propagate([cell]) is not False:
+                    queue.refile(trail[mark::2], cells)
+                    break
+            else:
+                return
+
+    def __branch_cell(self, fewest):
+        """ Box with the most open peers among the boxes with the fewest candidates """
+        cells, peers, popcount = self.cells, self.topology.peers, self.topology.popcount
+        count = popcount[cells[fewest[0]]]
+        fewest = [cell for cell in fewest if popcount[cells[cell]] == count]
+        return min(fewest, key=lambda cell: (-sum(1 for peer in peers[cell] if popcount[cells[peer]] > 1), cell))
+
+    def __branch_digits(self, cell, lcv):
+        """ Digit bits of a box in the reverse of the order they are tried in """
+        digits = self.topology.digit_indexes[self.cells[cell]]
+        if lcv:
+            cells, peers = self.cells, self.topology.peers[cell]
+            digits = sorted(digits, key=lambda digit: (sum(1 for peer in peers if cells[peer] >> digit & 1), digit))
+        return [1 << digit for digit in reversed(digits)]
+
+
+class _BucketQueue(object):
+    """ Boxes by number of candidates, for the search to branch on one with the fewest.
+
+    Each bucket is a heap of boxes, the lowest first, whose entries are dropped
+    lazily once their box has moved to another bucket, and compacted when it
+    outgrows twice the number of boxes.
+    """
+    __slots__ = ('buckets', 'counts', 'popcount')
+
+    def __init__(self, cells, popcount, digits):
+        self.popcount = popcount
+        self.counts = [popcount[mask] for mask in cells]
+        self.buckets = [[] for _ in range(digits + 1)]
+        for cell, count in enumerate(self.counts):
+            self.buckets[count].append(cell)
+
+    def refile(self, changed, cells):
+        """ Move the changed boxes to the bucket of their current number of candidates """
+        buckets, counts, popcount = self.buckets, self.counts, self.popcount
+        for cell in changed:
+            count = popcount[cells[cell]]
+            if count != counts[cell]:
+                counts[cell] = count
+                bucket = buckets[count]
+                heappush(bucket, cell)
+                if len(bucket) > 2 * len(counts):
+                    bucket[:] = sorted(set(cell for cell in bucket if counts[cell] == count))
+
+    def fewest(self):
+        """ Boxes with the fewest candidates but more than one, lowest first, None if every box is solved """
+        counts = self.counts
+        for count in range(2, len(self.buckets)):
+            bucket = self.buckets[count]
+            while bucket and counts[bucket[0]] != count:
+                heappop(bucket)
+            if bucket:
+                return bucket
+        return None
+
+
+register(STRATEGY_NAMES[NAKED_SUBSET], 1, None, NAKED_SUBSET, UNIT)
+register(STRATEGY_NAMES[HIDDEN_SUBSET], 1, None, HIDDEN_SUBSET, UNIT)
+register(STRATEGY_NAMES[INTERSECTION], 2, Candidates.intersections, INTERSECTION)
+register(STRATEGY_NAMES[FISH], 3, Candidates.fish, FISH)
+DEFAULT_SCHEDULE = Schedule()
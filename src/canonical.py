@@ -0,0 +1,191 @@
+"""
+Canonical form of grids under the transformations keeping Sudoku valid.
+
+Classic boards are canonicalized under transposition, band and stack swaps,
+row permutations within bands, column permutations within stacks and digit
+relabeling. Diagonal boards only under the eight rotations and reflections of
+the square and digit relabeling, the other transformations moving the diagonals.
+
+The canonical grid is the smallest image of the grid, comparing first the
+pattern of the clues, with empty boxes first, then the digits relabeled in
+order of appearance. The pattern is minimized row by row over a refined
+partition of the columns, so that only row choices are branched on.
+"""
+from itertools import islice, permutations, product
+
+from src.topology import Topology, PLACEHOLDER
+
+# bounds on the ties explored for very symmetric grids, e.g. almost empty ones:
+# past them the form is still an image of the grid, but may differ between
+# equivalent grids, which only costs cache hits
+MAX_STATES = 256
+MAX_ORDERS = 4096
+
+
+class Transform(object):
+    """ Mapping of a grid to its canonical form.
+
+    ``order[i]`` is the box of the grid moved to box ``i`` of the canonical grid,
+    and ``labels`` maps the symbols of the grid to the canonical symbols.
+    """
+    __slots__ = ('order', 'labels', 'inverse')
+
+    def __init__(self, order, labels):
+        self.order = order
+        self.labels = labels
+        self.inverse = dict((label, symbol) for symbol, label in labels.items())
+
+    def apply(self, symbols):
+        """ Canonical grid in string form of a grid or solution, given as a sequence of symbols """
+        labels = self.labels
+        return ''.join(labels[symbols[cell]] for cell in self.order)
+
+    def invert(self, canonical):
+        """ Grid in string form of a canonical grid or solution """
+        inverse = self.inverse
+        symbols = [PLACEHOLDER] * len(self.order)
+        for position, cell in enumerate(self.order):
+            symbols[cell] = inverse[canonical[position]]
+        return ''.join(symbols)
+
+
+def canonical_form(grid, topology=None):
+    """
+    Args:
+        grid: grid in string form, see Topology.parse.
+        topology: Topology of the grid.
+    Returns:
+        (canonical grid in string form, Transform of the grid to it)
+    Raises:
+        ValueError: for the topology of a variant, whose regions, units or cages
+            the transformations do not keep.
+    """
+    topology = topology or Topology.get()
+    if topology.variant is not None:
+        raise ValueError("variant grids have no canonical form")
+    symbols = topology.parse(grid)
+    orders = _dihedral_orders(topology) if topology.diagonal else _pattern_orders(topology, symbols)
+
+    best = None
+    for order in orders:
+        labels = {PLACEHOLDER: PLACEHOLDER}
+        for cell in order:
+            if symbols[cell] not in labels:
+                labels[symbols[cell]] = topology.symbols[len(labels) - 1]
+        key = ''.join(labels[symbols[cell]] for cell in order)
+        if best is None or key < best[0]:
+            best = key, order, labels
+
+    key, order, labels = best
+    # symbols missing from the grid take the remaining labels, in order
+    missing = [symbol for symbol in topology.symbols if symbol not in labels]
+    for symbol, label in zip(missing, topology.symbols[len(labels) - 1:]):
+        labels[symbol] = label
+    return key, Transform(order, labels)
+
+
+def _dihedral_orders(topology):
+    """ Box orders of the rotations and reflections of the square """
+    dimension = len(topology.rows)
+    last = dimension - 1
+    images = (lambda row, column: (row, column), lambda row, column: (column, row),
+              lambda row, column: (last - row, last - column), lambda row, column: (last - column, last - row),
+              lambda row, column: (column, last - row), lambda row, column: (last - column, row),
+              lambda row, column: (row, last - column), lambda row, column: (last - row, column))
+    return [tuple(image(row, column)[0] * dimension + image(row, column)[1]
+                  for row in range(dimension) for column in range(dimension)) for image in images]
+
+
+def _pattern_orders(topology, symbols):
+    """ Box orders of the transformations giving the smallest pattern of clues """
+    size, dimension = topology.size, len(topology.rows)
+    clues = [symbol != PLACEHOLDER for symbol in symbols]
+    stacks = [[list(range(stack * size, stack * size + size))] for stack in range(size)]
+
+    states = []
+    for transposed in (False, True):
+        # masks[row] has bit column set for the clues of the row
+        masks = [sum(1 << column for column in range(dimension)
+                     if clues[column * dimension + row if transposed else row * dimension + column])
+                 for row in range(dimension)]
+        states.append((transposed, masks, (), [stacks]))
+
+    for _ in range(dimension):
+        best, children = None, []
+        for transposed, masks, rows, groups in states:
+            for row in _next_rows(rows, size, dimension):
+                value, refined = _refine(groups, masks[row], size)
+                if best is None or value < best:
+                    best, children = value, []
+                if value == best and len(children) < MAX_STATES:
+                    children.append((transposed, masks, rows + (row,), refined))
+        states = children
+
+    orders = []
+    for transposed, _, rows, groups in states:
+        for columns in islice(_column_orders(groups), MAX_ORDERS - len(orders)):
+            orders.append(tuple(column * dimension + row if transposed else row * dimension + column
+                                for row in rows for column in columns))
+        if len(orders) >= MAX_ORDERS:
+            break
+    return orders
+
+
+def _next_rows(rows, size, dimension):
+    """ Rows which may follow rows, keeping the bands together """
+    if len(rows) % size:
+        band = rows[-1] // size
+        return [row for row in range(band * size, band * size + size) if row not in rows]
+    used = set(row // size for row in rows)
+    return [row for row in range(dimension) if row // size not in used]
+
+
+def _refine(groups, mask, size):
+    """
+    Order the columns to give the smallest pattern to a row.
+
+    Args:
+        groups: ordered groups of tied stacks, a stack being an ordered partition
+            of its columns into tied cells.
+        mask: clues of the row.
+    Returns:
+        (pattern of the row, refined groups)
+    """
+    value, refined = 0, []
+    for group in groups:
+        patterns = []
+        for stack in group:
+            pattern, cells = 0, []
+            for cell in stack:
+                empty = [column for column in cell if not mask >> column & 1]
+                filled = [column for column in cell if mask >> column & 1]
+                pattern = (pattern << len(empty) << len(filled)) | ((1 << len(filled)) - 1)
+                cells.extend(part for part in (empty, filled) if part)
+            patterns.append((pattern, cells))
+        patterns.sort(key=lambda item: item[0])
+        start = 0
+        for index in range(1, len(patterns) + 1):
+            if index == len(patterns) or patterns[index][0] != patterns[start][0]:
+                refined.append([cells for _, cells in patterns[start:index]])
+                value = (value << (size * (index - start))) | sum(
+                    patterns[start][0] << (size * position) for position in range(index - start))
+                start = index
+    return value, refined
+
+
+def _column_orders(groups):
+    """ Every column order left by the tied stacks and the tied columns, generated lazily
+    so that taking the first ones costs no more than them """
+    if not groups:
+        yield []
+        return
+    for head in _group_orders(groups[0]):
+        for tail in _column_orders(groups[1:]):
+            yield head + tail
+
+
+def _group_orders(group):
+    """ Column orders of a group of tied stacks """
+    for stacks in permutations(group):
+        for cells in product(*[product(*[permutations(cell) for cell in stack]) for stack in stacks]):
+            yield [column for stack in cells for cell in stack for column in cell]
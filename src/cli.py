@@ -0,0 +1,257 @@
+"""
+Solve puzzle corpora from the command line, one grid per line.
+
+    python -m src.cli puzzles.txt [more.txt ...] [--format pair] [--backend dlx] [--workers 4] [--size 4]
+
+Reads standard input when no file (or '-') is given. Empty lines and lines
+starting with '#' are skipped, '0' is accepted as an empty box. Boards larger
+than 9x9 are given either one symbol per box ('123456789ABCDEFG' for 16x16) or
+as numbers separated by spaces or commas. Grids whose search runs out of its
+--max-nodes or --timeout budget are answered 'exceeded'. With --validate, each
+grid is answered with its error name instead, 'valid' for a correct grid.
+Lines of the wrong length or with symbols outside the board, non-ASCII bytes
+included, are answered 'invalid' without stopping the stream.
+
+Corpus files of packed grids, see src.packed, are read like text files, and
+--pack writes the valid grids to such a corpus instead of solving them.
+
+Jigsaw, windoku and killer grids are solved with --variant, a json file of
+the variant constraints, see Variant.from_dict, e.g.
+
+    {"windows": true, "cages": [[10, ["A1", "A2", "B1"]], [17, ["A3", "A4"]]]}
+"""
+import argparse
+import json
+import mmap
+import sys
+from itertools import islice, tee
+
+from src import solver
+from src.batch import solve_many, EXCEEDED
+from src.packed import Corpus, is_corpus, write_corpus
+from src.strategies import STRATEGIES
+from src.topology import Topology, Variant, MAX_SIZE, PLACEHOLDER
+from src.validation import validate_grids, ERROR_NAMES
+from src.vectorized import solve_batch
+
+NUMPY = 'numpy'
+FORMATS = ('solution', 'pair', 'json')
+UNSOLVABLE = 'unsolvable'
+INVALID = 'invalid'
+
+
+def read_lines(path):
+    """ Lines of a file through a read-only memory map, or of standard input for '-' """
+    if path == '-':
+        for line in sys.stdin.buffer:
+            yield line
+        return
+    with open(path, 'rb') as stream:
+        try:
+            memory = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+        try:
+            for line in iter(memory.readline, b''):
+                yield line
+        finally:
+            memory.close()
+
+
+def read_grids(paths):
+    """ Grids in string form from all the given files, in order """
+    for path in paths:
+        if path != '-' and is_corpus(path):
+            with Corpus(path) as corpus:
+                for grid in corpus:
+                    yield grid
+            continue
+        for line in read_lines(path):
+            line = line.strip()
+            if line and not line.startswith(b'#'):
+                line = line.decode('ascii', 'backslashreplace')
+                yield line if ' ' in line or ',' in line else line.replace('0', '.')
+
+
+def format_result(output_format, grid, solution, key='solution'):
+    if output_format == 'json':
+        if solution == EXCEEDED:
+            return json.dumps({'puzzle': grid, 'solution': None, 'exceeded': True})
+        if solution == INVALID:
+            return json.dumps({'puzzle': grid, 'solution': None, 'invalid': True})
+        return json.dumps({'puzzle': grid, key: solution})
+    solution = solution or UNSOLVABLE
+    if output_format == 'pair':
+        return grid + ',' + solution
+    return solution
+
+
+def solve_numpy(grids, chunksize, diagonal, size=3, variant=None):
+    """ Solve grids with the vectorized backend, chunksize puzzles at a time """
+    topology = Topology.get(diagonal, size, variant)
+    while True:
+        batch = [topology.format(topology.parse(grid)) for grid in islice(grids, chunksize)]
+        if not batch:
+            return
+        for solution in solve_batch(batch, topology):
+            yield solution
+
+
+def validate(grids, chunksize, diagonal, size=3, variant=None):
+    """ Error names of grids, see src.validation, chunksize grids at a time """
+    topology = Topology.get(diagonal, size, variant)
+    while True:
+        batch = [normalize(topology, grid) for grid in islice(grids, chunksize)]
+        if not batch:
+            return
+        for code in validate_grids(batch, topology):
+            yield ERROR_NAMES[code]
+
+
+def normalize(topology, grid):
+    """ One character per box of a grid given as numbers, unchanged if it has the wrong length """
+    if ' ' not in grid and ',' not in grid:
+        return grid
+    try:
+        return topology.format(topology.parse(grid))
+    except (AssertionError, ValueError):
+        return grid
+
+
+def puzzles_of(grids, topology):
+    """ One character per box of each grid, None for grids of the wrong length or with other symbols """
+    valid = set(topology.symbols + PLACEHOLDER)
+    for grid in grids:
+        try:
+            symbols = topology.parse(grid)
+        except (AssertionError, ValueError):
+            yield None
+            continue
+        yield topology.format(symbols) if valid.issuperset(symbols) else None
+
+
+def with_invalid(puzzles, solutions):
+    """ Solutions of the valid puzzles, in order with INVALID for the others """
+    for puzzle in puzzles:
+        yield INVALID if puzzle is None else next(solutions)
+
+
+def strategy_names(value):
+    """ Registered strategy names of a comma separated list, possibly empty """
+    names = [name for name in value.split(',') if name]
+    unknown = [name for name in names if name not in STRATEGIES]
+    if unknown:
+        raise argparse.ArgumentTypeError("unknown strategies: " + ', '.join(unknown))
+    return names
+
+
+def variant_file(path):
+    """ Variant of a json file of variant constraints """
+    try:
+        with open(path) as stream:
+            return Variant.from_dict(json.load(stream))
+    except (OSError, ValueError, TypeError, AttributeError) as error:
+        raise argparse.ArgumentTypeError("invalid variant file " + path + ": " + str(error))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve Sudoku grids, one grid per line.")
+    parser.add_argument('paths', nargs='*', default=['-'], help="puzzle files, '-' for standard input")
+    parser.add_argument('--format', choices=FORMATS, default='solution',
+                        help="output the solution, the 'puzzle,solution' pair or a json object per line")
+    parser.add_argument('--backend', choices=sorted(solver.BACKENDS) + [NUMPY], default=solver.PROPAGATION)
+    parser.add_argument('--workers', type=int, default=1, help="solver processes, 0 for one per cpu")
+    parser.add_argument('--chunksize', type=int, default=256, help="puzzles sent to a worker at a time")
+    parser.add_argument('--diagonal', action='store_true', help="solve diagonal Sudoku")
+    parser.add_argument('--size', type=int, choices=range(2, MAX_SIZE + 1),
+                        help="box size, 3 for 9x9 and 4 for 16x16 boards, by default 3 or the size of the corpus files")
+    parser.add_argument('--variant', type=variant_file, metavar='JSON',
+                        help="json file of jigsaw regions, windows, extra units and killer cages")
+    parser.add_argument('--validate', action='store_true',
+                        help="check the symbols and givens of the grids instead of solving them")
+    parser.add_argument('--pack', metavar='CORPUS', help="write the grids to a packed corpus file instead of solving them")
+    parser.add_argument('--max-nodes', type=int, help="search nodes per grid before giving up, unlimited by default")
+    parser.add_argument('--timeout', type=float, help="seconds per grid before giving up, unlimited by default")
+    parser.add_argument('--strategies', type=strategy_names, default=None,
+                        help="comma separated strategies run past eliminate and only choice, "
+                             "e.g. 'naked_subset,intersection', all of " + ','.join(sorted(STRATEGIES)) + " by default")
+    args = parser.parse_args(argv)
+    if args.backend == NUMPY and (args.max_nodes is not None or args.timeout is not None):
+        parser.error("the numpy backend has no search budget")
+    if args.backend == NUMPY and args.strategies is not None:
+        parser.error("the numpy backend has no strategies")
+    shape = corpus_shape(parser, args)
+    if shape is not None:
+        # the board shape of corpus files comes from their header
+        diagonal, size = shape
+        if args.variant is not None or args.diagonal and not diagonal or args.size not in (None, size):
+            parser.error("the corpus files hold " + ("diagonal " if diagonal else "") + "grids of box size " +
+                         str(size) + ", without a variant")
+        args.diagonal, args.size = diagonal, size
+    if args.size is None:
+        args.size = 3
+    if args.variant is not None:
+        if args.pack:
+            parser.error("corpus files hold classic and diagonal grids only")
+        try:
+            Topology.get(args.diagonal, args.size, args.variant)
+        except ValueError as error:
+            parser.error(str(error))
+    return args
+
+
+def corpus_shape(parser, args):
+    """ (diagonal, size) of the corpus files among the paths, None if there is none """
+    shapes = set()
+    for path in args.paths:
+        if path == '-':
+            continue
+        try:
+            if is_corpus(path):
+                with Corpus(path) as corpus:
+                    shapes.add((corpus.topology.diagonal, corpus.topology.size))
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    if len(shapes) > 1:
+        parser.error("the corpus files hold grids of different board shapes")
+    return shapes.pop() if shapes else None
+
+
+def main(argv=None, output=None):
+    args = parse_args(argv)
+    output = output or sys.stdout
+    topology = Topology.get(args.diagonal, args.size, args.variant)
+    if args.pack:
+        write_corpus(args.pack, (puzzle for puzzle in puzzles_of(read_grids(args.paths), topology)
+                                 if puzzle is not None), topology)
+        return 0
+
+    grids, puzzles = tee(read_grids(args.paths))
+
+    if not args.validate:
+        checked, puzzles = tee(puzzles_of(puzzles, topology))
+        puzzles = (puzzle for puzzle in puzzles if puzzle is not None)
+    if args.validate:
+        results = validate(puzzles, args.chunksize, args.diagonal, args.size, args.variant)
+    elif args.backend == NUMPY:
+        results = solve_numpy(puzzles, args.chunksize, args.diagonal, args.size, args.variant)
+    else:
+        results = solve_many(puzzles, workers=args.workers or None, chunksize=args.chunksize,
+                             diagonal=args.diagonal, backend=args.backend, size=args.size,
+                             max_nodes=args.max_nodes, timeout=args.timeout, strategies=args.strategies,
+                             variant=args.variant)
+    solutions = results if args.validate else with_invalid(checked, results)
+    key = 'validation' if args.validate else 'solution'
+
+    try:
+        for grid, solution in zip(grids, solutions):
+            output.write(format_result(args.format, grid, solution, key) + '\n')
+    finally:
+        # stops the pool of solve_many here rather than whenever the suspended generator is collected
+        results.close()
+    output.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+from weakref import WeakKeyDictionary
+
+_templates = WeakKeyDictionary()
+
+
+def _template(topology):
+    """
+    Exact cover matrix of a topology as dancing links arrays, built once per shape,
+    whatever its killer cages, and copied per puzzle.
+
+    Node 0 is the root, nodes 1..columns are the column headers, then one row
+    per (box, digit) with a node in the box column and in each (unit, digit) column.
+    """
+    topology = topology.shape
+    if topology not in _templates:
+        digits = len(topology.symbols)
+        cells = len(topology.boxes)
+        columns = cells + len(topology.unitlist) * digits
+        left = [column - 1 for column in range(columns + 1)]
+        right = [column + 1 for column in range(columns + 1)]
+        left[0], right[columns] = columns, 0
+        up = list(range(columns + 1))
+        down = list(range(columns + 1))
+        column_of = list(range(columns + 1))
+        size = [0] * (columns + 1)
+        row_of = [-1] * (columns + 1)
+        row_nodes = []
+
+        for cell in range(cells):
+            for digit in range(digits):
+                row_columns = [cell] + [cells + unit * digits + digit for unit in topology.cell_units[cell]]
+                first = len(column_of)
+                row_nodes.append(first)
+                for position, column in enumerate(row_columns):
+                    header = column + 1
+                    node = len(column_of)
+                    left.append(first + (position - 1) % len(row_columns))
+                    right.append(first + (position + 1) % len(row_columns))
+                    up.append(up[header])
+                    down.append(header)
+                    down[up[header]] = node
+                    up[header] = node
+                    column_of.append(header)
+                    row_of.append(cell * digits + digit)
+                    size[header] += 1
+        _templates[topology] = (left, right, up, down, column_of, size, row_of, row_nodes)
+    return _templates[topology]
+
+
+def _union(masks):
+    union = 0
+    for mask in masks:
+        union |= mask
+    return union
+
+
+class DancingLinks(object):
+    """ Algorithm X on dancing links over the cell and (unit, digit) constraints of a topology.
+
+    Killer cages are not columns of the matrix: a row is skipped when its digit is
+    already taken in the cage of its box, or when no combination of digits adding up
+    to the total of the cage holds it with the digits taken. Once a row is taken, the
+    cages around its box keep to the combinations within the digits taken and left in
+    their open boxes, the rows of other digits being unlinked, so that the column
+    sizes the search branches on keep to the sums, and linked back when it backtracks.
+    """
+    __slots__ = ('left', 'right', 'up', 'down', 'column', 'size', 'row', 'solution', 'stats', 'budget',
+                 'digits', 'all_digits', 'row_nodes', 'peers', 'cages', 'cage_of', 'cage_combinations', 'cage_digits')
+
+    def __init__(self, candidates):
+        topology = candidates.topology
+        left, right, up, down, column, size, row, row_nodes = _template(topology)
+        self.left, self.right, self.up, self.down = list(left), list(right), list(up), list(down)
+        self.column, self.size, self.row = column, list(size), row
+        self.solution = []
+        self.stats = candidates.stats
+        self.budget = candidates.budget
+
+        digits = self.digits = len(topology.symbols)
+        self.row_nodes = row_nodes
+        self.peers = topology.peers
+        self.all_digits = topology.all_digits
+        self.cages = topology.cages
+        self.cage_of = topology.cage_of or None
+        self.cage_combinations = topology.cage_combinations
+        self.cage_digits = [0] * len(topology.cages)
+        for cell, mask in enumerate(candidates.cells):
+            if self.cage_of is not None and self.cage_of[cell] is not None:
+                mask &= _union(self.cage_combinations[self.cage_of[cell]])
+            for digit in range(digits):
+                if not mask >> digit & 1:
+                    self.__remove_row(row_nodes[cell * digits + digit])
+
+    def search(self, depth=0):
+        """ True if an exact cover exists, leaving its rows in ``solution`` """
+        right, size, down = self.right, self.size, self.down
+        if self.stats is not None:
+            self.stats.node(depth)
+        if self.budget is not None:
+            self.budget.node()
+        if right[0] == 0:
+            return True
+
+        best = right[0]
+        column = right[best]
+        while column != 0:
+            if size[column] < size[best]:
+                best = column
+            column = right[column]
+        if size[best] == 0:
+            return False
+
+        self.__cover(best)
+        node = down[best]
+        while node != best:
+            row = self.row[node]
+            if self.cage_of is None or self.__enter_cage(row):
+                self.solution.append(row)
+                self.__cover_row(node)
+                hidden = [] if self.cage_of is not None else None
+                if (hidden is None or self.__narrow_cages(row // self.digits, hidden)) and self.search(depth + 1):
+                    return True
+                if hidden:
+                    self.__restore_rows(hidden)
+                self.__uncover_row(node)
+                self.solution.pop()
+                if self.cage_of is not None:
+                    self.__leave_cage(row)
+                if self.stats is not None:
+                    self.stats.backtracks += 1
+            node = down[node]
+        self.__uncover(best)
+        return False
+
+    def __enter_cage(self, row):
+        """ Take the digit of a row in the cage of its box, False if no combination of the cage holds it """
+        cell, digit = divmod(row, self.digits)
+        cage = self.cage_of[cell]
+        if cage is None:
+            return True
+        taken = self.cage_digits[cage]
+        if taken >> digit & 1:
+            return False
+        taken |= 1 << digit
+        for combination in self.cage_combinations[cage]:
+            if combination & taken == taken:
+                self.cage_digits[cage] = taken
+                return True
+        return False
+
+    def __narrow_cages(self, cell, hidden):
+        """
+        Keep the cages around a box taking a digit to the combinations still fitting their open boxes.
+
+        The cage of the box and the cages of its peers, which may have lost the digit, get the
+        rows of their open boxes whose digit fits no combination left unlinked, until nothing
+        changes. Unlinked rows are appended to ``hidden`` by their first node, in order.
+
+        Returns:
+            False if a cage has no combination left, True otherwise.
+        """
+        digits, cage_of, cages = self.digits, self.cage_of, self.cages
+        left, right, up, down, row = self.left, self.right, self.up, self.down, self.row
+        around = set(cage_of[peer] for peer in self.peers[cell]) | {cage_of[cell]}
+        around.discard(None)
+        for cage in around:
+            taken = self.cage_digits[cage]
+            while True:
+                live, open_cells = 0, []
+                for other in cages[cage]:
+                    header = other + 1
+                    # the column of a solved box is covered
+                    if right[left[header]] == header:
+                        mask, node = 0, down[header]
+                        while node != header:
+                            mask |= 1 << row[node] % digits
+                            node = down[node]
+                        open_cells.append((other, mask))
+                        live |= mask
+                # a combination fits if it holds the digits taken, and a live digit of every open box within the others
+                fitting, allowed, required = False, 0, self.all_digits
+                for combination in self.cage_combinations[cage]:
+                    rest = combination & ~taken
+                    if combination & taken == taken and rest & ~live == 0 and \
+                            all(mask & rest for _, mask in open_cells):
+                        fitting = True
+                        allowed |= rest
+                        required &= rest
+                if not fitting:
+                    return False
+                changed = False
+                keep = [allowed] * len(open_cells)
+                # a digit of every fitting combination left in a single open box is the digit of the box
+                while required:
+                    digit = required & -required
+                    required &= required - 1
+                    holding = [index for index, (_, mask) in enumerate(open_cells) if mask & digit]
+                    if len(holding) == 1:
+                        keep[holding[0]] &= digit
+                for (other, mask), kept in zip(open_cells, keep):
+                    excluded = mask & ~kept
+                    while excluded:
+                        digit = (excluded & -excluded).bit_length() - 1
+                        excluded &= excluded - 1
+                        first = self.row_nodes[other * digits + digit]
+                        self.__remove_row(first)
+                        hidden.append(first)
+                        changed = True
+                if not changed:
+                    break
+        return True
+
+    def __restore_rows(self, hidden):
+        up, down, size, column, left = self.up, self.down, self.size, self.column, self.left
+        for first in reversed(hidden):
+            node = left[first]
+            while True:
+                size[column[node]] += 1
+                up[down[node]] = node
+                down[up[node]] = node
+                if node == first:
+                    break
+                node = left[node]
+
+    def __leave_cage(self, row):
+        cell, digit = divmod(row, self.digits)
+        cage = self.cage_of[cell]
+        if cage is not None:
+            self.cage_digits[cage] &= ~(1 << digit)
+
+    def __remove_row(self, first):
+        up, down, size, column = self.up, self.down, self.size, self.column
+        node = first
+        while True:
+            down[up[node]] = down[node]
+            up[down[node]] = up[node]
+            size[column[node]] -= 1
+            node = self.right[node]
+            if node == first:
+                break
+
+    def __cover_row(self, first):
+        node = self.right[first]
+        while node != first:
+            self.__cover(self.column[node])
+            node = self.right[node]
+
+    def __uncover_row(self, first):
+        node = self.left[first]
+        while node != first:
+            self.__uncover(self.column[node])
+            node = self.left[node]
+
+    def __cover(self, header):
+        left, right, up, down, size, column = self.left, self.right, self.up, self.down, self.size, self.column
+        left[right[header]] = left[header]
+        right[left[header]] = right[header]
+        row = down[header]
+        while row != header:
+            node = right[row]
+            while node != row:
+                up[down[node]] = up[node]
+                down[up[node]] = down[node]
+                size[column[node]] -= 1
+                node = right[node]
+            row = down[row]
+
+    def __uncover(self, header):
+        left, right, up, down, size, column = self.left, self.right, self.up, self.down, self.size, self.column
+        row = up[header]
+        while row != header:
+            node = left[row]
+            while node != row:
+                size[column[node]] += 1
+                up[down[node]] = node
+                down[up[node]] = node
+                node = left[node]
+            row = up[row]
+        left[right[header]] = header
+        right[left[header]] = header
+
+
+def search(candidates):
+    """
+    Solve the sudoku as an exact cover problem with dancing links.
+
+    Killer cages having no column of their own, the candidates of a topology with
+    cages are propagated first, so that the sums narrow the rows of the matrix.
+
+    Args:
+        candidates: Candidates to solve in place, only their remaining digits are tried.
+    Returns:
+        candidates solved, or False if no solution exists.
+    Raises:
+        BudgetExceeded: if the budget attached to the candidates is spent first.
+    """
+    if candidates.topology.cages and candidates.propagate() is False:
+        return False
+    links = DancingLinks(candidates)
+    if not links.search():
+        return False
+    digits = len(candidates.topology.symbols)
+    for row in links.solution:
+        candidates.assign(row // digits, 1 << row % digits)
+    return candidates
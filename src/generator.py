@@ -0,0 +1,225 @@
+"""
+Generate puzzles with a unique solution on top of the solver.
+
+    python -m src.generator --count 1000 [--clues 26] [--symmetry rotational] [--seed 1] [--workers 4]
+
+A full solution is filled at random through the candidate engine, then clues are
+removed one symmetry orbit at a time, keeping only removals which leave the
+solution unique. Each puzzle is drawn from its own seed, derived from the
+stream seed and its index, so a stream is reproducible whatever the number of
+processes.
+"""
+import argparse
+import os
+import sys
+from functools import partial
+from itertools import count as counter, islice
+from multiprocessing import Pool, cpu_count
+from random import Random
+
+from src.candidates import Candidates
+from src.topology import Topology, MAX_SIZE
+
+NONE = 'none'
+ROTATIONAL = 'rotational'
+HORIZONTAL = 'horizontal'
+VERTICAL = 'vertical'
+SYMMETRIES = (NONE, ROTATIONAL, HORIZONTAL, VERTICAL)
+
+_orbits = {}
+
+
+def orbits(topology, symmetry=NONE):
+    """
+    Boxes whose clues are removed together to keep the puzzle symmetric.
+
+    Args:
+        topology: Topology of the board.
+        symmetry: 'none', 'rotational' (180 degrees), 'horizontal' (left to right mirror)
+            or 'vertical' (top to bottom mirror).
+    Returns:
+        tuple of tuples of box indexes, every box in exactly one of them.
+    """
+    if symmetry not in SYMMETRIES:
+        raise ValueError("unknown symmetry: " + str(symmetry))
+    key = (topology, symmetry)
+    if key not in _orbits:
+        dimension = len(topology.rows)
+        last = dimension - 1
+        images = {
+            NONE: lambda row, column: (row, column),
+            ROTATIONAL: lambda row, column: (last - row, last - column),
+            HORIZONTAL: lambda row, column: (row, last - column),
+            VERTICAL: lambda row, column: (last - row, column),
+        }[symmetry]
+        seen = set()
+        result = []
+        for cell in range(len(topology.boxes)):
+            if cell not in seen:
+                image = images(*divmod(cell, dimension))
+                orbit = tuple(sorted({cell, image[0] * dimension + image[1]}))
+                seen.update(orbit)
+                result.append(orbit)
+        _orbits[key] = tuple(result)
+    return _orbits[key]
+
+
+def random_solution(topology, rng):
+    """
+    Fill a board at random through propagation and a depth-first search
+    trying the candidates of each box in random order.
+
+    Returns:
+        solved Candidates.
+    """
+    candidates = Candidates([topology.all_digits] * len(topology.boxes), topology)
+    candidates.reduce_puzzle()
+    del candidates.trail[:]
+    return _fill(candidates, rng)
+
+
+def _fill(candidates, rng):
+    if candidates.is_solved():
+        return candidates
+    cells, popcount = candidates.cells, candidates.topology.popcount
+    fewest = min(popcount[mask] for mask in cells if popcount[mask] > 1)
+    cell = rng.choice([cell for cell, mask in enumerate(cells) if popcount[mask] == fewest])
+    digits = [1 << digit for digit in candidates.topology.digit_indexes[cells[cell]]]
+    rng.shuffle(digits)
+    mark = candidates.mark()
+    for bit in digits:
+        candidates.assign(cell, bit)
+        if candidates.propagate([cell]) is not False and _fill(candidates, rng):
+            return candidates
+        candidates.undo(mark)
+    return False
+
+
+def has_other_solution(cells, topology, solution, orbit):
+    """ Check if a puzzle solved by ``solution`` has another solution differing in one of the orbit boxes.
+
+    A puzzle obtained by removing the orbit clues of a puzzle with a unique solution
+    can only have other solutions differing in those boxes, so each of them is
+    searched with its solution digit excluded.
+    """
+    for cell in orbit:
+        candidates = Candidates(list(cells), topology)
+        candidates.cells[cell] &= ~solution[cell]
+        if candidates.search():
+            return True
+    return False
+
+
+def generate_puzzle(topology, rng, clues=None, symmetry=NONE):
+    """
+    Args:
+        topology: Topology of the board, e.g. Topology.get(diagonal=True) for diagonal Sudoku.
+        rng: random.Random drawing the solution and the order the clues are removed in.
+        clues: number of clues to stop at, as few as possible by default. Puzzles
+            keep more clues when no removal leaves a unique solution.
+        symmetry: see orbits.
+    Returns:
+        (puzzle, solution) grids in string form.
+    """
+    solution = random_solution(topology, rng)
+    solved = list(solution.cells)
+    cells = list(solved)
+    remaining = len(cells)
+    shuffled = list(orbits(topology, symmetry))
+    rng.shuffle(shuffled)
+    for orbit in shuffled:
+        if clues is not None and remaining - len(orbit) < clues:
+            continue
+        for cell in orbit:
+            cells[cell] = topology.all_digits
+        if has_other_solution(cells, topology, solved, orbit):
+            for cell in orbit:
+                cells[cell] = solved[cell]
+        else:
+            remaining -= len(orbit)
+            if remaining == clues:
+                break
+    return Candidates(cells, topology).to_grid(), solution.to_grid()
+
+
+def generate_seeded(topology, clues, symmetry, seed, index):
+    """ Puzzle ``index`` of the stream drawn from ``seed``, see generate_puzzle """
+    return generate_puzzle(topology, Random('%s:%d' % (seed, index)), clues, symmetry)
+
+
+def _generate_item(diagonal, size, clues, symmetry, seed, index):
+    return generate_seeded(Topology.get(diagonal, size), clues, symmetry, seed, index)
+
+
+def generate(count=None, clues=None, symmetry=NONE, diagonal=False, size=3, seed=None, workers=1, chunksize=16):
+    """
+    Stream puzzles with a unique solution.
+
+    Args:
+        count: number of puzzles, endless by default.
+        clues: number of clues to stop at, see generate_puzzle.
+        symmetry: see orbits.
+        diagonal: True to generate diagonal Sudoku.
+        size: box size of the board, 3 for 9x9 Sudoku.
+        seed: seed of the stream, random by default.
+        workers: number of processes, cpu count if None; 1 generates in process.
+        chunksize: number of puzzles generated by a worker at a time.
+    Returns:
+        generator of (puzzle, solution) grids in string form, in the same order
+        for the same seed whatever the number of workers.
+    """
+    # fail before starting the workers on an unknown symmetry
+    orbits(Topology.get(diagonal, size), symmetry)
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'big')
+    generate_item = partial(_generate_item, diagonal, size, clues, symmetry, seed)
+    indexes = counter() if count is None else iter(range(count))
+    workers = workers or cpu_count()
+
+    if workers == 1:
+        for pair in map(generate_item, indexes):
+            yield pair
+        return
+
+    window = workers * chunksize * 4
+    pool = Pool(workers)
+    try:
+        while True:
+            batch = list(islice(indexes, window))
+            if not batch:
+                break
+            for pair in pool.imap(generate_item, batch, chunksize):
+                yield pair
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles with a unique solution.")
+    parser.add_argument('--count', type=int, help="number of puzzles, endless by default")
+    parser.add_argument('--clues', type=int, help="number of clues to stop at, as few as possible by default")
+    parser.add_argument('--symmetry', choices=SYMMETRIES, default=NONE)
+    parser.add_argument('--diagonal', action='store_true', help="generate diagonal Sudoku")
+    parser.add_argument('--size', type=int, default=3, choices=range(2, MAX_SIZE + 1),
+                        help="box size, 3 for 9x9 and 4 for 16x16 boards")
+    parser.add_argument('--seed', help="seed of the stream, random by default")
+    parser.add_argument('--workers', type=int, default=1, help="generator processes, 0 for one per cpu")
+    parser.add_argument('--chunksize', type=int, default=16, help="puzzles generated by a worker at a time")
+    parser.add_argument('--solutions', action='store_true', help="output 'puzzle,solution' pairs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None, output=None):
+    args = parse_args(argv)
+    output = output or sys.stdout
+    puzzles = generate(args.count, args.clues, args.symmetry, args.diagonal, args.size, args.seed,
+                       args.workers or None, args.chunksize)
+    for puzzle, solution in puzzles:
+        output.write((puzzle + ',' + solution if args.solutions else puzzle) + '\n')
+    output.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Packed binary grids, and corpus files of fixed-size packed grid records.
+
+A packed grid stores each box in ``box_bits`` bits, 0 for an empty box and
+the number of its symbol otherwise, box 0 in the lowest bits. A 9x9 grid
+takes 4 bits per box, two boxes per byte, so 41 bytes instead of 81.
+
+A corpus file is a 16 byte header followed by ``count`` packed grids of
+``record_size`` bytes each. Record ``i`` starts at ``HEADER.size + i * record_size``,
+so a Corpus reads any grid or range of grids through a memory map without
+parsing the rest of the file, and workers can split a corpus by offset.
+"""
+import mmap
+import os
+import struct
+
+from src.topology import Topology, PLACEHOLDER
+
+MAGIC = b'SDKP'
+VERSION = 1
+# magic, version, box size, diagonal flag, number of records
+HEADER = struct.Struct('<4sHBBQ')
+
+_tables = {}
+
+
+def box_bits(topology):
+    """ Number of bits of a box in a packed grid, 4 for 9x9 boards """
+    return len(topology.symbols).bit_length()
+
+
+def record_size(topology):
+    """ Number of bytes of a packed grid """
+    return (len(topology.boxes) * box_bits(topology) + 7) // 8
+
+
+def _codes(topology):
+    """
+    Returns:
+        numbers: number of the placeholder and of each symbol.
+        symbols: symbol of each number, '\\0' for numbers past the symbols.
+        pairs: symbols of the two boxes of each byte, for boards of 4 bits per box.
+    """
+    key = topology.symbols
+    if key not in _tables:
+        numbers = dict((symbol, number) for number, symbol in enumerate(PLACEHOLDER + topology.symbols))
+        symbols = (PLACEHOLDER + topology.symbols).ljust(1 << box_bits(topology), '\0')
+        pairs = None
+        if box_bits(topology) == 4:
+            pairs = tuple(symbols[byte & 15] + symbols[byte >> 4] for byte in range(256))
+        _tables[key] = numbers, symbols, pairs
+    return _tables[key]
+
+
+def pack_grid(grid, topology=None):
+    """
+    Args:
+        grid: grid in string form, see Topology.parse.
+        topology: Topology of the grid.
+    Returns:
+        packed grid in bytes, of record_size(topology) bytes.
+    """
+    topology = topology or Topology.get()
+    numbers, _, _ = _codes(topology)
+    try:
+        values = [numbers[symbol] for symbol in topology.parse(grid)]
+    except KeyError as error:
+        raise ValueError("grid contains a not valid value: " + error.args[0])
+    bits = box_bits(topology)
+    if bits == 4:
+        # the low and high boxes of every byte, joined by one shift and add without carries
+        values = bytes(values)
+        packed = int.from_bytes(values[::2], 'little') + (int.from_bytes(values[1::2], 'little') << 4)
+        return packed.to_bytes(record_size(topology), 'little')
+    packed = 0
+    for value in reversed(values):
+        packed = packed << bits | value
+    return packed.to_bytes(record_size(topology), 'little')
+
+
+def unpack_grid(data, topology=None):
+    """
+    Args:
+        data: packed grid, bytes or any bytes-like object such as a memoryview.
+        topology: Topology of the grid.
+    Returns:
+        grid in string form, one symbol per box and '.' for empty boxes.
+    """
+    topology = topology or Topology.get()
+    if len(data) != record_size(topology):
+        raise ValueError("packed grid should have " + str(record_size(topology)) + " bytes")
+    _, symbols, pairs = _codes(topology)
+    boxes, bits = len(topology.boxes), box_bits(topology)
+    if bits == 4:
+        grid = ''.join([pairs[byte] for byte in memoryview(data).cast('B')])[:boxes]
+    else:
+        packed, mask = int.from_bytes(data, 'little'), (1 << bits) - 1
+        grid = ''.join(symbols[packed >> (bits * cell) & mask] for cell in range(boxes))
+    if '\0' in grid:
+        raise ValueError("packed grid contains a not valid value")
+    return grid
+
+
+def write_corpus(path, grids, topology=None):
+    """
+    Write grids to a corpus file, replacing it once complete.
+
+    Args:
+        path: corpus file.
+        grids: iterable of grids in string form, see Topology.parse.
+        topology: Topology shared by the grids, of a classic or diagonal board.
+    Returns:
+        number of grids written.
+    """
+    topology = topology or Topology.get()
+    if topology.variant is not None:
+        raise ValueError("corpus files hold classic and diagonal grids only")
+    temporary = path + '.tmp'
+    count = 0
+    with open(temporary, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, VERSION, topology.size, topology.diagonal, 0))
+        for grid in grids:
+            output.write(pack_grid(grid, topology))
+            count += 1
+        output.seek(0)
+        output.write(HEADER.pack(MAGIC, VERSION, topology.size, topology.diagonal, count))
+    os.replace(temporary, path)
+    return count
+
+
+def is_corpus(path):
+    """ True if the file starts like a corpus file """
+    with open(path, 'rb') as stream:
+        return stream.read(len(MAGIC)) == MAGIC
+
+
+class Corpus(object):
+    """ Grids of a corpus file, read through a read-only memory map.
+
+    Grids are read by index, ``corpus[i]``, or as packed records. ``record`` and
+    ``shard`` return memoryviews into the map, which should be released before
+    the corpus is closed.
+
+    Args:
+        path: corpus file written by write_corpus.
+    """
+    __slots__ = ('path', 'topology', 'record_size', 'count', 'stream', 'memory')
+
+    def __init__(self, path):
+        self.path = path
+        self.stream = open(path, 'rb')
+        try:
+            header = self.stream.read(HEADER.size)
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(path + " is not a corpus file")
+            _, version, size, diagonal, self.count = HEADER.unpack(header)
+            if version != VERSION:
+                raise ValueError(path + " has an unknown corpus version: " + str(version))
+            self.topology = Topology.get(bool(diagonal), size)
+            self.record_size = record_size(self.topology)
+            if os.fstat(self.stream.fileno()).st_size != self.offset(self.count):
+                raise ValueError(path + " should hold " + str(self.count) + " grids")
+            self.memory = mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.stream.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """ Grid in string form at an index, negative indexes counting from the end """
+        start = self.offset(self.__index(index))
+        return unpack_grid(self.memory[start:start + self.record_size], self.topology)
+
+    def __iter__(self):
+        return self.grids()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.memory.close()
+        self.stream.close()
+
+    def offset(self, index):
+        """ Position of a record in the file """
+        return HEADER.size + index * self.record_size
+
+    def record(self, index):
+        """ Packed grid at an index, as a memoryview into the file """
+        start = self.offset(self.__index(index))
+        return memoryview(self.memory)[start:start + self.record_size]
+
+    def shard(self, start, stop):
+        """ Packed grids from start to stop, as one memoryview into the file """
+        return memoryview(self.memory)[self.offset(start):self.offset(min(stop, self.count))]
+
+    def shards(self, size):
+        """ (start, stop) index ranges of at most size grids covering the corpus """
+        return [(start, min(start + size, self.count)) for start in range(0, self.count, size)]
+
+    def grids(self, start=0, stop=None):
+        """ Grids in string form from start to stop """
+        stop = self.count if stop is None else min(stop, self.count)
+        for index in range(start, stop):
+            yield self[index]
+
+    def __index(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("corpus index out of range")
+        return index
@@ -0,0 +1,229 @@
+"""
+Search of a single puzzle over a pool of processes.
+
+    python -m src.parallel GRID [--count 1000] [--workers 4] [--depth 3] [--size 4]
+
+The search tree is expanded up to a frontier of subtrees, which are sent to
+the workers as packed candidates, see Candidates.to_bytes. A worker searching
+a subtree for more than ``split_nodes`` nodes stops and gives back the branches
+it has left, see Candidates.unexplored, which are queued ahead of the other
+subtrees. An unbalanced branch is so shared by idle workers rather than left
+to one, without searching any node twice, while the queue is still taken in
+depth-first order. The pool is stopped as soon as a solution is found, or once
+the solution counts of the subtrees add up to the limit.
+"""
+import argparse
+import sys
+from collections import deque
+from functools import partial
+from multiprocessing import Pool, cpu_count
+from queue import Queue
+
+from src.budget import Budget, BudgetExceeded
+from src.candidates import Candidates
+from src.topology import Topology, MAX_SIZE
+
+# subtrees per worker the frontier is expanded to by default
+SUBTREES_PER_WORKER = 8
+SPLIT_NODES = 2000
+
+
+def frontier(candidates, depth=1, width=None):
+    """
+    Expand the search tree of propagated candidates, branching on a box with the fewest candidates.
+
+    Args:
+        candidates: propagated Candidates, left unchanged.
+        depth: number of levels to expand.
+        width: if given, expand levels until the frontier holds at least width subtrees instead.
+    Returns:
+        solved: Candidates solved within the expanded levels.
+        subtrees: open Candidates at the frontier, propagated, in search order.
+    """
+    popcount, digit_indexes = candidates.topology.popcount, candidates.topology.digit_indexes
+    solved, subtrees, levels = [], [candidates], 0
+    while subtrees and (len(subtrees) < width if width is not None else levels < depth):
+        level = []
+        for subtree in subtrees:
+            cells = subtree.cells
+            _, cell = min((popcount[mask], cell) for cell, mask in enumerate(cells) if popcount[mask] > 1)
+            for digit in digit_indexes[cells[cell]]:
+                child = subtree.copy()
+                child.assign(cell, 1 << digit)
+                if child.propagate([cell]) is False:
+                    continue
+                del child.trail[:]
+                (solved if child.is_solved() else level).append(child)
+        subtrees = level
+        levels += 1
+    return solved, subtrees
+
+
+def search_subtree(diagonal, size, split_nodes, packed, limit=None, variant=None):
+    """
+    Search one subtree in a worker, splitting it once ``split_nodes`` nodes are searched.
+
+    Args:
+        diagonal, size, variant: shape and variant of the board, see Topology.get.
+        split_nodes: nodes searched before splitting the subtree, None to never split.
+        packed: propagated subtree in the packed form of Candidates.to_bytes.
+        limit: number of solutions to count up to, None to stop at the first solution.
+    Returns:
+        (count, solution, branches) where count is the number of solutions found,
+        solution the first of them packed or None, and branches the packed subtrees
+        left to search if the subtree was split, see Candidates.unexplored.
+    """
+    candidates = Candidates.from_bytes(packed, Topology.get(diagonal, size, variant))
+    candidates.budget = Budget(max_nodes=split_nodes) if split_nodes is not None else None
+    stack, count = [], 0
+    try:
+        for solution in candidates.solutions(stack):
+            if limit is None:
+                return 1, solution.to_bytes(), []
+            count += 1
+            if count >= limit:
+                break
+    except BudgetExceeded:
+        return count, None, [branch.to_bytes() for branch in candidates.unexplored(stack)]
+    return count, None, []
+
+
+def search(candidates, workers=None, depth=None, split_nodes=SPLIT_NODES):
+    """
+    Solve candidates over a pool of processes.
+
+    Args:
+        candidates: Candidates to solve, propagated in place.
+        workers: number of processes, cpu count by default; 1 searches in process.
+        depth: levels of the frontier sent to the workers, by default as many as
+            needed for SUBTREES_PER_WORKER subtrees per worker.
+        split_nodes: nodes a worker searches a subtree for before splitting it,
+            None to never split.
+    Returns:
+        new Candidates solved, or False if no solution exists. On a puzzle with
+        several solutions, any one of them.
+    """
+    results = _search(candidates, workers, depth, split_nodes, None)
+    try:
+        for count, solution in results:
+            if count:
+                return Candidates.from_bytes(solution, candidates.topology)
+    finally:
+        results.close()
+    return False
+
+
+def count_solutions(candidates, limit=2, workers=None, depth=None, split_nodes=SPLIT_NODES):
+    """
+    Count the solutions of candidates over a pool of processes, see search.
+
+    Returns:
+        number of solutions, at most ``limit``.
+    """
+    total = 0
+    results = _search(candidates, workers, depth, split_nodes, limit)
+    try:
+        for count, _ in results:
+            total += count
+            if total >= limit:
+                return limit
+    finally:
+        results.close()
+    return total
+
+
+def _search(candidates, workers, depth, split_nodes, limit):
+    """ (count, packed solution) of the frontier and of every subtree searched, the pool stopped when closed """
+    if candidates.reduce_puzzle() is False:
+        return
+    if candidates.is_solved():
+        yield 1, candidates.to_bytes()
+        return
+    workers = workers or cpu_count()
+    if depth is None:
+        solved, subtrees = frontier(candidates, width=workers * SUBTREES_PER_WORKER)
+    else:
+        solved, subtrees = frontier(candidates, depth)
+    for subtree in solved:
+        yield 1, subtree.to_bytes()
+
+    topology = candidates.topology
+    work = partial(search_subtree, topology.diagonal, topology.size, split_nodes, variant=topology.variant)
+    if limit is not None:
+        limit -= len(solved)
+    results = _results(work, deque(subtree.to_bytes() for subtree in subtrees), workers, limit)
+    try:
+        for count, solution, _ in results:
+            yield count, solution
+    finally:
+        results.close()
+
+
+def _results(work, tasks, workers, limit):
+    """
+    Results of work over a queue of tasks, the branches of a result being queued first.
+    Each task is given the limit less the solutions counted so far, or None when not counting.
+
+    Returns:
+        generator of the results as they are ready, terminating the pool when closed.
+    """
+    if workers == 1:
+        while tasks:
+            result = work(tasks.popleft(), limit)
+            if limit is not None:
+                limit -= result[0]
+            tasks.extendleft(reversed(result[2]))
+            yield result
+        return
+
+    pool, ready, running = Pool(workers), Queue(), 0
+    try:
+        while tasks or running:
+            # keep the queue here, so that the branches of a split are taken next
+            while tasks and running < workers:
+                pool.apply_async(work, (tasks.popleft(), limit), callback=ready.put, error_callback=ready.put)
+                running += 1
+            result = ready.get()
+            running -= 1
+            if isinstance(result, BaseException):
+                raise result
+            if limit is not None:
+                limit -= result[0]
+            tasks.extendleft(reversed(result[2]))
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve one hard Sudoku grid over a pool of processes.")
+    parser.add_argument('grid', help="grid in string form, '.' or '0' for empty boxes")
+    parser.add_argument('--count', type=int, help="count the solutions up to this limit instead of solving")
+    parser.add_argument('--workers', type=int, default=0, help="search processes, 0 for one per cpu")
+    parser.add_argument('--depth', type=int, help="levels of the frontier, by default enough subtrees for the workers")
+    parser.add_argument('--split-nodes', type=int, default=SPLIT_NODES,
+                        help="nodes searched in a subtree before splitting it, 0 to never split")
+    parser.add_argument('--diagonal', action='store_true', help="solve diagonal Sudoku")
+    parser.add_argument('--size', type=int, default=3, choices=range(2, MAX_SIZE + 1),
+                        help="box size, 3 for 9x9 and 4 for 16x16 boards")
+    return parser.parse_args(argv)
+
+
+def main(argv=None, output=None):
+    args = parse_args(argv)
+    output = output or sys.stdout
+    grid = args.grid if ' ' in args.grid or ',' in args.grid else args.grid.replace('0', '.')
+    candidates = Candidates.from_grid(grid, Topology.get(args.diagonal, args.size))
+    split_nodes = args.split_nodes or None
+    if args.count:
+        output.write(str(count_solutions(candidates, args.count, args.workers or None, args.depth, split_nodes)) + '\n')
+    else:
+        solution = search(candidates, args.workers or None, args.depth, split_nodes)
+        output.write((solution.to_grid() if solution else 'unsolvable') + '\n')
+    output.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Long-running solving service answering JSON lines over standard input and
+output, or over a unix socket.
+
+    python -m src.service [--socket /tmp/sudoku.sock] [--workers 4] [--queue 64] [--timeout 10]
+
+Each request line is an object with an id and a puzzle, optionally a timeout
+in seconds and a maximum number of search nodes overriding the service ones:
+
+    {"id": 1, "puzzle": "4.....8.5.3...", "timeout": 2, "max_nodes": 10000}
+
+or cancels a pending request:
+
+    {"id": 1, "cancel": true}
+
+Requests are solved by a pool of processes and answered as soon as they are
+done, out of order, with their id and a status among 'solved', 'unsolvable',
+'timeout', 'exceeded' (out of search nodes), 'cancelled' and 'error':
+
+    {"id": 1, "status": "solved", "solution": "417369825632158947..."}
+
+At most ``queue`` requests of a connection are pending at a time: past them
+the service stops reading the connection until one is answered. Timeouts and
+cancellations also stop the search in the worker, freeing it for the next request.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from functools import partial
+from multiprocessing import Manager
+from time import monotonic
+
+from src import solver
+from src.batch import encode, solve_encoded, EXCEEDED
+from src.topology import Topology, MAX_SIZE
+
+SOLVED = 'solved'
+UNSOLVABLE = 'unsolvable'
+TIMEOUT = 'timeout'
+EXCEEDED_NODES = 'exceeded'
+CANCELLED = 'cancelled'
+ERROR = 'error'
+
+
+class SolveService(object):
+    """ Dispatch JSON-lines solve requests to a pool of processes.
+
+    Args:
+        workers: number of solver processes, cpu count by default.
+        queue: maximum number of pending requests per connection.
+        timeout: default seconds a request may take, unbounded by default.
+        diagonal: True to solve diagonal Sudoku.
+        backend: solver backend, see solver.BACKENDS.
+        size: box size of the board, 3 for 9x9 Sudoku.
+        max_nodes: default maximum number of search nodes of a request, unbounded by default.
+        variant: Variant of the puzzles, see src.topology, classic by default.
+        executor: concurrent.futures executor solving the puzzles, a process
+            pool of ``workers`` by default.
+    """
+
+    def __init__(self, workers=None, queue=64, timeout=None, diagonal=False, backend=solver.PROPAGATION, size=3,
+                 max_nodes=None, executor=None, variant=None):
+        if queue < 1:
+            raise ValueError("queue size should be positive")
+        if backend not in solver.BACKENDS:
+            raise ValueError("unknown solver backend: " + str(backend))
+        self.queue = queue
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        self.topology = Topology.get(diagonal, size, variant)
+        self.solve_item = partial(solve_encoded, diagonal, backend, size=size, variant=variant)
+        self.executor = executor or ProcessPoolExecutor(workers)
+        self.manager = None
+
+    def close(self):
+        self.executor.shutdown()
+        if self.manager is not None:
+            self.manager.shutdown()
+
+    def cancel_token(self):
+        """ Event cancelling the search of a request, shared with the worker processes through a manager """
+        if not isinstance(self.executor, ProcessPoolExecutor):
+            return threading.Event()
+        if self.manager is None:
+            self.manager = Manager()
+        return self.manager.Event()
+
+    async def serve(self, reader, writer):
+        """
+        Answer the requests of one connection until its end, then wait for the pending ones.
+
+        Args:
+            reader: has a ``readline`` coroutine returning one request line in bytes, b'' at the end.
+            writer: has a ``write`` method taking one response line in bytes, and a ``drain`` coroutine.
+        """
+        pending, answers = {}, set()
+        slots = asyncio.Semaphore(self.queue)
+
+        async def respond(response):
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+
+        async def answer(request_id, future, deadline):
+            try:
+                response = await self.response(request_id, future, deadline)
+            finally:
+                del pending[request_id]
+                slots.release()
+            await respond(response)
+
+        while True:
+            await slots.acquire()
+            line = await reader.readline()
+            if not line:
+                slots.release()
+                break
+            try:
+                request = self.parse(line)
+            except ValueError as error:
+                slots.release()
+                await respond({'id': None, 'status': ERROR, 'error': str(error)})
+                continue
+
+            request_id = request['id']
+            if request.get('cancel'):
+                slots.release()
+                if request_id in pending:
+                    future, token = pending[request_id]
+                    token.set()
+                    future.cancel()
+                else:
+                    await respond({'id': request_id, 'status': ERROR, 'error': "no pending request with this id"})
+            elif request_id in pending:
+                slots.release()
+                await respond({'id': request_id, 'status': ERROR, 'error': "a request with this id is pending"})
+            else:
+                timeout = request.get('timeout', self.timeout)
+                deadline = monotonic() + timeout if timeout is not None else None
+                token = self.cancel_token()
+                future = self.submit(request_id, request['puzzle'], deadline, request.get('max_nodes', self.max_nodes),
+                                     token)
+                pending[request_id] = future, token
+                task = asyncio.ensure_future(answer(request_id, future, deadline))
+                answers.add(task)
+                task.add_done_callback(answers.discard)
+
+        if answers:
+            await asyncio.wait(list(answers))
+
+    def submit(self, request_id, puzzle, deadline=None, max_nodes=None, token=None):
+        """ Future of the (request id, solution) pair of a puzzle, solved by the executor within its budget
+        until its cancel token is set """
+        loop = asyncio.get_event_loop()
+        try:
+            encoded = encode(puzzle, self.topology)
+        except (ValueError, AssertionError) as error:
+            future = loop.create_future()
+            future.set_exception(error)
+            return future
+        solve_item = partial(self.solve_item, (request_id, encoded), max_nodes=max_nodes, deadline=deadline,
+                             token=token)
+        return loop.run_in_executor(self.executor, solve_item)
+
+    async def response(self, request_id, future, deadline=None):
+        """ Response to a submitted request once solved, cancelled or timed out, see the module documentation """
+        try:
+            _, solution = await asyncio.wait_for(future, max(deadline - monotonic(), 0) if deadline else None)
+        except asyncio.CancelledError:
+            return {'id': request_id, 'status': CANCELLED}
+        except (asyncio.TimeoutError, TimeoutError):
+            return {'id': request_id, 'status': TIMEOUT}
+        except Exception as error:
+            return {'id': request_id, 'status': ERROR, 'error': str(error) or type(error).__name__}
+        if solution is None:
+            return {'id': request_id, 'status': UNSOLVABLE}
+        if solution == EXCEEDED:
+            return {'id': request_id, 'status': TIMEOUT if deadline and monotonic() >= deadline else EXCEEDED_NODES}
+        return {'id': request_id, 'status': SOLVED, 'solution': solution}
+
+    @staticmethod
+    def parse(line):
+        """ Request object of a line, raising ValueError if it is not a valid request """
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise ValueError("request should be a json object")
+        if not isinstance(request, dict) or not isinstance(request.get('id'), (str, int)):
+            raise ValueError("request should be a json object with a string or integer id")
+        if not request.get('cancel') and not isinstance(request.get('puzzle'), str):
+            raise ValueError("request should have a puzzle")
+        if not isinstance(request.get('timeout', 0), (int, float)) or not isinstance(request.get('max_nodes', 0), int):
+            raise ValueError("request timeout and max_nodes should be numbers")
+        return request
+
+
+class _StandardInput(object):
+    """ Lines of standard input read in a thread, so that the event loop keeps running """
+
+    async def readline(self):
+        return await asyncio.get_event_loop().run_in_executor(None, sys.stdin.buffer.readline)
+
+
+class _StandardOutput(object):
+
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def drain(self):
+        pass
+
+
+async def serve_socket(service, path):
+    """ Serve every connection to a unix socket, until cancelled """
+    if os.path.exists(path):
+        os.unlink(path)
+
+    async def connection(reader, writer):
+        try:
+            await service.serve(reader, writer)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(connection, path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        os.unlink(path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve Sudoku grids sent as JSON lines.")
+    parser.add_argument('--socket', help="unix socket to listen on, standard input and output by default")
+    parser.add_argument('--workers', type=int, default=0, help="solver processes, 0 for one per cpu")
+    parser.add_argument('--queue', type=int, default=64, help="pending requests per connection")
+    parser.add_argument('--timeout', type=float, help="default seconds per request, unbounded by default")
+    parser.add_argument('--max-nodes', type=int, help="default search nodes per request, unbounded by default")
+    parser.add_argument('--backend', choices=sorted(solver.BACKENDS), default=solver.PROPAGATION)
+    parser.add_argument('--diagonal', action='store_true', help="solve diagonal Sudoku")
+    parser.add_argument('--size', type=int, default=3, choices=range(2, MAX_SIZE + 1),
+                        help="box size, 3 for 9x9 and 4 for 16x16 boards")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = SolveService(args.workers or None, args.queue, args.timeout, args.diagonal, args.backend, args.size,
+                           args.max_nodes)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        if args.socket:
+            server = asyncio.ensure_future(serve_socket(service, args.socket))
+            loop.add_signal_handler(signal.SIGTERM, server.cancel)
+            loop.run_until_complete(server)
+        else:
+            loop.run_until_complete(service.serve(_StandardInput(), _StandardOutput()))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        service.close()
+        loop.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,9 @@
-from collections import defaultdict
-
-assignments = []
+from src import solver
+from src.candidates import Candidates, mask_of
+from src.strategies import Schedule
+from src.topology import Topology
+from src.trace import TraceRecorder, SEARCH
+from src.validation import validate_solutions, VALID
 
 def cross(A, B):
     "Cross product of elements in A and elements in B."
@@ -25,31 +28,33 @@ def diagonal_combinations(A, B):
 
 rows = 'ABCDEFGHI'
 columns = '123456789'
-boxes = cross(rows, columns)
-row_units = [cross(row, columns) for row in rows]
-column_units = [cross(rows, column) for column in columns]
-square_units = [cross(row_square, column_square)
-                             for row_square in ('ABC', 'DEF', 'GHI')
-                             for column_square in ('123', '456', '789')]
-diagonals = diagonal_combinations(rows, columns)
+# labels of the units of diagonal Sudoku, from the topology shared with the solvers
+topology = Topology.get(diagonal=True)
+boxes = list(topology.boxes)
+row_units = [topology.labels(unit) for unit in topology.row_units]
+column_units = [topology.labels(unit) for unit in topology.column_units]
+square_units = [topology.labels(unit) for unit in topology.square_units]
+diagonals = [topology.labels(unit) for unit in topology.diagonal_units]
 
 unitlist = row_units + column_units + square_units + diagonals
 units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
 peers = dict((s, set(sum(units[s], [])) - set([s])) for s in boxes)
 
-def assign_value(values, box, value):
+def assign_value(values, box, value, trace=None):
     """
     Please use this function to update your values dictionary!
-    Assigns a value to a given box. If it updates the board record it.
+    Assigns a value to a given box. If it updates the board and a started
+    TraceRecorder is given, record the removed digits on it.
     """
 
-    # Don't waste memory appending actions that don't actually change any values
+    # Don't waste memory recording actions that don't actually change any values
     if values[box] == value:
         return values
 
+    if trace is not None:
+        trace.record(topology.box_index[box],
+                     mask_of(values[box]) & ~mask_of(value), SEARCH)
     values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
     return values
 
 def naked_twins(values):
@@ -60,24 +65,8 @@ def naked_twins(values):
     Returns:
         the values dictionary with the naked twins eliminated from peers.
     """
-    # Find all instances of naked twins
-    for unit in unitlist:
-        possible_twins = [(box, values[box]) for box in unit if len(values[box]) == 2]
-        if len(possible_twins) >= 2:
-            twins_by_digit = defaultdict(list)
-            for box, digit in possible_twins: twins_by_digit[digit].append(box)
-            for digit, boxes in twins_by_digit.items():
-                if len(boxes) == 2:
-                    values = remove_digit_from_same_unit(boxes, digit, unit, values)
-    return values
-
-
-def remove_digit_from_same_unit(boxes, digit, unit, values):
-    for box in unit:
-        if box not in boxes:
-            for number in digit:
-                if number in values[box] and len(values[box]) > 1:
-                    values[box] = values[box].replace(number, '')
+    candidates = Candidates.from_values(values, topology).naked_twins()
+    values.update(candidates.to_values())
     return values
 
 
@@ -92,7 +81,7 @@ def grid_values(grid):
             Values: The value in each box, e.g., '8'. If the box has no value, then the value will be '123456789'.
     """
     assert grid is not None, "grid should be defined"
-    assert len(grid) is 81, "grid should have 81 digits"
+    assert len(grid) == 81, "grid should have 81 digits"
     values = dict()
     index = 0
     for value in grid:
@@ -104,6 +93,10 @@ def grid_values(grid):
         index += 1
     return values
 
+def grid_string(values):
+    """ Grid in string form of a solved sudoku in dictionary form, None if there is none """
+    return ''.join(values[box] for box in boxes) if values else None
+
 def display(values):
     """
     Display the values as a 2-D grid.
@@ -180,29 +173,41 @@ def reduce_puzzle(values):
     return values
 
 
-def search(values):
-    """Using depth-first search and propagation, create a search tree and solve the sudoku."""
-    reduced_puzzle = reduce_puzzle(values)
-    if reduced_puzzle is False:
-        return False
+def search(values, backend=solver.PROPAGATION, trace=None, stats=None, budget=None, strategies=None, degree=False,
+           lcv=False):
+    """Using depth-first search and propagation, create a search tree and solve the sudoku.
 
-    if are_all_box_assigned(values):
-        return values
-
-    # Choose one of the unfilled squares with the fewest possibilities
-    unfilled_squares = dict((box, len(digit))
-                       for (box, digit) in values.items()
-                       if len(digit) > 1)
-    best_unfilled_square = min(unfilled_squares.keys(), key=(lambda box: unfilled_squares[box]))
-
-    # Now use recursion to solve each one of the resulting sudokus,
-    # and if one returns a value (not False), return that answer!
-    for digit in values[best_unfilled_square]:
-        recursive_values = values.copy()
-        recursive_values[best_unfilled_square] = digit
-        answer = search(recursive_values)
-        if answer:
-            return answer
+    The search runs on candidate bitmasks and backtracks in place through an undo trail.
+    Args:
+        values(dict): The sudoku in dictionary form
+        backend(string): 'propagation', or 'dlx' for the dancing links exact cover solver
+        trace(TraceRecorder): records every candidate change of this search, off by default
+        stats(SolveStats): counts nodes, backtracks and removals of this search, off by default
+        budget(Budget): limits the nodes, time or cancellation of this search, unlimited by default
+        strategies(list): names of the strategies propagation runs past eliminate and only choice,
+            or a Schedule, every built-in one by default, see src.strategies
+        degree(bool): break ties between the boxes with the fewest candidates by most open peers
+        lcv(bool): try the least constraining digits first
+    Returns:
+        The solved sudoku in dictionary form, False if no solution exists.
+    Raises:
+        BudgetExceeded: if the budget is spent first, stats holding the counters up to then.
+    """
+    candidates = Candidates.from_values(values, topology)
+    if strategies is not None:
+        candidates.schedule = Schedule.of(strategies)
+    if trace is not None:
+        candidates.trace = trace
+        trace.start(candidates)
+    if stats is not None:
+        candidates.stats = stats
+        stats.reset()
+    try:
+        candidates = solver.search(candidates, backend, budget, degree, lcv)
+    finally:
+        if stats is not None:
+            stats.finish()
+    return candidates.to_values() if candidates else False
 
 def are_all_box_assigned(values):
     """ check if all box are assigned """
@@ -211,46 +216,79 @@ def are_all_box_assigned(values):
             return False
     return True
 
-def solve(grid):
+def solve(grid, show=True, backend=solver.PROPAGATION, trace=None, stats=None, cache=None, budget=None,
+          strategies=None, degree=False, lcv=False):
     """
     Find the solution to a Sudoku grid.
     Args:
         grid(string): a string representing a sudoku grid.
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        show(bool): display the solved sudoku.
+        backend(string): 'propagation', or 'dlx' for the dancing links exact cover solver.
+        trace(TraceRecorder): records every candidate change of the solve, off by default.
+        stats(SolveStats): filled with the counters of the solve, off by default.
+        cache(SolutionCache): cache of diagonal Sudoku solutions answering equivalent
+            grids without searching, off by default. Hits are neither traced nor counted.
+        budget(Budget): limits the nodes, time or cancellation of the search, unlimited by default.
+        strategies(list): strategies of propagation, see search.
+        degree(bool), lcv(bool): branching heuristics, see search.
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
+    Raises:
+        BudgetExceeded: if the budget is spent before the grid is solved.
     """
-
-    # Conversion of String into a Grid in dictionary form
-    values = grid_values(grid)
-
-    # solver
-    values = search(values)
+    if cache is not None:
+        if cache.topology is not topology:
+            raise ValueError("cache should hold diagonal Sudoku solutions")
+        solution = cache.solve(grid, lambda puzzle: grid_string(
+            search(grid_values(puzzle), backend, trace, stats, budget, strategies, degree, lcv)))
+        values = grid_values(solution) if solution else False
+    else:
+        # Conversion of String into a Grid in dictionary form
+        values = grid_values(grid)
+
+        # solver
+        values = search(values, backend, trace, stats, budget, strategies, degree, lcv)
 
     # display solved sudoku if solved
-    if values:
+    if values and show:
         display(values)
 
     return values
 
+def count_solutions(grid, limit=2, diagonal=True, size=3):
+    """
+    Count the solutions of a Sudoku grid, stopping as soon as limit solutions are found.
+    Args:
+        grid(string): a string representing a sudoku grid, see Topology.parse.
+        limit(int): maximum number of solutions to look for.
+        diagonal(bool): also constrain the two main diagonals.
+        size(int): box size of the board, 4 for 16x16 grids.
+    Returns:
+        The number of solutions, at most limit.
+    """
+    return Candidates.from_grid(grid, Topology.get(diagonal, size)).count_solutions(limit)
+
+def is_unique(grid, diagonal=True, size=3):
+    """ check if a Sudoku grid has exactly one solution """
+    return count_solutions(grid, 2, diagonal, size) == 1
+
 def check_solution(values):
-    for unit in unitlist:
-        checked_value = list()
-        for box in unit:
-            if values[box] in checked_value:
-                return False
-            checked_value.append(values[box])
-    return True
+    """ check that a sudoku in dictionary form is completely and correctly solved """
+    if not values:
+        return False
+    return validate_solutions([grid_string(values)], topology=topology, vectorized=False)[0] == VALID
 
 
 if __name__ == '__main__':
     complex_diagonal_grid = '9.1....8.8.5.7..4.2.4....6...7......5..............83.3..6......9................'
-    solution = solve(complex_diagonal_grid)
+    trace = TraceRecorder()
+    solution = solve(complex_diagonal_grid, trace=trace)
     print("Solution is correct" if check_solution(solution) else "Solution is wrong")
 
     try:
         from visualize import visualize_assignments
-        visualize_assignments(assignments)
+        visualize_assignments(list(trace.snapshots()))
 
     except SystemExit:
         pass
@@ -1,3 +1,45 @@
+from src import dlx
+from src.budget import BudgetExceeded
+
+PROPAGATION = 'propagation'
+DLX = 'dlx'
+
+BACKENDS = {
+    PROPAGATION: lambda candidates, degree, lcv: candidates.search(degree, lcv),
+    DLX: lambda candidates, degree, lcv: dlx.search(candidates),
+}
+
+
+def search(candidates, backend=PROPAGATION, budget=None, degree=False, lcv=False):
+    """
+    Solve candidates in place with the selected backend.
+
+    Args:
+        candidates: Candidates to solve.
+        backend: 'propagation' for propagation and depth-first search,
+            'dlx' for the dancing links exact cover solver.
+        budget: Budget limiting the search, unlimited by default.
+        degree, lcv: branching heuristics of the propagation backend, see
+            Candidates.search, dlx always branching on the column of fewest rows.
+    Returns:
+        candidates solved, or False if no solution exists.
+    Raises:
+        BudgetExceeded: if the budget is spent first, the reason being also
+            recorded in the stats attached to the candidates.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("unknown solver backend: " + str(backend))
+    if budget is not None:
+        candidates.budget = budget
+    try:
+        if candidates.budget is not None:
+            candidates.budget.check()
+        return BACKENDS[backend](candidates, degree, lcv)
+    except BudgetExceeded as exceeded:
+        if candidates.stats is not None:
+            candidates.stats.exceeded = exceeded.reason
+        raise
+
 
 class Solver(object):
 
@@ -0,0 +1,63 @@
+from timeit import default_timer
+
+from src.trace import STRATEGY_NAMES, PROPAGATION_STRATEGIES
+
+
+class SolveStats(object):
+    """ Counters of a single solve, filled by the engine only when attached to it.
+
+    ``passes`` counts the runs of each scheduled strategy, see src.strategies, and
+    ``idle`` those of them which removed no candidate. ``exceeded`` is the reason
+    a Budget stopped the solve, None if it ran to the end.
+
+    Args:
+        callback: called with the stats when the solve finishes, e.g. to export them
+            to a metrics system.
+    """
+    __slots__ = ('nodes', 'backtracks', 'max_depth', 'propagations', 'removed', 'strategy_time', 'passes', 'idle',
+                 'wall_time', 'started', 'exceeded', 'callback')
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.propagations = 0
+        self.removed = [0] * len(STRATEGY_NAMES)
+        self.strategy_time = [0.0] * len(STRATEGY_NAMES)
+        self.passes = [0] * len(STRATEGY_NAMES)
+        self.idle = [0] * len(STRATEGY_NAMES)
+        self.wall_time = 0.0
+        self.started = default_timer()
+        self.exceeded = None
+
+    def node(self, depth):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def finish(self):
+        """ Stop the wall clock and hand the stats to the callback """
+        self.wall_time = default_timer() - self.started
+        if self.callback is not None:
+            self.callback(self)
+        return self
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+            'propagations': self.propagations,
+            'removed': dict((STRATEGY_NAMES[strategy], self.removed[strategy])
+                            for strategy in PROPAGATION_STRATEGIES),
+            'strategy_time': dict((STRATEGY_NAMES[strategy], self.strategy_time[strategy])
+                                  for strategy in PROPAGATION_STRATEGIES),
+            'passes': dict((STRATEGY_NAMES[strategy], self.passes[strategy]) for strategy in PROPAGATION_STRATEGIES),
+            'idle': dict((STRATEGY_NAMES[strategy], self.idle[strategy]) for strategy in PROPAGATION_STRATEGIES),
+            'wall_time': self.wall_time,
+            'exceeded': self.exceeded,
+        }
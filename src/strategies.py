@@ -0,0 +1,148 @@
+"""
+Deduction strategies of propagation, registered with a cost, and their schedule.
+
+Eliminate and only choice always run first, until nothing changes. The other
+strategies only run once those stall: the unit strategies, naked and hidden
+subsets, on each unit changed since they last ran, then the board strategies,
+e.g. intersections and fish, over the whole board, propagation resuming from
+the first of them that removes a candidate. The board strategies only run in
+the propagation of the whole board before the search, not at its nodes. Within each stage the strategies
+run in the order of their schedule, by default from the cheapest.
+
+A Schedule picks the strategies of a propagation and their order. It is set
+per Candidates or per solve, and can be learned from the payoff, candidates
+removed per second, of each strategy in the SolveStats of profiled runs.
+"""
+from src.trace import BUILTIN_STRATEGIES, STRATEGY_NAMES, NAKED_SUBSET, HIDDEN_SUBSET, add_strategy, remove_strategy
+
+UNIT = 'unit'
+BOARD = 'board'
+
+STRATEGIES = {}
+
+
+class Strategy(object):
+    """ A registered deduction strategy.
+
+    Args:
+        name: name of the strategy in schedules.
+        cost: relative cost of a run, cheaper strategies of a stage running first by default.
+        function: called with the Candidates, removes candidates through ``exclude``
+            and returns False on a contradiction; None for the unit strategies built
+            into propagation.
+        label: trace and stats strategy its removals and time are counted under,
+            see src.trace, its own one.
+        scope: 'unit' for the naked and hidden subsets built into propagation, or 'board'.
+    """
+    __slots__ = ('name', 'cost', 'function', 'label', 'scope')
+
+    def __init__(self, name, cost, function, label, scope=BOARD):
+        self.name = name
+        self.cost = cost
+        self.function = function
+        self.label = label
+        self.scope = scope
+
+    def __repr__(self):
+        return 'Strategy(' + self.name + ')'
+
+
+def register(name, cost, function, label=None, scope=BOARD):
+    """
+    Register a strategy, see Strategy, replacing any other of the same name.
+
+    A new strategy is given a trace and stats label of its own, named after it, see
+    src.trace.add_strategy; SolveStats made before should be reset to count it. Only
+    the built-in naked and hidden subsets run per unit, any other strategy runs over
+    the whole board.
+    """
+    if scope == UNIT and (function is not None or label not in (NAKED_SUBSET, HIDDEN_SUBSET)):
+        raise ValueError("only the built-in naked and hidden subsets run per unit")
+    if label is None:
+        label = add_strategy(name)
+    elif not 0 <= label < len(STRATEGY_NAMES):
+        raise ValueError("unknown strategy label: " + str(label))
+    if any(strategy.label == label and strategy.name != name for strategy in STRATEGIES.values()):
+        raise ValueError("strategy label already counts " + STRATEGY_NAMES[label])
+    STRATEGIES[name] = Strategy(name, cost, function, label, scope)
+    return STRATEGIES[name]
+
+
+def unregister(name):
+    """
+    Remove a registered strategy, and the trace and stats label register gave it, see
+    src.trace.remove_strategy; strategies registered after it should be removed first.
+    """
+    strategy = STRATEGIES.pop(name)
+    if strategy.label >= len(BUILTIN_STRATEGIES) and STRATEGY_NAMES[strategy.label] == name:
+        remove_strategy(strategy.label)
+    return strategy
+
+
+class Schedule(object):
+    """ Strategies run by propagation once eliminate and only choice stall, in order.
+
+    Args:
+        names: names of registered strategies, all of them by default, sorted by
+            cost when ``ordered`` is false.
+        ordered: keep the order of names instead of sorting them by cost.
+    """
+    __slots__ = ('strategies', 'unit_labels', 'board')
+
+    def __init__(self, names=None, ordered=False):
+        if names is None:
+            names = sorted(STRATEGIES, key=lambda name: STRATEGIES[name].label)
+        unknown = [name for name in names if name not in STRATEGIES]
+        if unknown:
+            raise ValueError("unknown strategies: " + ', '.join(unknown))
+        strategies = [STRATEGIES[name] for name in names]
+        if not ordered:
+            strategies.sort(key=lambda strategy: strategy.cost)
+        self.strategies = tuple(strategies)
+        self.unit_labels = tuple(strategy.label for strategy in strategies if strategy.scope == UNIT)
+        self.board = tuple(strategy for strategy in strategies if strategy.scope == BOARD)
+
+    def __repr__(self):
+        return 'Schedule(' + repr(self.names()) + ')'
+
+    def names(self):
+        return [strategy.name for strategy in self.strategies]
+
+    @classmethod
+    def of(cls, strategies):
+        """ Schedule of a Schedule or of strategy names """
+        return strategies if isinstance(strategies, cls) else cls(strategies)
+
+    @classmethod
+    def learn(cls, stats, names=None, drop_idle=True, min_payoff=0):
+        """
+        Schedule of the strategies ordered by their payoff in profiled runs.
+
+        Args:
+            stats: SolveStats, or iterable of SolveStats, of runs with the strategies.
+            names: strategies to schedule, all the registered ones by default.
+            drop_idle: leave out the strategies which ran but never removed a candidate.
+            min_payoff: leave out the strategies which ran removing fewer candidates per second.
+        Returns:
+            Schedule running the strategies of each stage by decreasing candidates removed
+            per second, the strategies which never ran last by cost.
+        """
+        stats = [stats] if hasattr(stats, 'removed') else list(stats)
+        names = cls(names).names()
+        removed, seconds, passes = {}, {}, {}
+        for name in names:
+            label = STRATEGIES[name].label
+            removed[name] = sum(run.removed[label] for run in stats)
+            seconds[name] = sum(run.strategy_time[label] for run in stats)
+            passes[name] = sum(run.passes[label] for run in stats)
+        payoff = dict((name, removed[name] / seconds[name] if seconds[name] else float(removed[name]))
+                      for name in names)
+        names = [name for name in names if not passes[name] or
+                 (removed[name] or not drop_idle) and payoff[name] >= min_payoff]
+
+        def order(name):
+            stage = STRATEGIES[name].scope != UNIT
+            if not passes[name]:
+                return stage, 1, STRATEGIES[name].cost
+            return stage, 0, -payoff[name]
+        return cls(sorted(names, key=order), ordered=True)
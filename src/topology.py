@@ -0,0 +1,366 @@
+from collections import OrderedDict
+
+from src.helper import Helper
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXY'
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+PLACEHOLDER = '.'
+MAX_SIZE = 5
+# topologies of variants kept shared, the least recently used ones being dropped past it
+MAX_VARIANTS = 256
+
+_popcounts = {}
+_indexes = {}
+_combinations = {}
+
+
+class _BitCounts(object):
+    """ Popcount of masks too wide for a lookup table """
+    __slots__ = ()
+
+    def __getitem__(self, mask):
+        return bin(mask).count('1')
+
+
+class _BitIndexes(object):
+    """ Digit indexes of masks too wide for a lookup table, joined from tables of 8 digits """
+    __slots__ = ('chunks',)
+
+    def __init__(self, digits):
+        self.chunks = tuple((shift, tuple(tuple(shift + digit for digit in range(8) if byte >> digit & 1)
+                                          for byte in range(256)))
+                            for shift in range(0, digits, 8))
+
+    def __getitem__(self, mask):
+        digits = ()
+        for shift, table in self.chunks:
+            digits += table[mask >> shift & 255]
+        return digits
+
+
+def _popcount_table(digits):
+    """ Popcount lookup table of every mask of up to 16 digits, shared between topologies """
+    if digits > 16:
+        return _BitCounts()
+    if digits not in _popcounts:
+        _popcounts[digits] = tuple(bin(mask).count('1') for mask in range(1 << digits))
+    return _popcounts[digits]
+
+
+def _digit_indexes_table(digits):
+    """ Digit indexes lookup table of every mask of up to 9 digits, shared between topologies """
+    if digits not in _indexes:
+        if digits > 9:
+            _indexes[digits] = _BitIndexes(digits)
+        else:
+            _indexes[digits] = tuple(tuple(digit for digit in range(digits) if mask >> digit & 1)
+                                     for mask in range(1 << digits))
+    return _indexes[digits]
+
+
+def _cage_combinations(digits, length, total):
+    """ Masks of the sets of length different digits adding up to total, shared between cages """
+    key = (digits, length, total)
+    if key not in _combinations:
+        masks = []
+
+        def extend(first, length, total, mask):
+            if not length:
+                if not total:
+                    masks.append(mask)
+                return
+            for digit in range(first, digits):
+                # the smallest digits left already add up to more than the total
+                if (digit + 1) * length + length * (length - 1) // 2 > total:
+                    break
+                extend(digit + 1, length - 1, total - digit - 1, mask | 1 << digit)
+        extend(0, length, total, 0)
+        _combinations[key] = tuple(masks)
+    return _combinations[key]
+
+
+class Variant(object):
+    """ Constraints of a Sudoku variant, compiled by Topology into its index tables.
+
+    Boxes are given by label, e.g. 'A1', or by index in grid order.
+
+    Args:
+        regions: irregular regions of jigsaw Sudoku replacing the squares, one region
+            name per box in grid order, e.g. '111222333111...'.
+        windows: add the windows of windoku, the squares set one box in from the others.
+        units: extra units, each of as many boxes as a row, e.g. the centers of the squares.
+        cages: killer cages, (total, boxes) pairs where the different digits of
+            the boxes add up to total.
+    """
+    __slots__ = ('regions', 'windows', 'units', 'cages')
+
+    def __init__(self, regions=None, windows=False, units=(), cages=()):
+        self.regions = tuple(regions) if regions is not None else None
+        self.windows = bool(windows)
+        self.units = tuple(tuple(unit) for unit in units)
+        self.cages = tuple((int(total), tuple(boxes)) for total, boxes in cages)
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Adapter from the json form, e.g. {"windows": true, "cages": [[10, ["A1", "A2"]], ...]} """
+        unknown = set(data) - set(cls.__slots__)
+        if unknown:
+            raise ValueError("unknown variant constraints: " + ', '.join(sorted(unknown)))
+        return cls(data.get('regions'), data.get('windows', False), data.get('units', ()), data.get('cages', ()))
+
+    def without_cages(self):
+        """ Variant of the same units without the killer cages, None if it only has cages """
+        if self.regions is None and not self.windows and not self.units:
+            return None
+        return Variant(self.regions, self.windows, self.units)
+
+    def __key(self):
+        return self.regions, self.windows, self.units, self.cages
+
+    def __eq__(self, other):
+        return isinstance(other, Variant) and self.__key() == other.__key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __repr__(self):
+        return 'Variant(regions=%r, windows=%r, units=%r, cages=%r)' % self.__key()
+
+
+class Topology(object):
+    """ Box labels, units and peers of a board shape, built once and shared.
+
+    A board of box size ``size`` has size**2 rows, columns, squares and symbols:
+    rows are labelled by letters, columns by numbers, e.g. 'A1' to 'P16' for size 4,
+    and symbols are the digits followed by letters, '123456789ABCDEFG' for size 4.
+
+    Units and peers are stored as tuples of integer box indexes into ``boxes``,
+    so that every board of the same shape reuses the same frozen tables.
+
+    A Variant adds its constraints to the shape: jigsaw regions take the place
+    of ``square_units``, windows and other extra units are kept in ``extra_units``,
+    and killer cages in ``cages``, with their ``cage_totals``, the ``cage_of`` each
+    box, None outside the cages and empty without cages, and the masks of the
+    digit combinations adding up to each total in ``cage_combinations``. The
+    boxes of a cage are peers of each other, but a cage is not a unit.
+
+    Killer puzzles mostly come with cages of their own, so a topology with cages
+    shares every table but its peers with its ``shape``, the topology of the same
+    units without the cages, and tables built per shape, e.g. the exact cover
+    matrix, are shared between all the cage layouts. Topologies of variants are
+    kept shared up to MAX_VARIANTS of them, the least recently used ones first dropped.
+    """
+    __slots__ = ('size', 'rows', 'columns', 'symbols', 'all_digits', 'popcount', 'digit_indexes', 'symbol_masks',
+                 'boxes', 'box_index', 'row_units', 'column_units', 'square_units', 'diagonal_units',
+                 'extra_units', 'unitlist', 'units', 'cell_units', 'peers', 'segments', 'intersections', 'diagonal',
+                 'variant', 'shape', 'cages', 'cage_totals', 'cage_of', 'cage_combinations', '__weakref__')
+
+    # tables of a topology with cages taken from its shape
+    _shape_tables = __slots__[:__slots__.index('peers')] + ('segments', 'intersections', 'diagonal')
+
+    _shapes = {}
+    _variants = OrderedDict()
+
+    def __init__(self, diagonal=False, size=3, variant=None):
+        if variant is not None and variant.cages:
+            self.__overlay(Topology.get(diagonal, size, variant.without_cages()), variant)
+            return
+        if not 2 <= size <= MAX_SIZE:
+            raise ValueError("board size should be between 2 and " + str(MAX_SIZE))
+        dimension = size * size
+        self.size = size
+        self.rows = LETTERS[:dimension]
+        self.columns = tuple(str(column) for column in range(1, dimension + 1))
+        self.symbols = SYMBOLS[:dimension]
+        self.all_digits = (1 << dimension) - 1
+        self.popcount = _popcount_table(dimension)
+        self.digit_indexes = _digit_indexes_table(dimension)
+        self.symbol_masks = dict((symbol, 1 << digit) for digit, symbol in enumerate(self.symbols))
+        self.symbol_masks[PLACEHOLDER] = self.all_digits
+
+        self.diagonal = diagonal
+        self.boxes = tuple(Helper.cross(self.rows, self.columns))
+        self.box_index = dict((box, index) for index, box in enumerate(self.boxes))
+        self.row_units = self.__indexes(Helper.cross(row, self.columns) for row in self.rows)
+        self.column_units = self.__indexes(Helper.cross(self.rows, (column,)) for column in self.columns)
+        self.variant = variant
+        self.shape = self
+        if variant is not None and variant.regions is not None:
+            self.square_units = self.__regions(variant.regions)
+        else:
+            self.square_units = self.__squares(0)
+        self.diagonal_units = ()
+        if diagonal:
+            self.diagonal_units = self.__indexes(
+                [[self.rows[pos] + self.columns[pos] for pos in range(dimension)],
+                 [self.rows[pos] + self.columns[dimension - 1 - pos] for pos in range(dimension)]])
+        self.extra_units = ()
+        if variant is not None:
+            self.extra_units = (self.__squares(1) if variant.windows else ()) + \
+                               tuple(self.__cells(unit) for unit in variant.units)
+        self.unitlist = self.row_units + self.column_units + self.square_units + self.diagonal_units + \
+            self.extra_units
+        for unit in self.unitlist:
+            if len(set(unit)) != dimension:
+                raise ValueError("units should hold " + str(dimension) + " different boxes")
+        self.units = tuple(tuple(unit for unit in self.unitlist if cell in unit)
+                           for cell in range(len(self.boxes)))
+        self.cell_units = tuple(tuple(index for index, unit in enumerate(self.unitlist) if cell in unit)
+                                for cell in range(len(self.boxes)))
+        self.__cages(())
+        self.peers = tuple(tuple(sorted(set(sum(self.units[cell], ())) - {cell}))
+                           for cell in range(len(self.boxes)))
+        self.segments, self.intersections = self.__intersections()
+
+    def __overlay(self, shape, variant):
+        """ Add the killer cages of variant to the tables of shape """
+        for name in self._shape_tables:
+            setattr(self, name, getattr(shape, name))
+        self.variant = variant
+        self.shape = shape
+        self.__cages(variant.cages)
+        self.peers = tuple(peers if self.cage_of[cell] is None else
+                           tuple(sorted(set(peers).union(self.cages[self.cage_of[cell]]) - {cell}))
+                           for cell, peers in enumerate(shape.peers))
+
+    @classmethod
+    def get(cls, diagonal=False, size=3, variant=None):
+        """ Shared topology for a board shape and variant, built on first use """
+        key = (bool(diagonal), size, variant)
+        if variant is None:
+            if key not in cls._shapes:
+                cls._shapes[key] = cls(*key)
+            return cls._shapes[key]
+        variants = cls._variants
+        if key in variants:
+            variants.move_to_end(key)
+            return variants[key]
+        topology = variants[key] = cls(*key)
+        while len(variants) > MAX_VARIANTS:
+            variants.popitem(last=False)
+        return topology
+
+    def __reduce__(self):
+        # unpickled as the shared topology of the process, e.g. in pool workers
+        return Topology.get, (self.diagonal, self.size, self.variant)
+
+    def labels(self, cells):
+        """ Box labels of a sequence of box indexes """
+        return [self.boxes[cell] for cell in cells]
+
+    def parse(self, grid):
+        """
+        Split a grid into one symbol or placeholder per box.
+
+        Args:
+            grid: either one character per box, e.g. '..3.2.6..9..', or the boxes
+                separated by spaces or commas, where numbers stand for the symbols
+                in order and 0 for empty boxes, e.g. '16 . 0 12 ...'.
+        Returns:
+            list of symbols, '.' for empty boxes.
+        """
+        assert grid is not None, "grid should be defined"
+        if len(grid) == len(self.boxes):
+            return list(grid)
+        tokens = grid.replace(',', ' ').split()
+        assert len(tokens) == len(self.boxes), "grid should have " + str(len(self.boxes)) + " digits"
+        return [self.__token_symbol(token) for token in tokens]
+
+    def format(self, symbols, separator=None):
+        """ Grid in string form, or numbers joined by separator with '.' for empty boxes """
+        if separator is None:
+            return ''.join(symbols)
+        return separator.join(str(self.symbols.index(symbol) + 1) if symbol in self.symbols else PLACEHOLDER
+                              for symbol in symbols)
+
+    def symbols_of(self, mask):
+        """ Symbols of the digits of a candidate mask, e.g. '379' """
+        return ''.join(symbol for digit, symbol in enumerate(self.symbols) if mask >> digit & 1)
+
+    def __token_symbol(self, token):
+        if not token.isdigit():
+            return token
+        number = int(token)
+        if number == 0:
+            return PLACEHOLDER
+        return self.symbols[number - 1] if number <= len(self.symbols) else token
+
+    def __intersections(self):
+        """
+        Returns:
+            segments: box indexes where a square crosses a row or a column.
+            intersections: (segment, segments of the rest of the square, segments of the rest
+                of the line) segment indexes, one per segment.
+        """
+        segments, segment_lines, square_segments, line_segments = [], [], {}, {}
+        for square_index, square in enumerate(self.square_units):
+            for lines in (self.row_units, self.column_units):
+                for line in lines:
+                    overlap = tuple(cell for cell in square if cell in line)
+                    if overlap:
+                        square_segments.setdefault((square_index, id(lines)), []).append(len(segments))
+                        line_segments.setdefault(line, []).append(len(segments))
+                        segment_lines.append(line)
+                        segments.append(overlap)
+        intersections = []
+        for same_square in square_segments.values():
+            for segment in same_square:
+                same_line = line_segments[segment_lines[segment]]
+                intersections.append((segment,
+                                      tuple(other for other in same_square if other != segment),
+                                      tuple(other for other in same_line if other != segment)))
+        return tuple(segments), tuple(sorted(intersections))
+
+    def __indexes(self, units):
+        return tuple(tuple(self.box_index[box] for box in unit) for unit in units)
+
+    def __squares(self, offset):
+        """ Squares of the board, or the windows of windoku set ``offset`` boxes in from them """
+        size, dimension = self.size, len(self.rows)
+        starts = range(0, dimension, size) if not offset else range(offset, dimension - size, size + offset)
+        return self.__indexes(Helper.cross(self.rows[row:row + size], self.columns[column:column + size])
+                              for row in starts for column in starts)
+
+    def __regions(self, regions):
+        """ Units of the boxes of each region name, in the order the regions first appear """
+        if len(regions) != len(self.boxes):
+            raise ValueError("regions should name the region of each of the " + str(len(self.boxes)) + " boxes")
+        units = {}
+        for cell, region in enumerate(regions):
+            units.setdefault(region, []).append(cell)
+        if len(units) != len(self.rows):
+            raise ValueError("regions should name " + str(len(self.rows)) + " regions")
+        return tuple(tuple(unit) for unit in sorted(units.values()))
+
+    def __cells(self, boxes):
+        """ Box indexes of box labels or indexes """
+        cells = []
+        for box in boxes:
+            if isinstance(box, int):
+                if not 0 <= box < len(self.boxes):
+                    raise ValueError("box index out of range: " + str(box))
+                cells.append(box)
+            elif box in self.box_index:
+                cells.append(self.box_index[box])
+            else:
+                raise ValueError("unknown box: " + str(box))
+        return tuple(cells)
+
+    def __cages(self, cages):
+        dimension = len(self.rows)
+        self.cages = tuple(self.__cells(boxes) for _, boxes in cages)
+        self.cage_totals = tuple(total for total, _ in cages)
+        cage_of = [None] * len(self.boxes)
+        for index, cage in enumerate(self.cages):
+            if not cage or len(set(cage)) != len(cage) or len(cage) > dimension:
+                raise ValueError("cages should hold up to " + str(dimension) + " different boxes")
+            for cell in cage:
+                if cage_of[cell] is not None:
+                    raise ValueError("cages should not overlap: " + self.boxes[cell])
+                cage_of[cell] = index
+        self.cage_of = tuple(cage_of) if self.cages else ()
+        self.cage_combinations = tuple(_cage_combinations(dimension, len(cage), total)
+                                       for cage, total in zip(self.cages, self.cage_totals))
@@ -0,0 +1,83 @@
+from array import array
+
+ELIMINATE, ONLY_CHOICE, NAKED_SUBSET, SEARCH, BACKTRACK, INTERSECTION, FISH, HIDDEN_SUBSET, CAGE = range(9)
+# extended by add_strategy with the strategies registered in src.strategies
+STRATEGY_NAMES = ['eliminate', 'only_choice', 'naked_subset', 'search', 'backtrack', 'intersection', 'fish',
+                  'hidden_subset', 'cage']
+PROPAGATION_STRATEGIES = [ELIMINATE, ONLY_CHOICE, NAKED_SUBSET, HIDDEN_SUBSET, INTERSECTION, FISH, CAGE]
+BUILTIN_STRATEGIES = tuple(STRATEGY_NAMES)
+
+
+def add_strategy(name):
+    """ Label of a new propagation strategy, its events and stats kept apart from the others,
+    or the existing label of that name """
+    if name not in STRATEGY_NAMES:
+        STRATEGY_NAMES.append(name)
+        PROPAGATION_STRATEGIES.append(len(STRATEGY_NAMES) - 1)
+    return STRATEGY_NAMES.index(name)
+
+
+def remove_strategy(label):
+    """ Remove the label of a propagation strategy added last by add_strategy, labels being indexes """
+    if label < len(BUILTIN_STRATEGIES) or label != len(STRATEGY_NAMES) - 1:
+        raise ValueError("only the label added last can be removed: " + str(label))
+    STRATEGY_NAMES.pop()
+    PROPAGATION_STRATEGIES.remove(label)
+
+
+class TraceRecorder(object):
+    """ Compact per-solve record of candidate changes, kept in a preallocated ring buffer.
+
+    Every event is a (cell, mask, strategy) triple: ``mask`` holds the digits removed
+    from the cell, or the digits restored to it for BACKTRACK events. When the buffer
+    is full the oldest events are folded into the initial state, so snapshots can
+    always be rebuilt from the events still recorded.
+    """
+    __slots__ = ('capacity', 'cells', 'masks', 'strategies', 'count', 'initial')
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.cells = array('H', [0]) * capacity
+        self.masks = array('L', [0]) * capacity
+        self.strategies = array('B', [0]) * capacity
+        self.count = 0
+        self.initial = None
+
+    def start(self, candidates):
+        """ Forget previous events and record from the current state of candidates """
+        self.count = 0
+        self.initial = candidates.copy()
+
+    def record(self, cell, mask, strategy):
+        slot = self.count % self.capacity
+        if self.count >= self.capacity:
+            self.__apply(self.initial.cells, slot)
+        self.cells[slot] = cell
+        self.masks[slot] = mask
+        self.strategies[slot] = strategy
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def events(self):
+        """ Recorded (cell, mask, strategy) events, oldest first """
+        for slot in self.__positions():
+            yield self.cells[slot], self.masks[slot], self.strategies[slot]
+
+    def snapshots(self):
+        """ Sudoku in dictionary form after each recorded event, rebuilt on demand """
+        snapshot = self.initial.copy()
+        for slot in self.__positions():
+            self.__apply(snapshot.cells, slot)
+            yield snapshot.to_values()
+
+    def __positions(self):
+        first = self.count - len(self)
+        return (position % self.capacity for position in range(first, self.count))
+
+    def __apply(self, cells, slot):
+        if self.strategies[slot] == BACKTRACK:
+            cells[self.cells[slot]] |= self.masks[slot]
+        else:
+            cells[self.cells[slot]] &= ~self.masks[slot]
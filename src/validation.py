@@ -0,0 +1,187 @@
+"""
+Bulk validation of puzzles and solutions, returning one error code per grid.
+
+Grids are checked for their length, their symbols, and duplicate givens in any
+unit or killer cage, diagonals and variant units included. Solutions are also
+checked to be complete, to keep the givens of their puzzles when those are given,
+and for the digits of each killer cage to add up to its total.
+
+Grids are checked with numpy arrays when numpy is installed and the board has
+up to 16 symbols, and with candidate bitmasks per unit otherwise.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src.topology import Topology, PLACEHOLDER
+from src.vectorized import MAX_DIGITS, _cage_tables, _lookup_tables, _topology_tables
+
+VALID, WRONG_LENGTH, INVALID_SYMBOL, DUPLICATE, INCOMPLETE, MISMATCH, WRONG_SUM = range(7)
+ERROR_NAMES = ('valid', 'wrong_length', 'invalid_symbol', 'duplicate', 'incomplete', 'mismatch', 'wrong_sum')
+
+_tables = {}
+
+
+def records(grids):
+    """
+    Args:
+        grids: sequence of grids in string or bytes form, one character per box,
+            or a bytes-like buffer of such grids separated by newlines.
+    Returns:
+        list of grids in bytes form.
+    """
+    if isinstance(grids, (bytes, bytearray, memoryview)):
+        lines = bytes(grids).split(b'\n')
+        return lines[:-1] if lines and not lines[-1] else lines
+    return [grid if isinstance(grid, bytes) else grid.encode('ascii', 'replace') for grid in grids]
+
+
+def validate_grids(grids, topology=None, vectorized=None):
+    """
+    Args:
+        grids: puzzles, see records.
+        topology: shared Topology of the puzzles.
+        vectorized: check with numpy, by default when numpy is installed and
+            the board has up to 16 symbols.
+    Returns:
+        list of error codes, VALID, WRONG_LENGTH, INVALID_SYMBOL or DUPLICATE, one per grid.
+    """
+    return _validate(records(grids), False, None, topology or Topology.get(), vectorized)
+
+
+def validate_solutions(solutions, puzzles=None, topology=None, vectorized=None):
+    """
+    Args:
+        solutions: solved grids, see records.
+        puzzles: puzzles of the solutions, whose givens the solutions should keep.
+        topology: shared Topology of the grids.
+        vectorized: see validate_grids.
+    Returns:
+        list of error codes, one per solution: VALID for a correct solution,
+        INCOMPLETE if it has empty boxes, MISMATCH if it changes a given of its
+        puzzle or WRONG_SUM if a killer cage does not add up to its total, and
+        the codes of validate_grids otherwise.
+    """
+    solutions = records(solutions)
+    puzzles = records(puzzles) if puzzles is not None else None
+    if puzzles is not None and len(puzzles) != len(solutions):
+        raise ValueError("there should be one puzzle per solution")
+    return _validate(solutions, True, puzzles, topology or Topology.get(), vectorized)
+
+
+def _validate(grids, solved, puzzles, topology, vectorized):
+    if vectorized is None:
+        vectorized = numpy is not None and len(topology.symbols) <= MAX_DIGITS
+    if vectorized:
+        return _validate_arrays(grids, solved, puzzles, topology)
+    char_masks, valid_chars = _char_tables(topology)
+    boxes, units = len(topology.boxes), len(topology.unitlist)
+    codes = []
+    for index, grid in enumerate(grids):
+        if len(grid) != boxes:
+            codes.append(WRONG_LENGTH)
+            continue
+        if grid.translate(None, valid_chars):
+            codes.append(INVALID_SYMBOL)
+            continue
+        code = VALID
+        seen = [0] * units
+        for cell, char in enumerate(grid):
+            mask = char_masks[char]
+            if mask:
+                for unit in topology.cell_units[cell]:
+                    if seen[unit] & mask:
+                        code = DUPLICATE
+                        break
+                    seen[unit] |= mask
+                if code:
+                    break
+        if code == VALID and topology.cages and _cage_duplicates(grid, char_masks, topology):
+            code = DUPLICATE
+        if code == VALID and solved:
+            if PLACEHOLDER.encode('ascii') in grid:
+                code = INCOMPLETE
+            elif puzzles is not None and _changes_givens(grid, puzzles[index]):
+                code = MISMATCH
+            elif topology.cages and _wrong_sums(grid, char_masks, topology):
+                code = WRONG_SUM
+        codes.append(code)
+    return codes
+
+
+def _cage_duplicates(grid, char_masks, topology):
+    for cage in topology.cages:
+        seen = 0
+        for cell in cage:
+            mask = char_masks[grid[cell]]
+            if seen & mask:
+                return True
+            seen |= mask
+    return False
+
+
+def _wrong_sums(solution, char_masks, topology):
+    return any(sum(char_masks[solution[cell]].bit_length() for cell in cage) != total
+               for cage, total in zip(topology.cages, topology.cage_totals))
+
+
+def _changes_givens(solution, puzzle):
+    placeholder = ord(PLACEHOLDER)
+    return len(puzzle) != len(solution) or any(given != placeholder and given != digit
+                                               for given, digit in zip(puzzle, solution))
+
+
+def _char_tables(topology):
+    """ Mask of the given of each byte, 0 for empty boxes and other bytes, and the valid bytes """
+    key = topology.symbols
+    if key not in _tables:
+        char_masks = [0] * 256
+        for symbol in topology.symbols:
+            char_masks[ord(symbol)] = topology.symbol_masks[symbol]
+        _tables[key] = char_masks, (topology.symbols + PLACEHOLDER).encode('ascii')
+    return _tables[key]
+
+
+def _validate_arrays(grids, solved, puzzles, topology):
+    boxes = len(topology.boxes)
+    _, units, _ = _topology_tables(topology)
+    char_masks, popcount, _ = _lookup_tables(topology)
+    codes = numpy.full(len(grids), WRONG_LENGTH, dtype=numpy.uint8)
+    sized = numpy.array([len(grid) == boxes for grid in grids], dtype=bool)
+    if not sized.any():
+        return codes.tolist()
+
+    def givens_of(sized_grids):
+        chars = numpy.frombuffer(b''.join(sized_grids), dtype=numpy.uint8).reshape(-1, boxes)
+        masks = char_masks[chars]
+        return masks, numpy.where(popcount[masks] == 1, masks, 0).astype(numpy.uint32)
+
+    indexes = numpy.flatnonzero(sized)
+    masks, givens = givens_of([grids[index] for index in indexes])
+    invalid = (masks == 0).any(axis=1)
+    unit_givens = givens[:, units]
+    # distinct single bits add up to their union
+    duplicate = (numpy.bitwise_or.reduce(unit_givens, axis=2) != unit_givens.sum(axis=2)).any(axis=1)
+
+    checked = numpy.full(len(masks), VALID, dtype=numpy.uint8)
+    cages = _cage_tables(topology)
+    if cages is not None:
+        cage_boxes, _, _, totals, values = cages
+        padding = numpy.zeros((len(givens), 1), dtype=givens.dtype)
+        cage_givens = numpy.concatenate((givens, padding), axis=1)[:, cage_boxes]
+        duplicate |= (numpy.bitwise_or.reduce(cage_givens, axis=2) != cage_givens.sum(axis=2)).any(axis=1)
+        if solved:
+            checked[(values[cage_givens].sum(axis=2) != totals).any(axis=1)] = WRONG_SUM
+    if solved and puzzles is not None:
+        matched = numpy.array([len(puzzles[index]) == boxes for index in indexes], dtype=bool)
+        _, puzzle_givens = givens_of([puzzles[index] for index in indexes[matched]])
+        changed = ((puzzle_givens != 0) & (puzzle_givens != givens[matched])).any(axis=1)
+        checked[~matched] = MISMATCH
+        checked[numpy.flatnonzero(matched)[changed]] = MISMATCH
+    if solved:
+        checked[(givens == 0).any(axis=1)] = INCOMPLETE
+    checked[duplicate] = DUPLICATE
+    checked[invalid] = INVALID_SYMBOL
+    codes[sized] = checked
+    return codes.tolist()
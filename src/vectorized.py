@@ -0,0 +1,214 @@
+from weakref import WeakKeyDictionary
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src.candidates import Candidates
+from src.topology import Topology, PLACEHOLDER
+
+MAX_DIGITS = 16
+
+_tables = {}
+_shape_tables = WeakKeyDictionary()
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError("the vectorized backend requires numpy")
+
+
+def _topology_tables(topology):
+    """
+    Index arrays of the shape of a topology, without its killer cages, padded with
+    a trailing sentinel index whose value is always 0:
+        - peers: (boxes, max peers) box indexes
+        - units: (units, unit size) box indexes
+        - slots: (boxes, max units) indexes into the flattened (units * unit size) unit array
+    """
+    topology = topology.shape
+    if topology not in _shape_tables:
+        cells = len(topology.boxes)
+        max_peers = max(len(peers) for peers in topology.peers)
+        peers = numpy.full((cells, max_peers), cells, dtype=numpy.intp)
+        for cell, cell_peers in enumerate(topology.peers):
+            peers[cell, :len(cell_peers)] = cell_peers
+
+        units = numpy.array(topology.unitlist, dtype=numpy.intp)
+        unit_size = units.shape[1]
+        max_units = max(len(cell_units) for cell_units in topology.units)
+        slots = numpy.full((cells, max_units), units.size, dtype=numpy.intp)
+        filled = [0] * cells
+        for unit_index, unit in enumerate(topology.unitlist):
+            for position, cell in enumerate(unit):
+                slots[cell, filled[cell]] = unit_index * unit_size + position
+                filled[cell] += 1
+        _shape_tables[topology] = peers, units, slots
+    return _shape_tables[topology]
+
+
+def _cage_tables(topology):
+    """
+    Index arrays of the killer cages of a topology, None without cages, built per
+    call as most killer puzzles have cages of their own:
+        - boxes: (cages, largest cage) box indexes, padded with the sentinel box index
+        - combinations: (cages, most combinations) digit masks adding up to the total of each cage, padded with 0
+        - cell_cages: (boxes,) cage index of each box, the sentinel cage index outside the cages
+        - totals: (cages,) totals of the cages
+        - values: (masks,) digit of every mask of a single digit, 0 for the others
+    """
+    if not topology.cages:
+        return None
+    cells, cages = len(topology.boxes), len(topology.cages)
+    boxes = numpy.full((cages, max(len(cage) for cage in topology.cages)), cells, dtype=numpy.intp)
+    combinations = numpy.zeros((cages, max(len(masks) for masks in topology.cage_combinations) or 1),
+                               dtype=numpy.uint16)
+    for index, cage in enumerate(topology.cages):
+        boxes[index, :len(cage)] = cage
+        combinations[index, :len(topology.cage_combinations[index])] = topology.cage_combinations[index]
+    cell_cages = numpy.array([cages if cage is None else cage for cage in topology.cage_of], dtype=numpy.intp)
+    key = ('values', len(topology.symbols))
+    if key not in _tables:
+        values = numpy.zeros(topology.all_digits + 1, dtype=numpy.intp)
+        for digit in range(len(topology.symbols)):
+            values[1 << digit] = digit + 1
+        _tables[key] = values
+    return boxes, combinations, cell_cages, numpy.array(topology.cage_totals, dtype=numpy.intp), _tables[key]
+
+
+def _lookup_tables(topology):
+    """ Symbol to mask, popcount and mask to symbol arrays of a topology """
+    key = ('lookup', len(topology.symbols))
+    if key not in _tables:
+        if len(topology.symbols) > MAX_DIGITS:
+            raise ValueError("the vectorized backend supports up to " + str(MAX_DIGITS) + " symbols")
+        char_masks = numpy.zeros(256, dtype=numpy.uint16)
+        for char, mask in topology.symbol_masks.items():
+            char_masks[ord(char)] = mask
+        popcount = numpy.array(topology.popcount, dtype=numpy.uint8)
+        mask_chars = numpy.full(topology.all_digits + 1, ord(PLACEHOLDER), dtype=numpy.uint8)
+        for digit, symbol in enumerate(topology.symbols):
+            mask_chars[1 << digit] = ord(symbol)
+        _tables[key] = char_masks, popcount, mask_chars
+    return _tables[key]
+
+
+def grids_to_array(grids, topology=None):
+    """
+    Args:
+        grids: sequence of grids in string form, one character per box.
+        topology: shared Topology of the puzzles, of up to 16 symbols.
+    Returns:
+        (N, boxes) uint16 array of candidate masks.
+    """
+    _require_numpy()
+    topology = topology or Topology.get()
+    boxes = len(topology.boxes)
+    char_masks, _, _ = _lookup_tables(topology)
+    buffer = numpy.frombuffer(''.join(grids).encode('ascii'), dtype=numpy.uint8)
+    assert buffer.size == boxes * len(grids), "grid should have " + str(boxes) + " digits"
+    cells = char_masks[buffer]
+    if not cells.all():
+        raise ValueError("grid contains a not valid value: " + chr(buffer[cells == 0][0]))
+    return cells.reshape(len(grids), boxes)
+
+
+def array_to_grids(cells, topology=None):
+    """ Grids in string form, '.' for boxes with more than one candidate """
+    topology = topology or Topology.get()
+    boxes = len(topology.boxes)
+    _, _, mask_chars = _lookup_tables(topology)
+    text = mask_chars[cells].tobytes().decode('ascii')
+    return [text[start:start + boxes] for start in range(0, len(text), boxes)]
+
+
+def reduce_batch(cells, topology=None):
+    """
+    Apply eliminate and only choice, and the digit combinations of the killer cages,
+    to every puzzle of the batch until none of them changes.
+
+    Args:
+        cells: (N, boxes) uint16 array of candidate masks, updated in place.
+        topology: shared Topology of the puzzles.
+    Returns:
+        (N,) boolean array, True for the puzzles with a contradiction.
+    """
+    _require_numpy()
+    topology = topology or Topology.get()
+    peers, units, slots = _topology_tables(topology)
+    _, popcount, _ = _lookup_tables(topology)
+    cages = _cage_tables(topology)
+    contradiction = numpy.zeros(len(cells), dtype=bool)
+    active = numpy.arange(len(cells))
+
+    while active.size:
+        current = cells[active]
+        padding = numpy.zeros((len(current), 1), dtype=current.dtype)
+
+        # Eliminate Strategy
+        solved = numpy.where(popcount[current] == 1, current, 0)
+        solved = numpy.concatenate((solved, padding), axis=1)
+        reduced = current & ~numpy.bitwise_or.reduce(solved[:, peers], axis=2)
+
+        # Only Choice Strategy
+        unit_cells = reduced[:, units]
+        once = numpy.zeros(unit_cells.shape[:2], dtype=current.dtype)
+        twice = numpy.zeros_like(once)
+        for position in range(unit_cells.shape[2]):
+            twice |= once & unit_cells[:, :, position]
+            once |= unit_cells[:, :, position]
+        hidden = (unit_cells & (once & ~twice)[:, :, numpy.newaxis]).reshape(len(current), -1)
+        hidden = numpy.bitwise_or.reduce(numpy.concatenate((hidden, padding), axis=1)[:, slots], axis=2)
+        reduced = numpy.where(hidden != 0, hidden, reduced)
+
+        if cages is not None:
+            # Killer Cage Strategy: the peers of the shape leave out the other boxes of a cage,
+            # so remove the digits solved elsewhere in the cage, then keep the digits of the
+            # combinations holding the solved digits of the cage and within its candidates
+            cage_boxes, combinations, cell_cages, _, _ = cages
+            cage_cells = numpy.concatenate((reduced, padding), axis=1)[:, cage_boxes]
+            union = numpy.bitwise_or.reduce(cage_cells, axis=2)[:, :, numpy.newaxis]
+            solved = numpy.bitwise_or.reduce(numpy.where(popcount[cage_cells] == 1, cage_cells, 0),
+                                             axis=2)[:, :, numpy.newaxis]
+            fitting = ((combinations & solved) == solved) & ((combinations & union) == combinations)
+            allowed = numpy.bitwise_or.reduce(numpy.where(fitting, combinations, 0), axis=2).astype(current.dtype)
+            outside = numpy.full((len(current), 1), topology.all_digits, dtype=current.dtype)
+            nothing = numpy.zeros((len(current), 1), dtype=current.dtype)
+            elsewhere = numpy.concatenate((solved[:, :, 0].astype(current.dtype), nothing), axis=1)[:, cell_cages] & \
+                ~numpy.where(popcount[reduced] == 1, reduced, 0)
+            reduced &= numpy.concatenate((allowed, outside), axis=1)[:, cell_cages] & ~elsewhere
+
+        failed = (once != topology.all_digits).any(axis=1) | (popcount[hidden] > 1).any(axis=1) | \
+                 (reduced == 0).any(axis=1)
+        changed = (reduced != current).any(axis=1)
+        cells[active] = reduced
+        contradiction[active[failed]] = True
+        active = active[changed & ~failed]
+    return contradiction
+
+
+def solve_batch(grids, topology=None):
+    """
+    Solve a batch of grids, reducing all of them at once and searching only the stalled ones.
+
+    Args:
+        grids: sequence of grids in string form, one character per box.
+        topology: shared Topology of the puzzles.
+    Returns:
+        list of solved grids in string form, None for unsolvable grids.
+    """
+    topology = topology or Topology.get()
+    cells = grids_to_array(grids, topology)
+    contradiction = reduce_batch(cells, topology)
+    _, popcount, _ = _lookup_tables(topology)
+    stalled = (popcount[cells] != 1).any(axis=1) & ~contradiction
+
+    solutions = array_to_grids(cells, topology)
+    for index in range(len(solutions)):
+        if contradiction[index]:
+            solutions[index] = None
+        elif stalled[index]:
+            candidates = Candidates([int(mask) for mask in cells[index]], topology).search()
+            solutions[index] = candidates.to_grid() if candidates else None
+    return solutions
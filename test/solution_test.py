@@ -110,6 +110,20 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve_complex_grid(self):
         self.assertEqual(solution.solve(self.complex_diagonal_grid), self.solved_complex_diag_sudoku)
 
+class TestCountSolutions(unittest.TestCase):
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_unique(self):
+        self.assertTrue(solution.is_unique(self.hard_grid, diagonal=False))
+        self.assertTrue(solution.is_unique(TestDiagonalSudoku.diagonal_grid))
+
+    def test_limit(self):
+        self.assertEqual(solution.count_solutions('.' * 81, limit=3, diagonal=False), 3)
+        self.assertFalse(solution.is_unique('.' * 81, diagonal=False))
+
+    def test_no_solution(self):
+        self.assertEqual(solution.count_solutions('11' + '.' * 79), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,41 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from src.batch import encode, solve_encoded, solve_many, EXCEEDED
+
+
+class TestSolveMany(TestCase):
+    grids = ['..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..',
+             '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......',
+             '11...............................................................................']
+    solutions = ['483921657967345821251876493548132976729564138136798245372689514814253769695417382',
+                 '417369825632158947958724316825437169791586432346912758289643571573291684164875293',
+                 None]
+
+    def test_solve_in_process(self):
+        self.assertEqual(list(solve_many(self.grids, workers=1)), self.solutions)
+
+    def test_solve_ordered(self):
+        self.assertEqual(list(solve_many(self.grids, workers=2, chunksize=1)), self.solutions)
+
+    def test_solve_unordered(self):
+        results = sorted(solve_many(self.grids * 3, workers=2, chunksize=2, ordered=False),
+                         key=lambda result: result[0])
+        self.assertEqual([solution for index, solution in results], self.solutions * 3)
+
+    def test_diagonal(self):
+        grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        solution, = solve_many([grid], workers=1, diagonal=True)
+        self.assertEqual(solution[:9], '267945381')
+
+    def test_cancelled(self):
+        token = threading.Event()
+        item = (0, encode(self.grids[0]))
+        self.assertEqual(solve_encoded(False, 'propagation', item, token=token), (0, self.solutions[0]))
+        token.set()
+        self.assertEqual(solve_encoded(False, 'propagation', item, token=token), (0, EXCEEDED))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,15 @@ class TestBoard(TestCase):
                       '8..67.82....26.95..8..2.3..9..5.1.3..'
         board = Board(grid)
 
+    def test_shared_topology(self):
+        grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......' \
+               '8..67.82....26.95..8..2.3..9..5.1.3..'
+        board = Board(grid)
+        self.assertIs(board.topology, Board(grid).topology)
+        self.assertFalse(hasattr(board, '__dict__'))
+        self.assertEqual(len(board.topology.peers[0]), 20)
+        self.assertEqual(board.get_row_units()[0][8], 'A9')
+
     def test_correspondences_grid(self):
         grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......' \
                       '8..67.82....26.95..8..2.3..9..5.1.3..'
@@ -97,6 +106,9 @@ class TestBoard(TestCase):
         board = Board(grid2)
         values = board.grid_values()
         values = board.search(values)
+        self.assertEqual(values['A1'], '4')
+        self.assertEqual(values['A2'], '1')
+        self.assertEqual(values['I9'], '3')
 
     def test_naked_twins(self):
         """
@@ -109,6 +121,14 @@ class TestBoard(TestCase):
         values = board.grid_values()
         values = board.naked_twins(values)
 
+        board = Board('.' * 81)
+        values = board.grid_values()
+        values['A1'] = values['A2'] = '23'
+        values = board.naked_twins(values)
+        self.assertEqual(values['A3'], '1456789')
+        self.assertEqual(values['B1'], '1456789')
+        self.assertEqual(values['D1'], '123456789')
+
 
 
 
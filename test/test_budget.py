@@ -0,0 +1,66 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from src import batch, budget, solution, solver
+from src.budget import Budget, BudgetExceeded
+from src.candidates import Candidates
+from src.stats import SolveStats
+
+
+class TestBudget(TestCase):
+    empty_grid = '.' * 81
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+
+    def search(self, limits, backend=solver.PROPAGATION, grid=None):
+        candidates = Candidates.from_grid(grid or self.empty_grid)
+        candidates.stats = SolveStats()
+        with self.assertRaises(BudgetExceeded) as raised:
+            solver.search(candidates, backend, limits)
+        return raised.exception, candidates.stats
+
+    def test_max_nodes(self):
+        for backend in sorted(solver.BACKENDS):
+            exceeded, stats = self.search(Budget(max_nodes=10), backend)
+            self.assertEqual(exceeded.reason, budget.NODES)
+            self.assertEqual(exceeded.nodes, 10)
+            self.assertEqual(stats.nodes, 11)
+            self.assertEqual(stats.exceeded, budget.NODES)
+
+    def test_deadline(self):
+        exceeded, _ = self.search(Budget(timeout=0))
+        self.assertEqual(exceeded.reason, budget.DEADLINE)
+
+    def test_cancel(self):
+        token = threading.Event()
+        token.set()
+        exceeded, stats = self.search(Budget(token=token))
+        self.assertEqual(exceeded.reason, budget.CANCELLED)
+        self.assertEqual(stats.nodes, 0)
+
+    def test_within_budget(self):
+        limits = Budget(max_nodes=100, timeout=60, token=threading.Event(), interval=1)
+        self.assertTrue(solver.search(Candidates.from_grid(self.empty_grid), budget=limits).is_solved())
+        self.assertLessEqual(limits.nodes, 100)
+
+    def test_count_solutions(self):
+        candidates = Candidates.from_grid(self.empty_grid)
+        candidates.budget = Budget(max_nodes=5)
+        with self.assertRaises(BudgetExceeded):
+            candidates.count_solutions()
+
+    def test_solve(self):
+        stats = SolveStats()
+        with self.assertRaises(BudgetExceeded):
+            solution.solve(self.empty_grid, show=False, stats=stats, budget=Budget(max_nodes=3))
+        self.assertEqual(stats.as_dict()['exceeded'], budget.NODES)
+        self.assertGreater(stats.wall_time, 0)
+
+    def test_solve_many(self):
+        solutions = list(batch.solve_many([self.grid, self.empty_grid], workers=1, max_nodes=10))
+        self.assertEqual(solutions[0], Candidates.from_grid(self.grid).search().to_grid())
+        self.assertEqual(solutions[1], batch.EXCEEDED)
+
+
+if __name__ == '__main__':
+    unittest.main()
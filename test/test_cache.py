@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+from random import Random
+from time import monotonic
+from unittest import TestCase
+
+from src import solution
+from src.cache import SolutionCache
+from src.canonical import canonical_form
+from src.candidates import Candidates
+from src.topology import Topology
+
+
+def transform(grid, rng, size=3):
+    """ Random relabeling, row and column permutation and transposition of a grid """
+    dimension = size * size
+    rows, columns = [], []
+    for lines in (rows, columns):
+        for block in rng.sample(range(size), size):
+            lines.extend(rng.sample(range(block * size, block * size + size), size))
+    symbols = Topology.get(size=size).symbols
+    labels = dict(zip(symbols, rng.sample(symbols, len(symbols))))
+    labels['.'] = '.'
+    transposed = rng.random() < 0.5
+    return ''.join(labels[grid[column * dimension + row if transposed else row * dimension + column]]
+                   for row in rows for column in columns)
+
+
+class TestCanonical(TestCase):
+    grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+
+    def test_equivalent_grids(self):
+        rng = Random(1)
+        key, _ = canonical_form(self.grid)
+        for _ in range(20):
+            other = transform(self.grid, rng)
+            other_key, other_transform = canonical_form(other)
+            self.assertEqual(other_key, key)
+            self.assertEqual(other_transform.invert(key), other)
+
+    def test_larger_board(self):
+        from test.test_topology import TestTopology
+        topology = Topology.get(size=4)
+        key, _ = canonical_form(TestTopology.grid, topology)
+        self.assertEqual(canonical_form(transform(TestTopology.grid, Random(2), 4), topology)[0], key)
+
+    def test_almost_empty(self):
+        # the ties of the columns of almost empty boards are bounded by MAX_ORDERS, used to take minutes
+        topology = Topology.get(size=4)
+        start = monotonic()
+        for grid in ('.' * 256, '1' + '.' * 255):
+            key, mapping = canonical_form(grid, topology)
+            self.assertEqual(mapping.invert(key), grid)
+        self.assertLess(monotonic() - start, 10)
+
+    def test_different_grids(self):
+        self.assertNotEqual(canonical_form(self.grid)[0], canonical_form(self.grid[1:] + '.')[0])
+
+    def test_diagonal(self):
+        topology = Topology.get(diagonal=True)
+        key, _ = canonical_form(self.diagonal_grid, topology)
+        rotated = ''.join(reversed(self.diagonal_grid)).replace('2', 'x').replace('3', '2').replace('x', '3')
+        self.assertEqual(canonical_form(rotated, topology)[0], key)
+        # swapping bands moves the diagonals
+        self.assertNotEqual(canonical_form(self.diagonal_grid[27:54] + self.diagonal_grid[:27] +
+                                           self.diagonal_grid[54:], topology)[0], key)
+
+
+class TestSolutionCache(TestCase):
+    grid = TestCanonical.grid
+
+    def solve(self, grid):
+        candidates = Candidates.from_grid(grid).search()
+        return candidates.to_grid() if candidates else None
+
+    def test_hit(self):
+        cache = SolutionCache()
+        expected = self.solve(self.grid)
+        self.assertEqual(cache.solve(self.grid, self.solve), expected)
+        other = transform(self.grid, Random(3))
+        self.assertEqual(cache.solve(other, self.unexpected), self.solve(other))
+        self.assertEqual(cache.counters(), {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_no_solution(self):
+        cache = SolutionCache()
+        grid = '44' + self.grid[2:]
+        self.assertIsNone(cache.solve(grid, self.solve))
+        self.assertIsNone(cache.solve(grid, self.unexpected))
+
+    def test_eviction(self):
+        cache = SolutionCache(capacity=2)
+        first, second, third = self.grid, '.' + self.grid[1:], self.grid[:6] + '.' + self.grid[7:]
+        for grid in (first, second, first, third):
+            cache.solve(grid, self.solve)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        cache.solve(first, self.unexpected)
+        cache.solve(second, self.solve)
+        self.assertEqual(cache.misses, 4)
+        with self.assertRaises(ValueError):
+            SolutionCache(capacity=0)
+
+    def test_persistence(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'solutions.csv')
+            SolutionCache(path=path).save()
+            cache = SolutionCache(path=path)
+            cache.solve(self.grid, self.solve)
+            cache.save()
+            loaded = SolutionCache(path=path)
+            self.assertEqual(len(loaded), 1)
+            self.assertEqual(loaded.solve(self.grid, self.unexpected), self.solve(self.grid))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_solve(self):
+        cache = SolutionCache(topology=Topology.get(diagonal=True))
+        grid = TestCanonical.diagonal_grid
+        expected = solution.solve(grid, show=False)
+        self.assertEqual(solution.solve(grid, show=False, cache=cache), expected)
+        self.assertEqual(solution.solve(''.join(reversed(grid)), show=False, cache=cache),
+                         solution.solve(''.join(reversed(grid)), show=False))
+        self.assertEqual(cache.hits, 1)
+        with self.assertRaises(ValueError):
+            solution.solve(grid, show=False, cache=SolutionCache())
+
+    def unexpected(self, grid):
+        self.fail("solved although cached: " + grid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from unittest import TestCase
+
+from src.candidates import Candidates, ALL_DIGITS
+
+
+class TestCandidates(TestCase):
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......' \
+           '8..67.82....26.95..8..2.3..9..5.1.3..'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_wrong_placeholder_grid(self):
+        with self.assertRaises(ValueError):
+            Candidates.from_grid(self.grid[:-1] + '*')
+
+    def test_values_adapter(self):
+        candidates = Candidates.from_grid(self.grid)
+        values = candidates.to_values()
+        self.assertEqual(values['A1'], '123456789')
+        self.assertEqual(values['A3'], '3')
+        self.assertEqual(Candidates.from_values(values).cells, candidates.cells)
+
+    def test_eliminate(self):
+        values = Candidates.from_grid(self.grid).eliminate().to_values()
+        self.assertEqual(values['A1'], '45')
+
+    def test_reduce_puzzle(self):
+        candidates = Candidates.from_grid(self.grid).reduce_puzzle()
+        self.assertTrue(candidates.is_solved())
+        self.assertEqual(candidates.to_grid()[::9], '492571386')
+
+    def test_subsets(self):
+        candidates = Candidates.from_grid('.' * 81)
+        # hidden pair: 1 and 2 only fit in A1 and A2
+        for cell in range(2, 9):
+            candidates.cells[cell] &= ~0b11
+        # naked triple: B1, B2 and B3 hold 4, 5 and 6 between them
+        candidates.cells[9:12] = [0b11000, 0b110000, 0b101000]
+        candidates.subsets()
+        self.assertEqual(candidates.cells[0:2], [0b11, 0b11])
+        # removed from the rest of row B and of the top left square
+        self.assertEqual([cell for cell in list(range(9, 21)) + [2] if candidates.cells[cell] & 0b111000],
+                         [9, 10, 11])
+
+    def test_subset_size(self):
+        candidates = Candidates.from_grid(self.hard_grid)
+        self.assertEqual(candidates.copy().subset_size, 4)
+        candidates.subset_size = 1
+        self.assertTrue(candidates.search().is_solved())
+
+    def test_intersections(self):
+        candidates = Candidates.from_grid('.' * 81)
+        # in the top left square, 1 only fits in A1 and A2
+        for cell in (2, 9, 10, 11, 18, 19, 20):
+            candidates.cells[cell] &= ~1
+        candidates.intersections()
+        self.assertEqual([cell for cell in range(9) if candidates.cells[cell] & 1], [0, 1])
+        self.assertTrue(candidates.cells[27] & 1)
+
+    def test_fish(self):
+        candidates = Candidates.from_grid('.' * 81)
+        # 1 only fits in columns 1 and 5 of rows A and E
+        for cell in list(range(9)) + list(range(36, 45)):
+            if cell % 9 not in (0, 4):
+                candidates.cells[cell] &= ~1
+        candidates.fish()
+        self.assertEqual([cell for cell in range(81) if candidates.cells[cell] & 1 and cell % 9 in (0, 4)],
+                         [0, 4, 36, 40])
+        self.assertTrue(candidates.cells[1 + 9] & 1)
+
+    def test_search(self):
+        candidates = Candidates.from_grid(self.hard_grid).search()
+        self.assertTrue(candidates.is_solved())
+        self.assertEqual(candidates.to_grid()[:9], '417369825')
+
+    def test_search_heuristics(self):
+        expected = Candidates.from_grid(self.hard_grid).search().to_grid()
+        for degree, lcv in ((True, False), (False, True), (True, True)):
+            self.assertEqual(Candidates.from_grid(self.hard_grid).search(degree, lcv).to_grid(), expected)
+        self.assertTrue(Candidates.from_grid('.' * 81).search(degree=True, lcv=True).is_solved())
+
+    def test_count_solutions(self):
+        candidates = Candidates.from_grid('.' * 81)
+        self.assertEqual(candidates.count_solutions(3), 3)
+        self.assertFalse(candidates.is_solved())
+        self.assertEqual(candidates.trail, [])
+        self.assertEqual(Candidates.from_grid(self.hard_grid).count_solutions(lcv=True), 1)
+
+    def test_propagate_empty_box(self):
+        candidates = Candidates.from_grid('.' * 81)
+        candidates.cells[40] = 0
+        self.assertIs(candidates.propagate([40]), False)
+
+    def test_propagate_missing_digit(self):
+        # no box of row A can hold 1 any more
+        cells = [ALL_DIGITS & ~1] * 9 + [ALL_DIGITS] * 72
+        self.assertIs(Candidates(cells).propagate(), False)
+        self.assertIs(Candidates(list(cells)).propagate([0]), False)
+
+    def test_propagate_changed_units(self):
+        # row I has no box for 1, which only a propagation of every unit finds
+        candidates = Candidates.from_grid('.' * 81)
+        for cell in range(72, 81):
+            candidates.cells[cell] &= ~1
+        candidates.assign(0, 1)
+        self.assertIs(candidates.propagate([0]), candidates)
+        self.assertTrue(set(candidates.trail[::2]) <= set(candidates.topology.peers[0]) | {0})
+        self.assertIs(candidates.propagate(), False)
+
+    def test_undo(self):
+        candidates = Candidates.from_grid(self.hard_grid)
+        before = list(candidates.cells)
+        mark = candidates.mark()
+        candidates.assign(1, 1)
+        candidates.propagate([1])
+        self.assertNotEqual(candidates.cells, before)
+        candidates.undo(mark)
+        self.assertEqual(candidates.cells, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
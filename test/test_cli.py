@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest import TestCase
+
+from src import cli, vectorized
+from src.topology import Topology, Variant
+from src.validation import validate_solutions, VALID
+
+
+class TestCli(TestCase):
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+    solution = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        with os.fdopen(handle, 'w') as stream:
+            stream.write('# corpus\n' + self.grid + '\n\n' + '11' + '0' * 79 + '\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def run_cli(self, *argv):
+        output = StringIO()
+        cli.main([self.path] + list(argv), output)
+        return output.getvalue().splitlines()
+
+    def test_solution_format(self):
+        self.assertEqual(self.run_cli(), [self.solution, cli.UNSOLVABLE])
+
+    def test_pair_format(self):
+        self.assertEqual(self.run_cli('--format', 'pair', '--backend', 'dlx')[0], self.grid + ',' + self.solution)
+
+    def test_json_format(self):
+        lines = self.run_cli('--format', 'json', '--workers', '2')
+        self.assertEqual(json.loads(lines[1]), {'puzzle': '11' + '.' * 79, 'solution': None})
+
+    def test_empty_file(self):
+        open(self.path, 'w').close()
+        self.assertEqual(self.run_cli(), [])
+
+    def test_budget(self):
+        self.assertEqual(self.run_cli('--max-nodes', '1', '--timeout', '60')[0], self.solution)
+        with open(self.path, 'w') as stream:
+            stream.write('.' * 81 + '\n')
+        self.assertEqual(self.run_cli('--max-nodes', '10'), ['exceeded'])
+        self.assertEqual(json.loads(self.run_cli('--max-nodes', '10', '--format', 'json')[0])['exceeded'], True)
+
+    def test_strategies(self):
+        self.assertEqual(self.run_cli('--strategies', 'intersection,fish'), [self.solution, cli.UNSOLVABLE])
+        self.assertEqual(self.run_cli('--strategies', ''), [self.solution, cli.UNSOLVABLE])
+        with self.assertRaises(SystemExit):
+            cli.parse_args(['--strategies', 'naked_twins'])
+
+    def test_variant(self):
+        variant = self.path + '.json'
+        with open(variant, 'w') as stream:
+            json.dump({'windows': True}, stream)
+        with open(self.path, 'w') as stream:
+            stream.write('.' * 81 + '\n')
+        try:
+            for backend in ('propagation', 'numpy') if vectorized.numpy is not None else ('propagation',):
+                solutions = self.run_cli('--variant', variant, '--backend', backend)
+                topology = Topology.get(variant=Variant(windows=True))
+                self.assertEqual(validate_solutions(solutions, topology=topology), [VALID])
+            with open(variant, 'w') as stream:
+                json.dump({'regions': '123'}, stream)
+            with self.assertRaises(SystemExit):
+                cli.parse_args(['--variant', variant])
+        finally:
+            os.remove(variant)
+
+    def test_invalid_lines(self):
+        with open(self.path, 'wb') as stream:
+            stream.write((self.grid[1:] + '\n' + 'x' + self.grid[1:] + '\n').encode('ascii') +
+                         '\u00e9'.encode('utf-8') + self.grid[2:].encode('ascii') + b'\n' +
+                         (self.grid + '\n').encode('ascii'))
+        for backend in ('propagation', 'numpy') if vectorized.numpy is not None else ('propagation',):
+            self.assertEqual(self.run_cli('--backend', backend), [cli.INVALID] * 3 + [self.solution])
+            lines = self.run_cli('--backend', backend, '--format', 'pair')
+            self.assertEqual(lines[0], self.grid[1:] + ',' + cli.INVALID)
+            self.assertEqual(lines[2], '\\xc3\\xa9' + self.grid[2:] + ',' + cli.INVALID)
+            lines = self.run_cli('--backend', backend, '--format', 'json')
+            self.assertEqual(json.loads(lines[1]), {'puzzle': 'x' + self.grid[1:], 'solution': None, 'invalid': True})
+        self.assertEqual(self.run_cli('--validate'), ['wrong_length', 'invalid_symbol', 'wrong_length', 'valid'])
+        corpus = self.path + '.sdkp'
+        try:
+            self.assertEqual(self.run_cli('--pack', corpus), [])
+            self.assertEqual(os.path.getsize(corpus), 16 + 41)
+        finally:
+            os.remove(corpus)
+
+    def test_validate(self):
+        self.assertEqual(self.run_cli('--validate'), ['valid', 'duplicate'])
+        self.assertEqual(json.loads(self.run_cli('--validate', '--format', 'json')[1])['validation'], 'duplicate')
+
+    def test_pack(self):
+        corpus = self.path + '.sdkp'
+        try:
+            self.assertEqual(self.run_cli('--pack', corpus), [])
+            self.assertEqual(os.path.getsize(corpus), 16 + 2 * 41)
+            output = StringIO()
+            cli.main([corpus, '--format', 'pair'], output)
+            self.assertEqual(output.getvalue().splitlines(), [self.grid + ',' + self.solution,
+                                                             '11' + '.' * 79 + ',' + cli.UNSOLVABLE])
+        finally:
+            os.remove(corpus)
+
+    def test_pack_diagonal(self):
+        corpus = self.path + '.sdkp'
+        grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        with open(self.path, 'w') as stream:
+            stream.write(grid + '\n')
+        try:
+            self.run_cli('--pack', corpus, '--diagonal')
+            output = StringIO()
+            cli.main([corpus], output)
+            solution = output.getvalue().strip()
+            topology = Topology.get(diagonal=True)
+            self.assertEqual(validate_solutions([solution], [grid], topology), [VALID])
+            with open(self.path, 'w') as stream:
+                json.dump({'windows': True}, stream)
+            for flags in (['--size', '4'], ['--variant', self.path]):
+                with self.assertRaises(SystemExit):
+                    cli.parse_args([corpus] + flags)
+            self.assertEqual(cli.parse_args([corpus, '--diagonal', '--size', '3']).size, 3)
+        finally:
+            os.remove(corpus)
+
+    def test_size(self):
+        with open(self.path, 'w') as stream:
+            stream.write(' '.join(['0'] * 256) + '\n')
+        solution, = self.run_cli('--size', '4')
+        self.assertEqual(solution[:16], '123456789ABCDEFG')
+
+
+if __name__ == '__main__':
+    unittest.main()
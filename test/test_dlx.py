@@ -0,0 +1,41 @@
+import unittest
+from unittest import TestCase
+
+from src import dlx, solution, solver
+from src.board import Board
+from src.candidates import Candidates
+from src.topology import Topology
+
+
+class TestDancingLinks(TestCase):
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+
+    def test_search(self):
+        candidates = dlx.search(Candidates.from_grid(self.hard_grid))
+        self.assertEqual(candidates.to_grid(),
+                         '417369825632158947958724316825437169791586432346912758289643571573291684164875293')
+
+    def test_no_solution(self):
+        self.assertFalse(dlx.search(Candidates.from_grid('11' + '.' * 79)))
+
+    def test_diagonal(self):
+        candidates = dlx.search(Candidates.from_grid(self.diagonal_grid, Topology.get(diagonal=True)))
+        self.assertEqual(candidates.to_grid()[:9], '267945381')
+
+    def test_solve_backend(self):
+        self.assertEqual(solution.solve(self.diagonal_grid, show=False, backend=solver.DLX),
+                         solution.solve(self.diagonal_grid, show=False))
+
+    def test_board_backend(self):
+        board = Board(self.hard_grid)
+        values = board.search(board.grid_values(), backend=solver.DLX)
+        self.assertEqual(values['I9'], '3')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            solver.search(Candidates.from_grid(self.hard_grid), 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
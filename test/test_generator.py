@@ -0,0 +1,54 @@
+import unittest
+from io import StringIO
+from random import Random
+from unittest import TestCase
+
+from src import generator
+from src.candidates import Candidates
+from src.topology import Topology
+
+
+class TestGenerator(TestCase):
+
+    def test_unique_solution(self):
+        puzzle, solution = generator.generate_puzzle(Topology.get(), Random(1))
+        self.assertEqual(Candidates.from_grid(puzzle).count_solutions(), 1)
+        self.assertEqual(Candidates.from_grid(puzzle).search().to_grid(), solution)
+        self.assertTrue(all(clue in ('.', digit) for clue, digit in zip(puzzle, solution)))
+
+    def test_seed(self):
+        first = list(generator.generate(3, seed=7))
+        self.assertEqual(first, list(generator.generate(3, seed=7)))
+        self.assertNotEqual(first, list(generator.generate(3, seed=8)))
+        self.assertEqual(len(set(first)), 3)
+
+    def test_clues(self):
+        puzzle, _ = next(generator.generate(1, clues=32, seed=1))
+        self.assertEqual(81 - puzzle.count('.'), 32)
+
+    def test_symmetry(self):
+        puzzle, _ = next(generator.generate(1, symmetry=generator.ROTATIONAL, seed=1))
+        self.assertEqual([clue == '.' for clue in puzzle], [clue == '.' for clue in reversed(puzzle)])
+        with self.assertRaises(ValueError):
+            next(generator.generate(1, symmetry='spiral'))
+
+    def test_diagonal(self):
+        topology = Topology.get(diagonal=True)
+        puzzle, solution = next(generator.generate(1, diagonal=True, seed=1))
+        self.assertEqual(len(set(solution[cell] for cell in topology.diagonal_units[0])), 9)
+        self.assertEqual(Candidates.from_grid(puzzle, topology).count_solutions(), 1)
+
+    def test_workers(self):
+        self.assertEqual(list(generator.generate(4, seed=3, workers=2, chunksize=1)),
+                         list(generator.generate(4, seed=3)))
+
+    def test_main(self):
+        output = StringIO()
+        generator.main(['--count', '2', '--seed', '1', '--size', '2', '--solutions'], output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(len(lines[0].split(',')[1]), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from src import batch, packed
+from src.candidates import Candidates
+from src.packed import Corpus, pack_grid, unpack_grid, write_corpus
+from src.topology import Topology
+
+
+class TestPackedGrid(TestCase):
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+    solution = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+    def test_round_trip(self):
+        for grid in (self.grid, self.solution, '.' * 81):
+            data = pack_grid(grid)
+            self.assertEqual(len(data), 41)
+            self.assertEqual(unpack_grid(data), grid)
+        self.assertEqual(pack_grid('12' + '.' * 79)[:1], b'\x21')
+
+    def test_larger_boards(self):
+        for size, length in ((2, 6), (4, 160), (5, 391)):
+            topology = Topology.get(size=size)
+            grid = topology.symbols[::-1] + '.' * (len(topology.boxes) - len(topology.symbols))
+            data = pack_grid(grid, topology)
+            self.assertEqual(len(data), length)
+            self.assertEqual(unpack_grid(memoryview(data), topology), grid)
+        topology = Topology.get(size=4)
+        self.assertEqual(unpack_grid(pack_grid(' '.join(['16'] + ['0'] * 255), topology), topology), 'G' + '.' * 255)
+
+    def test_not_valid(self):
+        with self.assertRaises(ValueError):
+            pack_grid('x' + '.' * 80)
+        with self.assertRaises(ValueError):
+            unpack_grid(b'\xff' * 41)
+        with self.assertRaises(ValueError):
+            unpack_grid(b'\x00' * 40)
+
+    def test_candidates(self):
+        candidates = Candidates.from_grid(self.grid).reduce_puzzle()
+        data = candidates.to_bytes()
+        self.assertEqual(len(data), 92)
+        self.assertEqual(Candidates.from_bytes(data).cells, candidates.cells)
+        topology = Topology.get(size=4)
+        candidates = Candidates.from_grid('.' * 256, topology)
+        self.assertEqual(Candidates.from_bytes(candidates.to_bytes(), topology).cells, candidates.cells)
+        with self.assertRaises(ValueError):
+            Candidates.from_bytes(data[:-1])
+
+
+class TestCorpus(TestCase):
+    grids = TestPackedGrid.grid, TestPackedGrid.solution, '11' + '.' * 79
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.assertEqual(write_corpus(self.path, self.grids * 5), 15)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_read(self):
+        self.assertEqual(os.path.getsize(self.path), packed.HEADER.size + 15 * 41)
+        self.assertTrue(packed.is_corpus(self.path))
+        with Corpus(self.path) as corpus:
+            self.assertEqual(len(corpus), 15)
+            self.assertIs(corpus.topology, Topology.get())
+            self.assertEqual(list(corpus), list(self.grids * 5))
+            self.assertEqual(corpus[-1], self.grids[2])
+            self.assertEqual(list(corpus.grids(1, 3)), list(self.grids[1:3]))
+            with self.assertRaises(IndexError):
+                corpus[15]
+            record = corpus.record(1)
+            self.assertEqual(unpack_grid(record), self.grids[1])
+            record.release()
+            shard = corpus.shard(12, 20)
+            self.assertEqual(len(shard), 3 * 41)
+            shard.release()
+            self.assertEqual(corpus.shards(4), [(0, 4), (4, 8), (8, 12), (12, 15)])
+
+    def test_diagonal(self):
+        topology = Topology.get(diagonal=True, size=4)
+        write_corpus(self.path, ['.' * 256], topology)
+        with Corpus(self.path) as corpus:
+            self.assertIs(corpus.topology, topology)
+            self.assertEqual(corpus[0], '.' * 256)
+
+    def test_not_valid(self):
+        with open(self.path, 'ab') as stream:
+            stream.write(b'\x00')
+        with self.assertRaises(ValueError):
+            Corpus(self.path)
+        with open(self.path, 'wb') as stream:
+            stream.write(b'..3.2.6..9..3.5..1\n')
+        self.assertFalse(packed.is_corpus(self.path))
+        with self.assertRaises(ValueError):
+            Corpus(self.path)
+
+    def test_solve_corpus(self):
+        solutions = [TestPackedGrid.solution, TestPackedGrid.solution, None] * 5
+        self.assertEqual(list(batch.solve_corpus(self.path, workers=1, shard_size=4)), solutions)
+        self.assertEqual(list(batch.solve_corpus(self.path, workers=2, shard_size=4)), solutions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest import TestCase
+
+from src import parallel
+from src.budget import Budget, BudgetExceeded
+from src.candidates import Candidates
+
+
+class TestParallel(TestCase):
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    hard_solution = '417369825632158947958724316825437169791586432346912758289643571573291684164875293'
+    # the last 51 boxes of a solution, with 264 solutions
+    open_grid = '.' * 30 + '483921657967345821251876493548132976729564138136798245372689514814253769695417382'[30:]
+
+    def candidates(self, grid):
+        candidates = Candidates.from_grid(grid)
+        candidates.reduce_puzzle()
+        return candidates
+
+    def test_frontier(self):
+        candidates = self.candidates(self.open_grid)
+        cells = list(candidates.cells)
+        solved, subtrees = parallel.frontier(candidates, 2)
+        self.assertEqual(candidates.cells, cells)
+        self.assertGreater(len(subtrees), 2)
+        self.assertEqual(sum(subtree.count_solutions(1000) for subtree in subtrees) + len(solved), 264)
+        solved, subtrees = parallel.frontier(candidates, width=10)
+        self.assertGreaterEqual(len(subtrees), 10)
+
+    def test_unexplored(self):
+        candidates = self.candidates(self.open_grid)
+        candidates.budget = Budget(max_nodes=50)
+        stack, count = [], 0
+        with self.assertRaises(BudgetExceeded):
+            for _ in candidates.solutions(stack):
+                count += 1
+        branches = candidates.unexplored(stack)
+        self.assertGreater(len(branches), 1)
+        self.assertEqual(count + sum(branch.count_solutions(1000) for branch in branches), 264)
+
+    def test_search(self):
+        for workers in (1, 2):
+            solution = parallel.search(Candidates.from_grid(self.hard_grid), workers, split_nodes=20)
+            self.assertEqual(solution.to_grid(), self.hard_solution)
+        self.assertEqual(parallel.search(Candidates.from_grid(self.hard_solution), 2).to_grid(), self.hard_solution)
+        self.assertFalse(parallel.search(Candidates.from_grid('11' + '.' * 79), 2))
+
+    def test_count_solutions(self):
+        for workers, depth, split_nodes in ((1, None, 10), (2, 1, 10), (2, None, None)):
+            count = parallel.count_solutions(Candidates.from_grid(self.open_grid), 1000, workers, depth, split_nodes)
+            self.assertEqual(count, 264)
+        self.assertEqual(parallel.count_solutions(Candidates.from_grid(self.open_grid), 100, 2, split_nodes=10), 100)
+        self.assertEqual(parallel.count_solutions(Candidates.from_grid(self.hard_grid), 2, 2), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing import Manager
+from time import monotonic
+from unittest import TestCase
+
+from src import service
+from src.batch import EXCEEDED
+from src.budget import Budget, BudgetExceeded, CANCELLED
+from src.service import SolveService
+
+
+class Lines(object):
+    """ Request lines of a connection, and the responses written to it """
+
+    def __init__(self, requests, before_end=None):
+        self.requests = [request if isinstance(request, bytes) else json.dumps(request).encode('utf-8')
+                         for request in requests]
+        self.before_end = before_end
+        self.responses = []
+
+    async def readline(self):
+        if self.requests:
+            return self.requests.pop(0) + b'\n'
+        if self.before_end is not None:
+            self.before_end()
+        return b''
+
+    def write(self, data):
+        self.responses.append(json.loads(data.decode('utf-8')))
+
+    async def drain(self):
+        pass
+
+    def by_id(self):
+        return dict((response['id'], response) for response in self.responses)
+
+
+def search_until_cancelled(started, solve_item, item, token=None, **budget):
+    """ Solve of the worker processes, searching for the first request until cancelled """
+    if item[0] != 1:
+        return solve_item(item, token=token, **budget)
+    started.set()
+    budget = Budget(timeout=10, token=token)
+    try:
+        while True:
+            budget.node()
+    except BudgetExceeded:
+        return item[0], EXCEEDED
+
+
+class TestService(TestCase):
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+    solution = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(1)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def serve(self, lines, **options):
+        self.loop.run_until_complete(SolveService(executor=self.executor, **options).serve(lines, lines))
+        return lines.by_id()
+
+    def test_solve(self):
+        responses = self.serve(Lines([{'id': 1, 'puzzle': self.grid}, {'id': 'b', 'puzzle': '11' + '.' * 79}]))
+        self.assertEqual(responses[1], {'id': 1, 'status': service.SOLVED, 'solution': self.solution})
+        self.assertEqual(responses['b'], {'id': 'b', 'status': service.UNSOLVABLE})
+
+    def test_errors(self):
+        lines = Lines([b'not json', {'puzzle': self.grid}, {'id': 1}, {'id': 2, 'puzzle': '123'},
+                       {'id': 3, 'cancel': True}])
+        self.serve(lines)
+        self.assertEqual([response['status'] for response in lines.responses], [service.ERROR] * 5)
+        self.assertEqual(lines.by_id()[2]['error'], "grid should have 81 digits")
+
+    def test_cancel(self):
+        # the only worker is busy until the end of the input, so that the second request is still queued
+        release = threading.Event()
+        self.executor.submit(release.wait)
+        lines = Lines([{'id': 1, 'puzzle': self.grid}, {'id': 2, 'puzzle': self.grid}, {'id': 2, 'puzzle': self.grid},
+                       {'id': 2, 'cancel': True}], before_end=release.set)
+        responses = self.serve(lines)
+        self.assertEqual(responses[1]['status'], service.SOLVED)
+        self.assertEqual([response['status'] for response in lines.responses if response['id'] == 2],
+                         [service.ERROR, service.CANCELLED])
+
+    def test_cancel_running(self):
+        # the first request searches until cancelled, which frees the only worker for the second one
+        started, reasons = threading.Event(), []
+        solver = SolveService(executor=self.executor)
+        solve_item = solver.solve_item
+
+        def search(item, token=None, **budget):
+            if item[0] == 2:
+                return solve_item(item, token=token, **budget)
+            started.set()
+            budget = Budget(timeout=10, token=token)
+            try:
+                while True:
+                    budget.node()
+            except BudgetExceeded as error:
+                reasons.append(error.reason)
+                return item[0], EXCEEDED
+
+        class CancelOnceStarted(Lines):
+            async def readline(self):
+                if len(self.requests) == 1:
+                    await asyncio.get_event_loop().run_in_executor(None, started.wait)
+                return await super().readline()
+
+        solver.solve_item = search
+        lines = CancelOnceStarted([{'id': 1, 'puzzle': self.grid}, {'id': 2, 'puzzle': self.grid},
+                                   {'id': 1, 'cancel': True}])
+        self.loop.run_until_complete(solver.serve(lines, lines))
+        self.assertEqual(lines.by_id()[1], {'id': 1, 'status': service.CANCELLED})
+        self.assertEqual(lines.by_id()[2], {'id': 2, 'status': service.SOLVED, 'solution': self.solution})
+        self.assertEqual(reasons, [CANCELLED])
+
+    def test_cancel_process(self):
+        # the cancel token of a process pool is shared through a manager, the cancelled search frees the only worker
+        manager = Manager()
+        started = manager.Event()
+        solver = SolveService(workers=1)
+        solver.solve_item = partial(search_until_cancelled, started, solver.solve_item)
+
+        class CancelOnceStarted(Lines):
+            async def readline(self):
+                if len(self.requests) == 1:
+                    await asyncio.get_event_loop().run_in_executor(None, started.wait)
+                    self.cancelled = monotonic()
+                return await super().readline()
+
+        lines = CancelOnceStarted([{'id': 1, 'puzzle': self.grid}, {'id': 2, 'puzzle': self.grid},
+                                   {'id': 1, 'cancel': True}])
+        try:
+            self.loop.run_until_complete(solver.serve(lines, lines))
+        finally:
+            solver.close()
+            manager.shutdown()
+        self.assertEqual(lines.by_id()[1], {'id': 1, 'status': service.CANCELLED})
+        self.assertEqual(lines.by_id()[2], {'id': 2, 'status': service.SOLVED, 'solution': self.solution})
+        self.assertLess(monotonic() - lines.cancelled, 5)
+
+    def test_timeout(self):
+        release = threading.Event()
+        self.executor.submit(release.wait)
+        lines = Lines([{'id': 1, 'puzzle': self.grid, 'timeout': 0.01}, {'id': 2, 'puzzle': self.grid}],
+                      before_end=lambda: self.loop.call_later(0.05, release.set))
+        responses = self.serve(lines)
+        self.assertEqual(responses[1], {'id': 1, 'status': service.TIMEOUT})
+        self.assertEqual(responses[2]['status'], service.SOLVED)
+
+    def test_max_nodes(self):
+        responses = self.serve(Lines([{'id': 1, 'puzzle': '.' * 81, 'max_nodes': 10}, {'id': 2, 'puzzle': '.' * 81},
+                                      {'id': 3, 'puzzle': self.grid, 'max_nodes': 'many'}]), max_nodes=100)
+        self.assertEqual(responses[1], {'id': 1, 'status': service.EXCEEDED_NODES})
+        self.assertEqual(responses[2]['status'], service.SOLVED)
+        self.assertEqual(responses[None]['status'], service.ERROR)
+
+    def test_backpressure(self):
+        solver = SolveService(executor=self.executor, queue=2)
+        submit, running = solver.submit, []
+
+        def counting(request_id, *args):
+            running.append(request_id)
+            self.assertLessEqual(len(running), 2)
+            future = submit(request_id, *args)
+            future.add_done_callback(lambda _: running.remove(request_id))
+            return future
+
+        solver.submit = counting
+        lines = Lines([{'id': index, 'puzzle': self.grid} for index in range(6)])
+        self.loop.run_until_complete(solver.serve(lines, lines))
+        self.assertEqual(len(lines.responses), 6)
+
+    def test_wrong_options(self):
+        with self.assertRaises(ValueError):
+            SolveService(executor=self.executor, queue=0)
+        with self.assertRaises(ValueError):
+            SolveService(executor=self.executor, backend='brute force')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import TestCase
+
+from src import solution, solver
+from src.batch import solve_many, EXCEEDED
+from src.board import Board
+from src.candidates import Candidates
+from src.stats import SolveStats
+from src.strategies import Schedule
+from src.topology import Topology
+
+
+class TestSolveStats(TestCase):
+    diagonal_grid = '1....5.......9....8....14...17..29.....4.....5...............7.7.......29...86...'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_off_by_default(self):
+        self.assertIsNone(Candidates.from_grid(self.hard_grid).stats)
+
+    def test_solve(self):
+        exported = []
+        stats = SolveStats(callback=exported.append)
+        solution.solve(self.diagonal_grid, show=False, stats=stats)
+        self.assertEqual(exported, [stats])
+        self.assertGreater(stats.nodes, 1)
+        self.assertGreater(stats.backtracks, 0)
+        self.assertGreaterEqual(stats.max_depth, 1)
+        self.assertGreater(stats.propagations, 1)
+        counters = stats.as_dict()
+        self.assertGreater(counters['removed']['eliminate'], 0)
+        self.assertGreater(counters['removed']['only_choice'], 0)
+        self.assertGreater(counters['strategy_time']['eliminate'], 0)
+        self.assertGreater(stats.wall_time, 0)
+
+    def test_board_search(self):
+        board = Board(self.hard_grid)
+        stats = SolveStats()
+        board.search(board.grid_values(), stats=stats)
+        self.assertEqual(stats.propagations, stats.nodes)
+
+    def test_heuristics(self):
+        for degree, lcv in ((False, False), (True, False), (False, True)):
+            expected = Candidates.from_grid(self.diagonal_grid, Topology.get(diagonal=True))
+            expected.schedule, expected.stats = Schedule.of([]), SolveStats()
+            expected.search(degree, lcv)
+            stats = SolveStats()
+            solution.solve(self.diagonal_grid, show=False, stats=stats, strategies=[], degree=degree, lcv=lcv)
+            self.assertEqual(stats.nodes, expected.stats.nodes)
+        options = dict(workers=1, diagonal=True, strategies=[], max_nodes=40)
+        self.assertEqual(list(solve_many([self.diagonal_grid], **options)), [EXCEEDED])
+        self.assertNotEqual(list(solve_many([self.diagonal_grid], degree=True, **options)), [EXCEEDED])
+
+    def test_dlx_backend(self):
+        stats = SolveStats()
+        solution.solve(self.diagonal_grid, show=False, backend=solver.DLX, stats=stats)
+        self.assertGreater(stats.nodes, 81)
+        self.assertEqual(stats.propagations, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest import TestCase
+
+from src import solution, strategies
+from src.batch import solve_many
+from src.candidates import Candidates
+from src.stats import SolveStats
+from src.strategies import Schedule, STRATEGIES
+from src.trace import NAKED_SUBSET, HIDDEN_SUBSET, INTERSECTION, FISH, CAGE, STRATEGY_NAMES, PROPAGATION_STRATEGIES
+
+
+class TestStrategies(TestCase):
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    hard_solution = '417369825632158947958724316825437169791586432346912758289643571573291684164875293'
+
+    def tearDown(self):
+        if 'counted' in STRATEGIES:
+            strategies.unregister('counted')
+
+    def solve(self, schedule):
+        candidates = Candidates.from_grid(self.hard_grid)
+        candidates.schedule = schedule
+        candidates.stats = SolveStats()
+        self.assertEqual(candidates.search().to_grid(), self.hard_solution)
+        return candidates.stats
+
+    def test_default_schedule(self):
+        schedule = Schedule()
+        self.assertEqual(schedule.names(), ['naked_subset', 'hidden_subset', 'intersection', 'fish'])
+        self.assertEqual(schedule.unit_labels, (NAKED_SUBSET, HIDDEN_SUBSET))
+        self.assertEqual(Schedule(['fish', 'naked_subset']).names(), ['naked_subset', 'fish'])
+        self.assertEqual(Schedule(['fish', 'naked_subset'], ordered=True).names(), ['fish', 'naked_subset'])
+        with self.assertRaises(ValueError):
+            Schedule(['naked_twins'])
+
+    def test_schedule(self):
+        stats = self.solve(Schedule())
+        self.assertGreater(stats.passes[NAKED_SUBSET], stats.idle[NAKED_SUBSET])
+        self.assertGreater(stats.idle[NAKED_SUBSET], 0)
+        self.assertEqual(stats.as_dict()['passes']['fish'], stats.passes[FISH])
+        stats = self.solve(Schedule(['intersection']))
+        self.assertEqual(stats.passes[NAKED_SUBSET] + stats.passes[HIDDEN_SUBSET] + stats.passes[FISH], 0)
+        self.assertGreater(stats.passes[INTERSECTION], 0)
+        self.assertEqual(sum(self.solve(Schedule([])).passes), 0)
+
+    def test_register(self):
+        calls = []
+
+        def counted(candidates):
+            """ Intersections, removed under the label of the strategy """
+            calls.append(candidates.solved_count())
+            reduced = candidates.copy()
+            if reduced.intersections() is False:
+                return False
+            for cell, (mask, kept) in enumerate(zip(candidates.cells, reduced.cells)):
+                if mask != kept and not candidates.exclude(cell, mask & ~kept, STRATEGIES['counted'].label):
+                    return False
+            return candidates
+        label = strategies.register('counted', 1, counted).label
+        self.assertEqual(STRATEGY_NAMES[label], 'counted')
+        stats = self.solve(Schedule(['counted', 'fish']))
+        self.assertEqual(len(calls), stats.passes[label])
+        self.assertGreater(stats.removed[label], 0)
+        self.assertEqual(stats.passes[INTERSECTION], 0)
+        self.assertEqual(stats.as_dict()['removed']['counted'], stats.removed[label])
+        self.assertEqual(Schedule.learn(stats, ['counted', 'intersection']).names(), ['counted', 'intersection'])
+        for label, scope in ((CAGE, strategies.UNIT), (INTERSECTION, strategies.BOARD)):
+            with self.assertRaises(ValueError):
+                strategies.register('cages', 1, counted, label, scope)
+
+    def test_unregister(self):
+        names, labels = list(STRATEGY_NAMES), list(PROPAGATION_STRATEGIES)
+        label = strategies.register('counted', 1, Candidates.intersections).label
+        self.assertIn(label, PROPAGATION_STRATEGIES)
+        strategies.unregister('counted')
+        self.assertNotIn('counted', STRATEGIES)
+        self.assertEqual(STRATEGY_NAMES, names)
+        self.assertEqual(PROPAGATION_STRATEGIES, labels)
+        self.assertEqual(len(SolveStats().removed), len(names))
+
+    def test_learn(self):
+        stats = SolveStats()
+        stats.passes[NAKED_SUBSET], stats.removed[NAKED_SUBSET], stats.strategy_time[NAKED_SUBSET] = 10, 5, 1.0
+        stats.passes[HIDDEN_SUBSET], stats.removed[HIDDEN_SUBSET], stats.strategy_time[HIDDEN_SUBSET] = 10, 8, 1.0
+        stats.passes[INTERSECTION], stats.strategy_time[INTERSECTION] = 3, 0.1
+        self.assertEqual(Schedule.learn(stats).names(), ['hidden_subset', 'naked_subset', 'fish'])
+        self.assertEqual(Schedule.learn([stats, stats], drop_idle=False).names(),
+                         ['hidden_subset', 'naked_subset', 'intersection', 'fish'])
+        self.assertEqual(Schedule.learn(stats, min_payoff=6).names(), ['hidden_subset', 'fish'])
+        self.assertEqual(Schedule.learn(self.solve(Schedule()), ['naked_subset']).names(), ['naked_subset'])
+
+    def test_per_call(self):
+        diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        stats = SolveStats()
+        values = solution.solve(diagonal_grid, show=False, stats=stats, strategies=['fish'])
+        self.assertEqual(values, solution.solve(diagonal_grid, show=False))
+        self.assertEqual(stats.passes[NAKED_SUBSET], 0)
+        self.assertEqual(list(solve_many([self.hard_grid], workers=1, strategies=[])), [self.hard_solution])
+        self.assertEqual(list(solve_many([self.hard_grid], workers=2, strategies=Schedule.of(['fish']))),
+                         [self.hard_solution])
+
+
+if __name__ == '__main__':
+    unittest.main()
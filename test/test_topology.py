@@ -0,0 +1,186 @@
+import pickle
+import unittest
+from unittest import TestCase
+
+from src import dlx, solver, topology as topology_module, vectorized
+from src.batch import solve_many
+from src.budget import Budget
+from src.board import Board
+from src.cache import SolutionCache
+from src.candidates import Candidates
+from src.topology import Topology, Variant
+from src.validation import validate_grids, validate_solutions, VALID, DUPLICATE, WRONG_SUM
+
+
+class TestTopology(TestCase):
+    grid = '1..4567.....DEF.5.7.DE.G1..4..BC9A.C.23.DE.G56....FG..BC5...1.3.241.8.A.EBC.GFD7F.C.G.16..57.39A7' \
+           '....B2...A.6.C..5A.3....G49..2.318......4....EF..4.......8A2G....9..CD26.1F3....F5BA8.37C.E491D4' \
+           '...C3..A7..F..9.....G.9CF65E.41.9..7..AG....5.2GC25.D6E..9...A.'
+    solution = '123456789ABCDEFG5678DEFG12349ABC9ABC1234DEFG5678DEFG9ABC56781234241389A5EBC6GFD7FBCEG4162D57839A' \
+               '7DG9EB2F83A164C585A637CDFG49B12E31826597B4GDACEFC74DBFE1398A2G56EG9A4CD2651F378B6F5BA8G37C2E491D' \
+               '4861C35BA7E2FDG9A3D72G89CF65EB41B9EF714AG8D3C562GC25FD6E419B78A3'
+
+    def setUp(self):
+        self.topology = Topology.get(size=4)
+
+    def test_shape(self):
+        self.assertEqual(len(self.topology.boxes), 256)
+        self.assertEqual(self.topology.boxes[-1], 'P16')
+        self.assertEqual(self.topology.symbols, '123456789ABCDEFG')
+        self.assertEqual(len(self.topology.unitlist), 48)
+        self.assertEqual(len(self.topology.peers[0]), 39)
+        self.assertIs(Topology.get(size=4), self.topology)
+
+    def test_wrong_size(self):
+        with self.assertRaises(ValueError):
+            Topology(size=6)
+
+    def test_parse_tokens(self):
+        tokens = self.topology.format(self.topology.parse(self.grid), ' ')
+        self.assertTrue(tokens.startswith('1 . . 4 5 6 7 . . . . . 13 14 15 .'))
+        self.assertEqual(self.topology.parse(tokens.replace('.', '0')), list(self.grid))
+
+    def test_search(self):
+        for backend in sorted(solver.BACKENDS):
+            candidates = solver.search(Candidates.from_grid(self.grid, self.topology), backend)
+            self.assertEqual(candidates.to_grid(), self.solution)
+
+    def test_count_solutions(self):
+        self.assertEqual(Candidates.from_grid(self.grid, self.topology).count_solutions(), 1)
+
+    def test_board(self):
+        board = Board(self.grid, self.topology)
+        values = board.search(board.grid_values())
+        self.assertEqual(values['P16'], '3')
+
+    def test_empty_25x25(self):
+        topology = Topology.get(size=5)
+        candidates = Candidates.from_grid('.' * 625, topology).search()
+        self.assertTrue(candidates.is_solved())
+        self.assertEqual(candidates.to_grid()[:25], topology.symbols)
+
+
+class TestVariants(TestCase):
+    solution = '417369825632158947958724316825437169791586432346912758289643571573291684164875293'
+    # pairs of boxes along the rows, shifted by one box every other row
+    pairs = (((0, 1), (2, 3), (4, 5), (6, 7), (8,)), ((0,), (1, 2), (3, 4), (5, 6), (7, 8)))
+    # squares shifted right by the row within each band
+    regions = ''.join(str(row // 3 * 3 + (column + row) % 9 // 3) for row in range(9) for column in range(9))
+
+    def killer(self):
+        """ Killer cages of the pairs of the solution, which is the only one to fit them """
+        boxes = Topology.get().boxes
+        cages = []
+        for row in range(9):
+            for pair in self.pairs[row % 2]:
+                cells = [row * 9 + column for column in pair]
+                cages.append((sum(int(self.solution[cell]) for cell in cells), [boxes[cell] for cell in cells]))
+        return Topology.get(variant=Variant(cages=cages))
+
+    def solve(self, topology, grid='.' * 81):
+        solutions = [solver.search(Candidates.from_grid(grid, topology), backend).to_grid()
+                     for backend in sorted(solver.BACKENDS)]
+        if vectorized.numpy is not None:
+            solutions += vectorized.solve_batch([grid], topology)
+        self.assertEqual(validate_solutions(solutions, [grid] * len(solutions), topology), [VALID] * len(solutions))
+        return solutions
+
+    def test_windoku(self):
+        topology = Topology.get(variant=Variant(windows=True))
+        self.assertEqual(topology.labels(topology.extra_units[0]), ['B2', 'B3', 'B4', 'C2', 'C3', 'C4', 'D2', 'D3', 'D4'])
+        self.assertEqual(len(topology.unitlist), 31)
+        self.assertEqual(len(Topology.get(size=4, variant=Variant(windows=True)).extra_units), 9)
+        self.solve(topology)
+
+    def test_jigsaw(self):
+        topology = Topology.get(variant=Variant(regions=self.regions))
+        self.assertEqual(topology.labels(topology.square_units[1]), ['A4', 'A5', 'A6', 'B3', 'B4', 'B5', 'C2', 'C3', 'C4'])
+        self.solve(topology)
+        with self.assertRaises(ValueError):
+            Topology(variant=Variant(regions=self.regions[:-1] + '0'))
+        with self.assertRaises(ValueError):
+            Topology(variant=Variant(units=[['A1', 'A2']]))
+
+    def test_killer(self):
+        topology = self.killer()
+        self.assertEqual(topology.cage_totals[:2], (5, 10))
+        self.assertEqual(topology.cage_combinations[0], (0b1001, 0b110))
+        self.assertEqual(topology.cage_of[:3], (0, 0, 1))
+        self.assertIn(1, topology.peers[10])
+        self.assertEqual(self.solve(topology)[0], self.solution)
+        self.assertEqual(Candidates.from_grid('.' * 81, topology).count_solutions(), 1)
+        with self.assertRaises(ValueError):
+            Topology(variant=Variant(cages=[(3, ['A1', 'A2']), (4, ['A2', 'A3'])]))
+
+    def test_killer_dlx(self):
+        # cages of three boxes along the rows, alone or with pairs every other row, used to take dlx minutes
+        boxes = Topology.get().boxes
+        for splits in (((3, 3, 3), (3, 3, 3)), ((2, 3, 2, 2), (3, 3, 3))):
+            cages = []
+            for row in range(9):
+                column = 0
+                for length in splits[row % 2]:
+                    cells = [row * 9 + column + offset for offset in range(length)]
+                    cages.append((sum(int(self.solution[cell]) for cell in cells), [boxes[cell] for cell in cells]))
+                    column += length
+            topology = Topology.get(variant=Variant(cages=cages))
+            candidates = solver.search(Candidates.from_grid('.' * 81, topology), solver.DLX, Budget(timeout=5))
+            self.assertEqual(validate_solutions([candidates.to_grid()], topology=topology), [VALID])
+
+    def test_validate_killer(self):
+        topology = self.killer()
+        rotated = self.solution[::-1]
+        for vectorized_check in ((False, True) if vectorized.numpy is not None else (False,)):
+            self.assertEqual(validate_solutions([self.solution, rotated], topology=topology,
+                                                vectorized=vectorized_check), [VALID, WRONG_SUM])
+            grid = '4' + '.' * 11 + '4' + '.' * 68
+            self.assertEqual(validate_grids([grid], Topology.get(), vectorized_check), [VALID])
+            self.assertEqual(validate_grids([grid], Topology.get(variant=Variant(cages=[(9, ['A1', 'B4'])])),
+                                            vectorized_check), [DUPLICATE])
+
+    def test_shared(self):
+        variant = Variant.from_dict({'windows': True, 'cages': [[3, ['A1', 'A2']]]})
+        topology = Topology.get(variant=variant)
+        self.assertIs(Topology.get(variant=Variant(windows=True, cages=[(3, ('A1', 'A2'))])), topology)
+        self.assertIsNot(Topology.get(variant=Variant(windows=True)), topology)
+        self.assertIs(pickle.loads(pickle.dumps(topology)), topology)
+        with self.assertRaises(ValueError):
+            Variant.from_dict({'jigsaw': self.regions})
+        with self.assertRaises(ValueError):
+            SolutionCache(topology=topology)
+
+    def test_cage_overlay(self):
+        killer, other = self.killer(), Topology.get(variant=Variant(cages=[(3, ['A1', 'A2'])]))
+        self.assertIs(killer.shape, Topology.get())
+        self.assertIs(killer.unitlist, other.unitlist)
+        self.assertIs(Topology.get(variant=Variant(windows=True, cages=[(3, ['A1', 'A2'])])).shape,
+                      Topology.get(variant=Variant(windows=True)))
+        self.assertIs(dlx._template(killer), dlx._template(other))
+        if vectorized.numpy is not None:
+            self.assertIs(vectorized._topology_tables(killer), vectorized._topology_tables(other))
+
+    def test_variants_bound(self):
+        bound = topology_module.MAX_VARIANTS
+        topology_module.MAX_VARIANTS = 2
+        try:
+            first = Topology.get(variant=Variant(cages=[(3, ['A1', 'A2'])]))
+            for total in (4, 5):
+                Topology.get(variant=Variant(cages=[(total, ['A1', 'A2'])]))
+            self.assertEqual(len(Topology._variants), 2)
+            self.assertNotIn((False, 3, first.variant), Topology._variants)
+            self.assertIsNot(Topology.get(variant=first.variant), first)
+        finally:
+            topology_module.MAX_VARIANTS = bound
+
+    def test_mixed_batch(self):
+        diagonal = Topology.get(diagonal=True)
+        grids = ['.' * 81, ('.' * 81, self.killer()), ('.' * 81, diagonal), '11' + '.' * 79]
+        for workers in (1, 2):
+            solutions = list(solve_many(grids, workers=workers))
+            self.assertEqual(solutions[1], self.solution)
+            self.assertEqual(validate_solutions(solutions[2:3], topology=diagonal), [VALID])
+            self.assertEqual(solutions[3], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
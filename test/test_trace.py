@@ -0,0 +1,51 @@
+import unittest
+from unittest import TestCase
+
+from src import solution
+from src.candidates import Candidates
+from src.trace import TraceRecorder, STRATEGY_NAMES, CAGE
+
+
+class TestTraceRecorder(TestCase):
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    subset_grid = '7...3...9......12....5....8.612...9......6.8........7531........749.....9.8..1..4'
+
+    def test_off_by_default(self):
+        self.assertIsNone(Candidates.from_grid(self.hard_grid).trace)
+
+    def test_snapshots(self):
+        trace = TraceRecorder()
+        values = solution.solve(self.diagonal_grid, show=False, trace=trace)
+        snapshots = list(trace.snapshots())
+        self.assertEqual(len(snapshots), len(trace))
+        self.assertEqual(snapshots[-1], values)
+
+    def test_backtracking_events(self):
+        trace = TraceRecorder()
+        candidates = Candidates.from_grid(self.subset_grid)
+        candidates.trace = trace
+        trace.start(candidates)
+        candidates.count_solutions()
+        strategies = set(STRATEGY_NAMES[strategy] for cell, mask, strategy in trace.events())
+        self.assertEqual(strategies, set(STRATEGY_NAMES[:CAGE]) - {'fish'})
+        self.assertEqual(list(trace.snapshots())[-1], candidates.to_values())
+
+    def test_ring_buffer(self):
+        trace = TraceRecorder(capacity=16)
+        values = solution.solve(self.diagonal_grid, show=False, trace=trace)
+        self.assertGreater(trace.count, 16)
+        self.assertEqual(len(list(trace.events())), 16)
+        self.assertEqual(list(trace.snapshots())[-1], values)
+
+    def test_assign_value(self):
+        values = solution.grid_values(self.diagonal_grid)
+        trace = TraceRecorder()
+        trace.start(Candidates.from_values(values))
+        solution.assign_value(values, 'A2', '6', trace)
+        self.assertEqual(list(trace.events()), [(1, 0b111011111, 3)])
+        self.assertEqual(list(trace.snapshots())[-1]['A2'], '6')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest import TestCase
+
+from src import solution, validation
+from src.topology import Topology
+from src.validation import VALID, WRONG_LENGTH, INVALID_SYMBOL, DUPLICATE, INCOMPLETE, MISMATCH
+
+
+class TestValidation(TestCase):
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+    solution = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+    vectorized = False
+
+    def validate_grids(self, grids, topology=None):
+        return validation.validate_grids(grids, topology, self.vectorized)
+
+    def validate_solutions(self, solutions, puzzles=None, topology=None):
+        return validation.validate_solutions(solutions, puzzles, topology, self.vectorized)
+
+    def test_grids(self):
+        grids = [self.grid, self.grid[:-1], self.grid[:-1] + 'x', self.solution]
+        self.assertEqual(self.validate_grids(grids), [VALID, WRONG_LENGTH, INVALID_SYMBOL, VALID])
+        row, column, square = (self.pair(0, other) for other in (8, 72, 20))
+        self.assertEqual(self.validate_grids([row, column, square]), [DUPLICATE] * 3)
+
+    @staticmethod
+    def pair(first, second, digit='1'):
+        grid = ['.'] * 81
+        grid[first] = grid[second] = digit
+        return ''.join(grid)
+
+    def test_buffer(self):
+        buffer = ('\n'.join([self.grid, '11' + '.' * 79, self.solution]) + '\n').encode('ascii')
+        self.assertEqual(self.validate_grids(buffer), [VALID, DUPLICATE, VALID])
+        self.assertEqual(self.validate_grids(memoryview(buffer)[:82]), [VALID])
+        self.assertEqual(self.validate_grids([]), [])
+
+    def test_diagonal(self):
+        grid = self.pair(0, 80)
+        self.assertEqual(self.validate_grids([grid]), [VALID])
+        self.assertEqual(self.validate_grids([grid], Topology.get(diagonal=True)), [DUPLICATE])
+
+    def test_solutions(self):
+        swapped = self.solution[1] + self.solution[0] + self.solution[2:]
+        changed = self.solution.replace('3', 'x').replace('4', '3').replace('x', '4')
+        self.assertEqual(self.validate_solutions([self.solution, self.grid, swapped, changed, self.solution[:80]],
+                                                 [self.grid] * 5),
+                         [VALID, INCOMPLETE, DUPLICATE, MISMATCH, WRONG_LENGTH])
+        self.assertEqual(self.validate_solutions([changed]), [VALID])
+        self.assertEqual(self.validate_solutions([self.solution], ['.' * 80]), [MISMATCH])
+        with self.assertRaises(ValueError):
+            self.validate_solutions([self.solution], [])
+
+    def test_larger_board(self):
+        from test.test_topology import TestTopology
+        topology = Topology.get(size=4)
+        self.assertEqual(self.validate_solutions([TestTopology.solution], [TestTopology.grid], topology), [VALID])
+        self.assertEqual(self.validate_grids(['G' * 256], topology), [DUPLICATE])
+
+    def test_check_solution(self):
+        diagonal_solution = solution.solve('2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3',
+                                           show=False)
+        self.assertTrue(solution.check_solution(diagonal_solution))
+        self.assertFalse(solution.check_solution(solution.grid_values(self.solution)))
+        self.assertFalse(solution.check_solution(False))
+
+
+@unittest.skipIf(validation.numpy is None, "numpy is not installed")
+class TestVectorizedValidation(TestValidation):
+    vectorized = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from unittest import TestCase
+
+from src import vectorized
+from src.topology import Topology
+
+
+@unittest.skipIf(vectorized.numpy is None, "numpy is not installed")
+class TestVectorized(TestCase):
+    grids = ['..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..',
+             '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......',
+             '11...............................................................................']
+    solutions = ['483921657967345821251876493548132976729564138136798245372689514814253769695417382',
+                 '417369825632158947958724316825437169791586432346912758289643571573291684164875293',
+                 None]
+
+    def test_wrong_placeholder_grid(self):
+        with self.assertRaises(ValueError):
+            vectorized.grids_to_array([self.grids[0][:-1] + '*'])
+
+    def test_reduce_batch(self):
+        cells = vectorized.grids_to_array(self.grids)
+        contradiction = vectorized.reduce_batch(cells)
+        self.assertEqual(list(contradiction), [False, False, True])
+        self.assertEqual(vectorized.array_to_grids(cells)[0], self.solutions[0])
+        self.assertEqual(vectorized.array_to_grids(cells)[1][0], '4')
+
+    def test_solve_batch(self):
+        self.assertEqual(vectorized.solve_batch(self.grids), self.solutions)
+
+    def test_diagonal(self):
+        grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        solution, = vectorized.solve_batch([grid], Topology.get(diagonal=True))
+        self.assertEqual(solution[:9], '267945381')
+
+    def test_16x16(self):
+        topology = Topology.get(size=4)
+        solution, = vectorized.solve_batch(['.' * 256], topology)
+        self.assertEqual(solution[:16], topology.symbols)
+
+    def test_too_many_symbols(self):
+        with self.assertRaises(ValueError):
+            vectorized.grids_to_array(['.' * 625], Topology.get(size=5))
+
+
+if __name__ == '__main__':
+    unittest.main()